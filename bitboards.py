@@ -0,0 +1,481 @@
+'''
+NumPy bitboards for bulk position analysis.
+
+A BitboardBatch holds N positions as uint64 arrays (one bitboard per color
+and piece type) and generates attack maps and legal moves for every position
+in one call. Sliding attacks use Kogge-Stone fills; legality is decided by
+applying every pseudo-legal move to a copy of the batch and rejecting those
+that leave the mover's king attacked.
+
+  python bitboards.py --depth 4
+  python bitboards.py --depth 3 --fen "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+Squares are numbered like python-chess (a1 = 0, h8 = 63). FEN export writes
+the en passant square only when a capture is pseudo-legal, like
+chess.Board.fen(en_passant="xfen").
+'''
+
+import argparse
+import time
+import numpy as np
+import chess
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_SYMBOLS = "pnbrqk"
+
+# Move flags
+NORMAL, DOUBLE_PUSH, EN_PASSANT, CASTLE = range(4)
+
+# Castling right bits
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+
+U64 = np.uint64
+ONE = U64(1)
+FILE_A = U64(0x0101010101010101)
+FILE_H = U64(0x8080808080808080)
+NOT_A = ~FILE_A
+NOT_H = ~FILE_H
+NOT_AB = U64(0xFCFCFCFCFCFCFCFC)
+NOT_GH = U64(0x3F3F3F3F3F3F3F3F)
+ALL = U64(0xFFFFFFFFFFFFFFFF)
+RANK_3 = U64(0x0000000000FF0000)
+RANK_6 = U64(0x0000FF0000000000)
+PROMOTION_RANKS = U64(0xFF000000000000FF)
+
+BIT = np.array([1 << square for square in range(64)], dtype=np.uint64)
+
+# Index of a single set bit via a de Bruijn multiply
+DEBRUIJN = U64(0x03F79D71B4CB0A89)
+DEBRUIJN_INDEX = np.zeros(64, dtype=np.int64)
+for _square in range(64):
+    DEBRUIJN_INDEX[((1 << _square) * 0x03F79D71B4CB0A89 & 0xFFFFFFFFFFFFFFFF) >> 58] = _square
+
+# (shift, left shift?, mask applied after each step) for the eight ray directions
+ROOK_DIRECTIONS = [(8, True, ALL), (8, False, ALL), (1, True, NOT_A), (1, False, NOT_H)]
+BISHOP_DIRECTIONS = [(9, True, NOT_A), (7, True, NOT_H), (7, False, NOT_A), (9, False, NOT_H)]
+
+# Castling rights kept after a move touches a square (king or rook start squares)
+CASTLING_KEEP = np.full(64, 15, dtype=np.uint8)
+CASTLING_KEEP[chess.E1] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_KEEP[chess.H1] = 15 & ~WHITE_KINGSIDE
+CASTLING_KEEP[chess.A1] = 15 & ~WHITE_QUEENSIDE
+CASTLING_KEEP[chess.E8] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEEP[chess.H8] = 15 & ~BLACK_KINGSIDE
+CASTLING_KEEP[chess.A8] = 15 & ~BLACK_QUEENSIDE
+
+# King destination -> rook from/to square when castling
+ROOK_FROM = np.zeros(64, dtype=np.int64)
+ROOK_TO = np.zeros(64, dtype=np.int64)
+for _king_to, _rook_from, _rook_to in ((chess.G1, chess.H1, chess.F1), (chess.C1, chess.A1, chess.D1),
+                                       (chess.G8, chess.H8, chess.F8), (chess.C8, chess.A8, chess.D8)):
+    ROOK_FROM[_king_to] = _rook_from
+    ROOK_TO[_king_to] = _rook_to
+
+# (right, king from, king to, squares that must be empty, squares that must not be attacked)
+CASTLING_RULES = [
+    (WHITE, WHITE_KINGSIDE, chess.E1, chess.G1, chess.BB_F1 | chess.BB_G1, chess.BB_E1 | chess.BB_F1),
+    (WHITE, WHITE_QUEENSIDE, chess.E1, chess.C1, chess.BB_B1 | chess.BB_C1 | chess.BB_D1, chess.BB_E1 | chess.BB_D1),
+    (BLACK, BLACK_KINGSIDE, chess.E8, chess.G8, chess.BB_F8 | chess.BB_G8, chess.BB_E8 | chess.BB_F8),
+    (BLACK, BLACK_QUEENSIDE, chess.E8, chess.C8, chess.BB_B8 | chess.BB_C8 | chess.BB_D8, chess.BB_E8 | chess.BB_D8),
+]
+
+
+# -----------------------
+# Bitboard primitives (work elementwise on uint64 arrays)
+# -----------------------
+def shift(bb, amount, left):
+    return bb << U64(amount) if left else bb >> U64(amount)
+
+
+def sliding_attacks(generators, empty, directions):
+    # Kogge-Stone occluded fill in each direction, then one more step for the blocker
+    attacks = np.zeros_like(generators)
+    for amount, left, mask in directions:
+        gen = generators
+        propagate = empty & mask
+        gen = gen | (propagate & shift(gen, amount, left))
+        propagate = propagate & shift(propagate, amount, left)
+        gen = gen | (propagate & shift(gen, amount * 2, left))
+        propagate = propagate & shift(propagate, amount * 2, left)
+        gen = gen | (propagate & shift(gen, amount * 4, left))
+        attacks |= shift(gen, amount, left) & mask
+    return attacks
+
+
+def rook_attacks(rooks, occupied):
+    return sliding_attacks(rooks, ~occupied, ROOK_DIRECTIONS)
+
+
+def bishop_attacks(bishops, occupied):
+    return sliding_attacks(bishops, ~occupied, BISHOP_DIRECTIONS)
+
+
+def knight_attacks(knights):
+    left1 = (knights >> U64(1)) & NOT_H
+    left2 = (knights >> U64(2)) & NOT_GH
+    right1 = (knights << U64(1)) & NOT_A
+    right2 = (knights << U64(2)) & NOT_AB
+    one = left1 | right1
+    two = left2 | right2
+    return (one << U64(16)) | (one >> U64(16)) | (two << U64(8)) | (two >> U64(8))
+
+
+def king_attacks(kings):
+    sideways = ((kings << U64(1)) & NOT_A) | ((kings >> U64(1)) & NOT_H)
+    row = kings | sideways
+    return sideways | (row << U64(8)) | (row >> U64(8))
+
+
+def pawn_attacks(pawns, white):
+    # white is a bool array: True where the pawns are White's
+    up = ((pawns << U64(7)) & NOT_H) | ((pawns << U64(9)) & NOT_A)
+    down = ((pawns >> U64(9)) & NOT_H) | ((pawns >> U64(7)) & NOT_A)
+    return np.where(white, up, down)
+
+
+def lowest_bit(bb):
+    return bb & (~bb + ONE)
+
+
+def bit_index(single_bits):
+    return DEBRUIJN_INDEX[(single_bits * DEBRUIJN) >> U64(58)]
+
+
+def serialize(rows, bbs):
+    # Split each bitboard into its squares: returns (row for every set bit, square)
+    out_rows = []
+    out_squares = []
+    keep = bbs != 0
+    rows, bbs = rows[keep], bbs[keep]
+    while len(bbs):
+        lsb = lowest_bit(bbs)
+        out_rows.append(rows)
+        out_squares.append(bit_index(lsb))
+        bbs = bbs ^ lsb
+        keep = bbs != 0
+        rows, bbs = rows[keep], bbs[keep]
+    if not out_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(out_rows), np.concatenate(out_squares)
+
+
+# -----------------------
+# Positions and moves
+# -----------------------
+class MoveBatch:
+    """Moves for a BitboardBatch: parallel arrays, one entry per move."""
+
+    def __init__(self, position, from_square, to_square, piece, promotion, flag):
+        self.position = position
+        self.from_square = from_square
+        self.to_square = to_square
+        self.piece = piece
+        self.promotion = promotion
+        self.flag = flag
+
+    def __len__(self):
+        return len(self.position)
+
+    def take(self, index):
+        return MoveBatch(self.position[index], self.from_square[index], self.to_square[index],
+                         self.piece[index], self.promotion[index], self.flag[index])
+
+    def uci(self, row):
+        move = chess.square_name(int(self.from_square[row])) + chess.square_name(int(self.to_square[row]))
+        if self.promotion[row]:
+            move += PIECE_SYMBOLS[self.promotion[row]]
+        return move
+
+
+class BitboardBatch:
+    def __init__(self, pieces, side, castling, ep_square, halfmove, fullmove):
+        self.pieces = pieces        # (N, 2, 6) uint64, [position, color, piece type]
+        self.side = side            # (N,) uint8, WHITE or BLACK to move
+        self.castling = castling    # (N,) uint8 castling right bits
+        self.ep_square = ep_square  # (N,) int64, -1 when there is none
+        self.halfmove = halfmove
+        self.fullmove = fullmove
+
+    def __len__(self):
+        return len(self.side)
+
+    @classmethod
+    def from_fens(cls, fens):
+        count = len(fens)
+        pieces = np.zeros((count, 2, 6), dtype=np.uint64)
+        side = np.zeros(count, dtype=np.uint8)
+        castling = np.zeros(count, dtype=np.uint8)
+        ep_square = np.full(count, -1, dtype=np.int64)
+        halfmove = np.zeros(count, dtype=np.int32)
+        fullmove = np.ones(count, dtype=np.int32)
+        for index, fen in enumerate(fens):
+            fields = fen.split()
+            placement = fields[0]
+            square = 56
+            for char in placement:
+                if char == "/":
+                    square -= 16
+                elif char.isdigit():
+                    square += int(char)
+                else:
+                    color = WHITE if char.isupper() else BLACK
+                    pieces[index, color, PIECE_SYMBOLS.index(char.lower())] |= BIT[square]
+                    square += 1
+            side[index] = WHITE if len(fields) < 2 or fields[1] == "w" else BLACK
+            rights = fields[2] if len(fields) > 2 else "-"
+            castling[index] = sum(bit for symbol, bit in (("K", WHITE_KINGSIDE), ("Q", WHITE_QUEENSIDE),
+                                                        ("k", BLACK_KINGSIDE), ("q", BLACK_QUEENSIDE)) if symbol in rights)
+            if len(fields) > 3 and fields[3] != "-":
+                ep_square[index] = chess.parse_square(fields[3])
+            if len(fields) > 4:
+                halfmove[index] = int(fields[4])
+            if len(fields) > 5:
+                fullmove[index] = int(fields[5])
+        return cls(pieces, side, castling, ep_square, halfmove, fullmove)
+
+    @classmethod
+    def from_boards(cls, boards):
+        return cls.from_fens([board.fen() for board in boards])
+
+    def take(self, index):
+        return BitboardBatch(self.pieces[index], self.side[index], self.castling[index],
+                             self.ep_square[index], self.halfmove[index], self.fullmove[index])
+
+    def occupancy(self):
+        # (N, 2) pieces of each color, and (N,) all pieces
+        by_color = np.bitwise_or.reduce(self.pieces, axis=2)
+        return by_color, by_color[:, WHITE] | by_color[:, BLACK]
+
+    def attack_maps(self):
+        # (N, 2) squares attacked by each color
+        _, occupied = self.occupancy()
+        maps = np.zeros((len(self), 2), dtype=np.uint64)
+        for color in (WHITE, BLACK):
+            own = self.pieces[:, color]
+            maps[:, color] = (pawn_attacks(own[:, PAWN], color == WHITE)
+                              | knight_attacks(own[:, KNIGHT])
+                              | bishop_attacks(own[:, BISHOP] | own[:, QUEEN], occupied)
+                              | rook_attacks(own[:, ROOK] | own[:, QUEEN], occupied)
+                              | king_attacks(own[:, KING]))
+        return maps
+
+    def king_attacked(self, color):
+        # (N,) bool: is `color`'s king (per position) attacked by the other side
+        rows = np.arange(len(self))
+        own = self.pieces[rows, color]
+        enemy = self.pieces[rows, 1 - color]
+        _, occupied = self.occupancy()
+        king = own[:, KING]
+        attackers = ((knight_attacks(king) & enemy[:, KNIGHT])
+                     | (king_attacks(king) & enemy[:, KING])
+                     | (pawn_attacks(king, color == WHITE) & enemy[:, PAWN])
+                     | (bishop_attacks(king, occupied) & (enemy[:, BISHOP] | enemy[:, QUEEN]))
+                     | (rook_attacks(king, occupied) & (enemy[:, ROOK] | enemy[:, QUEEN])))
+        return attackers != 0
+
+    def pseudo_legal_moves(self):
+        count = len(self)
+        rows = np.arange(count)
+        side = self.side.astype(np.int64)
+        white = side == WHITE
+        own = self.pieces[rows, side]
+        by_color, occupied = self.occupancy()
+        own_occupied = by_color[rows, side]
+        enemy_occupied = by_color[rows, 1 - side]
+        empty = ~occupied
+        parts = []
+
+        def add(position, from_square, to_square, piece, flag, promotion=None):
+            if promotion is None:
+                promotion = np.zeros(len(position), dtype=np.int64)
+            parts.append((position, from_square, to_square, np.full(len(position), piece, dtype=np.int64), promotion, flag))
+
+        # Pawns, set-wise: pushes and captures for every pawn at once
+        pawns = own[:, PAWN]
+        ep_bb = np.where(self.ep_square >= 0, BIT[np.clip(self.ep_square, 0, 63)], U64(0))
+        single = np.where(white, pawns << U64(8), pawns >> U64(8)) & empty
+        double = np.where(white, (single & RANK_3) << U64(8), (single & RANK_6) >> U64(8)) & empty
+        capture_west = np.where(white, (pawns << U64(7)) & NOT_H, (pawns >> U64(9)) & NOT_H) & (enemy_occupied | ep_bb)
+        capture_east = np.where(white, (pawns << U64(9)) & NOT_A, (pawns >> U64(7)) & NOT_A) & (enemy_occupied | ep_bb)
+        for targets, white_delta, black_delta, flag in ((single, 8, -8, NORMAL), (double, 16, -16, DOUBLE_PUSH),
+                                                        (capture_west, 7, -9, NORMAL), (capture_east, 9, -7, NORMAL)):
+            position, to_square = serialize(rows, targets)
+            from_square = to_square - np.where(white[position], white_delta, black_delta)
+            flags = np.full(len(position), flag, dtype=np.int64)
+            if flag == NORMAL:
+                flags[to_square == self.ep_square[position]] = EN_PASSANT
+            promoting = (BIT[to_square] & PROMOTION_RANKS) != 0
+            if promoting.any():
+                plain = ~promoting
+                add(position[plain], from_square[plain], to_square[plain], PAWN, flags[plain])
+                for promotion in (KNIGHT, BISHOP, ROOK, QUEEN):
+                    add(position[promoting], from_square[promoting], to_square[promoting], PAWN, flags[promoting],
+                        np.full(promoting.sum(), promotion, dtype=np.int64))
+            else:
+                add(position, from_square, to_square, PAWN, flags)
+
+        # Other pieces, one piece per position at a time so each origin keeps its own targets
+        for piece in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            remaining = own[:, piece].copy()
+            while remaining.any():
+                lsb = lowest_bit(remaining)
+                if piece == KNIGHT:
+                    targets = knight_attacks(lsb)
+                elif piece == BISHOP:
+                    targets = bishop_attacks(lsb, occupied)
+                elif piece == ROOK:
+                    targets = rook_attacks(lsb, occupied)
+                elif piece == QUEEN:
+                    targets = bishop_attacks(lsb, occupied) | rook_attacks(lsb, occupied)
+                else:
+                    targets = king_attacks(lsb)
+                targets &= ~own_occupied
+                targets[lsb == 0] = 0
+                position, to_square = serialize(rows, targets)
+                add(position, bit_index(lsb[position]), to_square, piece, np.full(len(position), NORMAL, dtype=np.int64))
+                remaining ^= lsb
+
+        # Castling: rights, empty path, and king not passing through check
+        enemy_attacks = self.attack_maps()[rows, 1 - side]
+        for color, right, king_from, king_to, path, safe in CASTLING_RULES:
+            allowed = ((side == color) & ((self.castling & right) != 0)
+                       & ((occupied & U64(path)) == 0) & ((enemy_attacks & U64(safe)) == 0)
+                       & ((own[:, KING] & BIT[king_from]) != 0) & ((own[:, ROOK] & BIT[ROOK_FROM[king_to]]) != 0))
+            position = rows[allowed]
+            add(position, np.full(len(position), king_from, dtype=np.int64), np.full(len(position), king_to, dtype=np.int64),
+                KING, np.full(len(position), CASTLE, dtype=np.int64))
+
+        return MoveBatch(*(np.concatenate(column) for column in zip(*parts)))
+
+    def make_moves(self, moves):
+        # One child position per move
+        count = len(moves)
+        rows = np.arange(count)
+        position = moves.position
+        pieces = self.pieces[position].copy()
+        us = self.side[position].astype(np.int64)
+        them = 1 - us
+        from_bb = BIT[moves.from_square]
+        to_bb = BIT[moves.to_square]
+        captured = np.bitwise_or.reduce(pieces[rows, them], axis=1) & to_bb
+
+        pieces[rows, us, moves.piece] ^= from_bb
+        pieces[rows, them] &= ~to_bb[:, None]
+        placed = np.where(moves.promotion > 0, moves.promotion, moves.piece)
+        pieces[rows, us, placed] |= to_bb
+
+        en_passant = moves.flag == EN_PASSANT
+        if en_passant.any():
+            victim = np.where(us[en_passant] == WHITE, moves.to_square[en_passant] - 8, moves.to_square[en_passant] + 8)
+            pieces[rows[en_passant], them[en_passant], PAWN] &= ~BIT[victim]
+
+        castle = moves.flag == CASTLE
+        if castle.any():
+            king_to = moves.to_square[castle]
+            pieces[rows[castle], us[castle], ROOK] ^= BIT[ROOK_FROM[king_to]] | BIT[ROOK_TO[king_to]]
+
+        castling = self.castling[position] & CASTLING_KEEP[moves.from_square] & CASTLING_KEEP[moves.to_square]
+        ep_square = np.where(moves.flag == DOUBLE_PUSH, (moves.from_square + moves.to_square) // 2, -1)
+        resets_clock = (moves.piece == PAWN) | (captured != 0)
+        halfmove = np.where(resets_clock, 0, self.halfmove[position] + 1).astype(np.int32)
+        fullmove = (self.fullmove[position] + (us == BLACK)).astype(np.int32)
+        return BitboardBatch(pieces, them.astype(np.uint8), castling, ep_square, halfmove, fullmove)
+
+    def legal_moves(self):
+        # Returns (moves, children): pseudo-legal moves that do not leave the mover in check
+        moves = self.pseudo_legal_moves()
+        children = self.make_moves(moves)
+        legal = ~children.king_attacked(1 - children.side.astype(np.int64))
+        return moves.take(legal), children.take(legal)
+
+    def to_fens(self):
+        fens = []
+        has_ep_capture = np.zeros(len(self), dtype=bool)
+        candidates = self.ep_square >= 0
+        if candidates.any():
+            moves = self.take(candidates).pseudo_legal_moves()
+            has_ep = np.zeros(candidates.sum(), dtype=bool)
+            has_ep[moves.position[moves.flag == EN_PASSANT]] = True
+            has_ep_capture[candidates] = has_ep
+        for index in range(len(self)):
+            squares = [None] * 64
+            for color in (WHITE, BLACK):
+                for piece in range(6):
+                    bb = int(self.pieces[index, color, piece])
+                    while bb:
+                        lsb = bb & -bb
+                        symbol = PIECE_SYMBOLS[piece]
+                        squares[lsb.bit_length() - 1] = symbol.upper() if color == WHITE else symbol
+                        bb ^= lsb
+            ranks = []
+            for rank in range(7, -1, -1):
+                text, empty = "", 0
+                for file in range(8):
+                    symbol = squares[rank * 8 + file]
+                    if symbol is None:
+                        empty += 1
+                        continue
+                    if empty:
+                        text += str(empty)
+                        empty = 0
+                    text += symbol
+                ranks.append(text + (str(empty) if empty else ""))
+            rights = "".join(symbol for symbol, bit in (("K", WHITE_KINGSIDE), ("Q", WHITE_QUEENSIDE),
+                                                      ("k", BLACK_KINGSIDE), ("q", BLACK_QUEENSIDE))
+                             if self.castling[index] & bit) or "-"
+            ep = chess.square_name(int(self.ep_square[index])) if has_ep_capture[index] else "-"
+            fens.append(f"{'/'.join(ranks)} {'w' if self.side[index] == WHITE else 'b'} {rights} {ep} "
+                        f"{self.halfmove[index]} {self.fullmove[index]}")
+        return fens
+
+
+# -----------------------
+# Perft
+# -----------------------
+def perft(batch, depth, chunk_size=20000):
+    # Leaf count, expanding a whole level of positions per call; large levels
+    # are split into chunks to bound memory
+    if depth == 0:
+        return len(batch)
+    total = 0
+    for start in range(0, len(batch), chunk_size):
+        chunk = batch.take(slice(start, start + chunk_size))
+        moves, children = chunk.legal_moves()
+        total += len(moves) if depth == 1 else perft(children, depth - 1, chunk_size)
+    return total
+
+
+def board_perft(board, depth):
+    if depth == 1:
+        return board.legal_moves.count()
+    total = 0
+    for move in board.legal_moves:
+        board.push(move)
+        total += board_perft(board, depth - 1)
+        board.pop()
+    return total
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Perft benchmark: NumPy bitboards vs chess.Board")
+    parser.add_argument("--fen", default=chess.STARTING_FEN, help="root position")
+    parser.add_argument("--depth", type=int, default=4, help="perft depth")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="positions expanded per NumPy call")
+    parser.add_argument("--skip-board", action="store_true", help="do not time chess.Board (slow at depth 5+)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    nodes = perft(BitboardBatch.from_fens([args.fen]), args.depth, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"bitboards   perft({args.depth}) = {nodes} in {elapsed:.2f}s ({nodes / elapsed:,.0f} nodes/s)")
+    if not args.skip_board:
+        start = time.perf_counter()
+        expected = board_perft(chess.Board(args.fen), args.depth)
+        board_elapsed = time.perf_counter() - start
+        print(f"chess.Board perft({args.depth}) = {expected} in {board_elapsed:.2f}s ({expected / board_elapsed:,.0f} nodes/s)")
+        if expected != nodes:
+            print("MISMATCH")
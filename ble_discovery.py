@@ -0,0 +1,123 @@
+import json
+import os
+import time
+from bleak import BleakScanner, BleakClient
+from ble_provisioning import GAMESERVICE_UUID
+
+ARDUINO_NAME = "GIGA_R1_Bluetooth"
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".chess_board_cache.json")
+SCAN_TIMEOUT = 10
+CONNECT_TIMEOUT = 10
+
+
+class ConnectTimer:
+    """Time-to-connect broken down into scan and connect phases."""
+
+    def __init__(self):
+        self.scan = 0.0
+        self.connect = 0.0
+        self.source = None
+        self.attempts = 0
+        self.handles_changed = False
+
+    @property
+    def total(self):
+        return self.scan + self.connect
+
+    def __str__(self):
+        return (f"Connected via {self.source} in {self.total * 1000:.0f} ms "
+                f"(scan {self.scan * 1000:.0f} ms, connect {self.connect * 1000:.0f} ms, attempts {self.attempts})")
+
+
+class DeviceCache:
+    """Last board address and its GATT handle map, persisted as JSON."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.address = None
+        self.handles = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.address = data.get("address")
+        self.handles = data.get("handles", {})
+
+    def save(self):
+        try:
+            with open(self.path, "w") as f:
+                json.dump({"address": self.address, "handles": self.handles}, f)
+        except OSError as e:
+            print(f"Could not save device cache: {e}")
+
+    def forget(self):
+        self.address = None
+        self.handles = {}
+        self.save()
+
+
+def handle_map(services):
+    # {characteristic uuid: handle} for the game service
+    service = services.get_service(GAMESERVICE_UUID) if services else None
+    if service is None:
+        return {}
+    return {char.uuid: char.handle for char in service.characteristics}
+
+
+def is_board(device, advertisement, name=ARDUINO_NAME):
+    return device.name == name or advertisement.local_name == name or GAMESERVICE_UUID in advertisement.service_uuids
+
+
+async def find_board(name=ARDUINO_NAME, timeout=SCAN_TIMEOUT):
+    # Returns as soon as the first matching advertisement is seen
+    return await BleakScanner.find_device_by_filter(lambda device, adv: is_board(device, adv, name), timeout=timeout)
+
+
+async def connect_client(target, timer):
+    # Only the game service is discovered on backends that support it
+    client = BleakClient(target, services=[GAMESERVICE_UUID], timeout=CONNECT_TIMEOUT)
+    timer.attempts += 1
+    start = time.perf_counter()
+    try:
+        await client.connect()
+    finally:
+        timer.connect += time.perf_counter() - start
+    return client
+
+
+async def connect_board(cache, name=ARDUINO_NAME, scan_timeout=SCAN_TIMEOUT):
+    """Connect to the board, trying the cached address before scanning.
+
+    Returns (client, timer); client is None if the board was not found.
+    The cache is updated with the address and handle map on success.
+    """
+    timer = ConnectTimer()
+    client = None
+    if cache.address:
+        try:
+            client = await connect_client(cache.address, timer)
+            timer.source = "cache"
+        except Exception:
+            client = None
+
+    if client is None:
+        start = time.perf_counter()
+        device = await find_board(name, scan_timeout)
+        timer.scan = time.perf_counter() - start
+        if device is None:
+            return None, timer
+        client = await connect_client(device, timer)
+        timer.source = "scan"
+
+    handles = handle_map(client.services)
+    changed = handles != cache.handles
+    if changed or client.address != cache.address:
+        cache.address = client.address
+        cache.handles = handles
+        cache.save()
+    timer.handles_changed = changed
+    return client, timer
@@ -0,0 +1,267 @@
+'''
+Provision many chess boards at once.
+
+Discovers every advertising GIGA_R1_Bluetooth board in one scan, keeps a
+pool of BLE connections and sends each board its game concurrently, with
+retries and a per-board report.
+
+Example with real boards, one game per board in discovery order:
+  python ble_fleet.py --ssid EventWifi --password secret --player host --games g1,g2,g3
+
+Dry run against simulated boards (no Bluetooth adapter needed):
+  python ble_fleet.py --fake 20 --ssid EventWifi --password secret --player host --games g1
+'''
+
+import argparse
+import asyncio
+import random
+import time
+from bleak import BleakScanner, BleakClient
+from ble_discovery import ARDUINO_NAME, CONNECT_TIMEOUT, is_board
+from ble_provisioning import GAMESERVICE_UUID, PROVISION_CHAR_UUID, provision
+from wifi_credentials import WifiCredentials, default_provider
+
+SCAN_TIMEOUT = 10
+FLEET_CONCURRENCY = 8
+FLEET_RETRIES = 3
+
+
+class BleakBackend:
+    """Real Bluetooth through bleak."""
+
+    async def scan(self, name, timeout, expected=None):
+        # Collect every matching board; stop early once `expected` are seen
+        found = {}
+        done = asyncio.Event()
+
+        def on_advertisement(device, advertisement):
+            if is_board(device, advertisement, name):
+                found[device.address] = device
+                if expected and len(found) >= expected:
+                    done.set()
+
+        async with BleakScanner(on_advertisement):
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(found.values())
+
+    async def connect(self, device):
+        client = BleakClient(device, services=[GAMESERVICE_UUID], timeout=CONNECT_TIMEOUT)
+        await client.connect()
+        return client
+
+
+class FakeDevice:
+    def __init__(self, address, name=ARDUINO_NAME):
+        self.address = address
+        self.name = name
+
+
+class FakeCharacteristic:
+    def __init__(self, uuid, handle, max_write_without_response_size):
+        self.uuid = uuid
+        self.handle = handle
+        self.max_write_without_response_size = max_write_without_response_size
+
+
+class FakeServices:
+    def __init__(self, characteristics):
+        self.characteristics = {char.uuid: char for char in characteristics}
+
+    def get_characteristic(self, uuid):
+        return self.characteristics.get(uuid)
+
+
+class FakeClient:
+    """Stand-in for BleakClient that records writes and simulates link latency."""
+
+    def __init__(self, device, backend):
+        self.address = device.address
+        self.backend = backend
+        self.is_connected = False
+        self.writes = []
+        self.services = FakeServices([FakeCharacteristic(PROVISION_CHAR_UUID, 40, backend.mtu - 3)] if backend.batched else [])
+
+    async def connect(self):
+        await asyncio.sleep(self.backend.connect_latency)
+        if random.random() < self.backend.failure_rate:
+            raise ConnectionError(f"{self.address}: connection failed")
+        self.is_connected = True
+
+    async def write_gatt_char(self, char_specifier, data, response=None):
+        if not self.is_connected:
+            raise ConnectionError(f"{self.address}: not connected")
+        # Only acknowledged writes wait for a full round-trip
+        await asyncio.sleep(self.backend.interval if response is not False else 0)
+        if random.random() < self.backend.failure_rate:
+            self.is_connected = False
+            raise ConnectionError(f"{self.address}: link lost")
+        self.writes.append((char_specifier, bytes(data), response))
+
+    async def disconnect(self):
+        self.is_connected = False
+
+
+class FakeBackend:
+    """Simulated boards for dry runs and tests, no Bluetooth adapter needed."""
+
+    def __init__(self, count, connect_latency=0.2, interval=0.03, failure_rate=0.0, mtu=23, batched=True):
+        self.devices = [FakeDevice(f"F0:00:00:00:{index // 256:02X}:{index % 256:02X}") for index in range(count)]
+        self.connect_latency = connect_latency
+        self.interval = interval
+        self.failure_rate = failure_rate
+        self.mtu = mtu
+        self.batched = batched
+        self.clients = {}
+
+    async def scan(self, name, timeout, expected=None):
+        await asyncio.sleep(min(timeout, 0.1))
+        return [device for device in self.devices if device.name == name]
+
+    async def connect(self, device):
+        client = FakeClient(device, self)
+        await client.connect()
+        self.clients[device.address] = client
+        return client
+
+
+class BoardResult:
+    def __init__(self, address, game_id):
+        self.address = address
+        self.game_id = game_id
+        self.ok = False
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.provisioning = None
+        self.error = None
+
+    def __str__(self):
+        if self.ok:
+            return f"{self.address} game {self.game_id}: ok after {self.attempts} attempt(s), {self.elapsed * 1000:.0f} ms ({self.provisioning})"
+        return f"{self.address} game {self.game_id}: FAILED after {self.attempts} attempt(s): {self.error}"
+
+
+class BoardFleet:
+    """Pool of board connections provisioned concurrently."""
+
+    def __init__(self, backend=None, concurrency=FLEET_CONCURRENCY, retries=FLEET_RETRIES, base_delay=0.5):
+        self.backend = backend or BleakBackend()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.devices = []
+        self.clients = {}
+
+    async def discover(self, name=ARDUINO_NAME, timeout=SCAN_TIMEOUT, expected=None):
+        self.devices = await self.backend.scan(name, timeout, expected)
+        return self.devices
+
+    async def client_for(self, device):
+        client = self.clients.get(device.address)
+        if client is None or not client.is_connected:
+            client = await self.backend.connect(device)
+            self.clients[device.address] = client
+        return client
+
+    async def drop_client(self, address):
+        client = self.clients.pop(address, None)
+        if client is None:
+            return
+        try:
+            await client.disconnect()
+        except Exception:
+            pass
+
+    async def provision_one(self, device, ssid, wifi_password, game_id, player_id):
+        result = BoardResult(device.address, game_id)
+        start = time.perf_counter()
+        async with self.semaphore:
+            while result.attempts < self.retries:
+                result.attempts += 1
+                try:
+                    client = await self.client_for(device)
+                    result.provisioning = await provision(client, ssid, wifi_password, game_id, player_id, verbose=False)
+                    result.ok = True
+                    break
+                except Exception as e:
+                    result.error = str(e) or type(e).__name__
+                    # Drop the connection so the next attempt reconnects; a GATT error can
+                    # leave the link up, and a board accepts only one central at a time
+                    await self.drop_client(device.address)
+                    if result.attempts < self.retries:
+                        await asyncio.sleep(self.base_delay * 2 ** (result.attempts - 1))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def provision_all(self, ssid, wifi_password, assignments, player_id):
+        # assignments is a list of (device, game_id); results keep the same order
+        return await asyncio.gather(*(
+            self.provision_one(device, ssid, wifi_password, game_id, player_id)
+            for device, game_id in assignments
+        ))
+
+    async def close(self):
+        await asyncio.gather(*(client.disconnect() for client in self.clients.values()), return_exceptions=True)
+        self.clients.clear()
+
+
+def assign_games(devices, game_ids):
+    # One game per board in discovery order; a single game ID goes to every board
+    if len(game_ids) == 1:
+        return [(device, game_ids[0]) for device in devices]
+    return list(zip(devices, game_ids))
+
+
+def print_report(results, elapsed):
+    for result in results:
+        print(result)
+    succeeded = sum(1 for result in results if result.ok)
+    print(f"{succeeded}/{len(results)} boards provisioned in {elapsed:.2f}s ({succeeded / elapsed:.1f} boards/s)")
+
+
+async def run(args):
+    backend = FakeBackend(args.fake, failure_rate=args.fake_failure_rate) if args.fake else BleakBackend()
+    fleet = BoardFleet(backend, concurrency=args.concurrency, retries=args.retries)
+    game_ids = [game_id.strip() for game_id in args.games.split(",") if game_id.strip()]
+    ssid, wifi_password = args.ssid, args.password
+    if not ssid:
+        ssid, wifi_password = WifiCredentials(default_provider()).get()
+        if not ssid or not wifi_password:
+            print("No Wi-Fi credentials found; pass --ssid and --password")
+            return
+
+    start = time.perf_counter()
+    devices = await fleet.discover(args.name, args.scan_timeout, args.expected)
+    print(f"Found {len(devices)} board(s) in {time.perf_counter() - start:.2f}s")
+    assignments = assign_games(devices, game_ids)
+    if len(assignments) < len(devices):
+        print(f"Only {len(game_ids)} game ID(s) for {len(devices)} boards; extra boards are skipped")
+
+    start = time.perf_counter()
+    try:
+        results = await fleet.provision_all(ssid, wifi_password, assignments, args.player)
+    finally:
+        await fleet.close()
+    print_report(results, max(time.perf_counter() - start, 1e-9))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Provision games to many chess boards concurrently")
+    parser.add_argument("--ssid", default=None, help="Wi-Fi network the boards should join (default: this machine's network)")
+    parser.add_argument("--password", default=None, help="Wi-Fi password")
+    parser.add_argument("--player", required=True, help="player ID sent to every board")
+    parser.add_argument("--games", required=True, help="comma-separated game IDs, one per board (or one for all)")
+    parser.add_argument("--name", default=ARDUINO_NAME, help="advertised board name")
+    parser.add_argument("--expected", type=int, default=None, help="stop scanning once this many boards are seen")
+    parser.add_argument("--scan-timeout", type=float, default=SCAN_TIMEOUT, help="seconds to scan for boards")
+    parser.add_argument("--concurrency", type=int, default=FLEET_CONCURRENCY, help="boards provisioned at the same time")
+    parser.add_argument("--retries", type=int, default=FLEET_RETRIES, help="attempts per board")
+    parser.add_argument("--fake", type=int, default=0, help="simulate this many boards instead of using Bluetooth")
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0, help="chance a simulated connect or write fails")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,111 @@
+import time
+
+# UUIDs (match Arduino's characteristics)
+GAMESERVICE_UUID = "5c8fbcee-e44a-440a-b9be-f09510b40411"
+SSID_CHAR_UUID = "8266532f-1fe1-4af9-97e1-3b7c04ef8201"
+PASSWORD_CHAR_UUID = "91abf729-1b45-4147-b8f7-b93620e8bce1"
+GAMEID_CHAR_UUID = "5f91bb09-093c-42d7-b615-a2b110369a2e"
+PLAYERID_CHAR_UUID = "bcf9cb8c-78f4-4b22-8f2c-ad5df34a34cd"
+RESET_CHAR_UUID = "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e2"
+USE_TYPE_CHAR_UUID = "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e3"
+PROVISION_CHAR_UUID = "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e4"
+BOARD_EVENT_CHAR_UUID = "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e5"
+BOARD_DIFF_CHAR_UUID = "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e7"
+
+# Batched provisioning frame, see on_provision_written() in chess_arduino.ino:
+# payload = [version][type][length][value]..., sent as chunks of
+# [sequence | LAST_CHUNK][data] no larger than the characteristic's value size.
+PROVISION_VERSION = 1
+PROVISION_CHUNK_SIZE = 244
+LAST_CHUNK = 0x80
+MAX_CHUNKS = 0x80
+
+FIELD_SSID = 1
+FIELD_PASSWORD = 2
+FIELD_GAME_ID = 3
+FIELD_PLAYER_ID = 4
+FIELD_USE_TYPE = 5
+
+
+class ProvisioningResult:
+    def __init__(self, mode, writes, elapsed):
+        self.mode = mode
+        self.writes = writes
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return f"{self.mode} provisioning: {self.writes} writes in {self.elapsed * 1000:.0f} ms"
+
+
+def encode_fields(fields):
+    # fields is a list of (field type, str); each value must fit a one byte length
+    payload = bytearray([PROVISION_VERSION])
+    for field_type, value in fields:
+        data = value.encode('utf-8')
+        if len(data) > 255:
+            raise ValueError(f"provisioning field {field_type} is longer than 255 bytes")
+        payload += bytes([field_type, len(data)]) + data
+    return bytes(payload)
+
+
+def frame_chunks(payload, chunk_size):
+    data_size = chunk_size - 1
+    if data_size < 1:
+        raise ValueError(f"chunk size {chunk_size} leaves no room for data")
+    pieces = [payload[i:i + data_size] for i in range(0, len(payload), data_size)] or [b""]
+    if len(pieces) > MAX_CHUNKS:
+        raise ValueError(f"provisioning payload needs {len(pieces)} chunks, limit is {MAX_CHUNKS}")
+    last = len(pieces) - 1
+    return [bytes([index | (LAST_CHUNK if index == last else 0)]) + piece for index, piece in enumerate(pieces)]
+
+
+def provisioning_characteristic(client):
+    # None when the board runs firmware without the batched characteristic
+    services = getattr(client, "services", None)
+    return services.get_characteristic(PROVISION_CHAR_UUID) if services else None
+
+
+async def write_batched(client, characteristic, payload):
+    # Every chunk but the last goes without response; the acknowledged final
+    # write is the single round-trip and arrives after the earlier chunks.
+    chunk_size = min(characteristic.max_write_without_response_size, PROVISION_CHUNK_SIZE)
+    chunks = frame_chunks(payload, chunk_size)
+    for chunk in chunks[:-1]:
+        await client.write_gatt_char(characteristic, chunk, response=False)
+    await client.write_gatt_char(characteristic, chunks[-1], response=True)
+    return len(chunks)
+
+
+async def write_separately(client, ssid, wifi_password, game_id, player_id, use_type="play", verbose=True):
+    fields = [
+        (SSID_CHAR_UUID, ssid, "SSID updated."),
+        (PASSWORD_CHAR_UUID, wifi_password, "Password updated."),
+        (GAMEID_CHAR_UUID, game_id, "Game ID updated."),
+        (PLAYERID_CHAR_UUID, player_id, "User ID updated."),
+        (USE_TYPE_CHAR_UUID, use_type, "Use type updated."),
+    ]
+    for uuid, value, message in fields:
+        await client.write_gatt_char(uuid, value.encode('utf-8'))
+        if verbose:
+            print(message)
+    return len(fields)
+
+
+async def provision(client, ssid, wifi_password, game_id, player_id, use_type="play", batched=True, verbose=True):
+    # One framed write when the board supports it, otherwise the five
+    # per-field characteristics. Returns a ProvisioningResult with timing.
+    start = time.perf_counter()
+    characteristic = provisioning_characteristic(client) if batched else None
+    if characteristic is not None:
+        payload = encode_fields([
+            (FIELD_SSID, ssid),
+            (FIELD_PASSWORD, wifi_password),
+            (FIELD_GAME_ID, game_id),
+            (FIELD_PLAYER_ID, player_id),
+            (FIELD_USE_TYPE, use_type),
+        ])
+        writes = await write_batched(client, characteristic, payload)
+        return ProvisioningResult("batched", writes, time.perf_counter() - start)
+
+    writes = await write_separately(client, ssid, wifi_password, game_id, player_id, use_type, verbose)
+    return ProvisioningResult("per-characteristic", writes, time.perf_counter() - start)
@@ -0,0 +1,136 @@
+'''
+Push positions to the board as changed squares instead of FEN strings.
+
+A diff frame is FRAME.size (11) bytes:
+  [header][changed-square mask, 8 bytes little-endian][piece codes, 2 bytes]
+The mask has bit n set for square n (a1 = 0 .. h8 = 63) and the codes hold one
+of game_record's 4-bit piece codes per set bit, lowest square in the lowest
+nibble. A normal move fits one frame (castling changes four squares). Larger
+updates are split over several frames with MORE set on all but the last.
+
+A full frame (RESET set) replaces the board's whole state:
+  [header][occupancy mask, 8 bytes][one nibble per occupied square]
+It is 25 bytes for the starting position. It is sent first after connecting,
+and instead of diff frames whenever it would be smaller.
+Header bits 0-5 count updates modulo 64 so the board can notice a lost one.
+'''
+
+import struct
+import chess
+from ble_provisioning import BOARD_DIFF_CHAR_UUID
+from game_record import pack_nibbles, piece_code, unpack_nibbles
+
+FRAME = struct.Struct("<BQH")
+FULL_HEADER = struct.Struct("<BQ")
+SLOTS = 4
+MORE = 0x80
+RESET = 0x40
+SEQUENCE_MASK = 0x3F
+
+
+def board_codes(fen):
+    board = chess.BaseBoard(fen.split(" ", 1)[0])
+    return [piece_code(board.piece_at(square)) for square in chess.SQUARES]
+
+
+def diff_codes(before, after):
+    return [(square, code) for square, (old, code) in enumerate(zip(before, after)) if old != code]
+
+
+def encode_frames(changes, sequence):
+    # changes is [(square, piece code)] in ascending square order
+    frames = []
+    for start in range(0, len(changes), SLOTS):
+        chunk = changes[start:start + SLOTS]
+        mask = 0
+        codes = 0
+        for slot, (square, code) in enumerate(chunk):
+            mask |= 1 << square
+            codes |= code << (4 * slot)
+        header = sequence & SEQUENCE_MASK
+        if start + SLOTS < len(changes):
+            header |= MORE
+        frames.append(FRAME.pack(header, mask, codes))
+    return frames
+
+
+def encode_full_frame(codes, sequence):
+    occupied = [code for code in codes if code]
+    mask = sum(1 << square for square, code in enumerate(codes) if code)
+    return FULL_HEADER.pack(RESET | (sequence & SEQUENCE_MASK), mask) + pack_nibbles(occupied)
+
+
+def full_frame_size(codes):
+    return FULL_HEADER.size + (sum(1 for code in codes if code) + 1) // 2
+
+
+def decode_frame(data):
+    # Returns (header, [(square, piece code)]); a full frame lists only occupied squares
+    data = bytes(data)
+    header, mask = FULL_HEADER.unpack_from(data)
+    squares = list(chess.scan_forward(mask))
+    if header & RESET:
+        codes = unpack_nibbles(data[FULL_HEADER.size:], len(squares))
+    else:
+        packed = struct.unpack_from("<H", data, FULL_HEADER.size)[0]
+        codes = [(packed >> (4 * slot)) & 15 for slot in range(len(squares))]
+    return header, list(zip(squares, codes))
+
+
+class BoardDiffEncoder:
+    """Turns successive FENs into frames relative to what the board last received."""
+
+    def __init__(self):
+        self.codes = None
+        self.sequence = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def update(self, fen):
+        codes = board_codes(fen)
+        if self.codes is None:
+            frames = [encode_full_frame(codes, self.sequence)]
+        else:
+            changes = diff_codes(self.codes, codes)
+            if not changes:
+                return []
+            frame_count = (len(changes) + SLOTS - 1) // SLOTS
+            if frame_count * FRAME.size > full_frame_size(codes):
+                frames = [encode_full_frame(codes, self.sequence)]
+            else:
+                frames = encode_frames(changes, self.sequence)
+        self.codes = codes
+        self.sequence = (self.sequence + 1) & SEQUENCE_MASK
+        self.frames_sent += len(frames)
+        self.bytes_sent += sum(len(frame) for frame in frames)
+        return frames
+
+
+class BoardDiffDecoder:
+    """The board's side of the protocol, mirroring apply_board_diff() in chess_arduino.ino."""
+
+    def __init__(self):
+        self.codes = [0] * 64
+        self.expected = None
+        self.missed = 0
+
+    def apply(self, data):
+        # Returns True once the last frame of an update has been applied
+        header, changes = decode_frame(data)
+        sequence = header & SEQUENCE_MASK
+        if header & RESET:
+            self.codes = [0] * 64
+        elif self.expected is not None and sequence != self.expected:
+            self.missed += (sequence - self.expected) & SEQUENCE_MASK
+        for square, code in changes:
+            self.codes[square] = code
+        if header & MORE:
+            self.expected = sequence
+            return False
+        self.expected = (sequence + 1) & SEQUENCE_MASK
+        return True
+
+
+async def push_position(client, encoder, fen):
+    for frame in encoder.update(fen):
+        await client.write_gatt_char(BOARD_DIFF_CHAR_UUID, frame, response=True)
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from ble_provisioning import BOARD_EVENT_CHAR_UUID
+from board_diff import BoardDiffEncoder, push_position
+from game_model import GameModel
+from game_session import MessageDispatcher
+
+
+class BoardEvent:
+    def __init__(self, sequence, board_ms, kind, detail, received):
+        self.sequence = sequence
+        self.board_ms = board_ms
+        self.kind = kind
+        self.detail = detail
+        self.received = received
+
+
+def parse_board_event(data, received):
+    # "<sequence>,<millis>,<kind>,<detail>" as written by notify_board_event()
+    try:
+        sequence, board_ms, kind, detail = bytes(data).decode('utf-8').split(",", 3)
+        return BoardEvent(int(sequence), int(board_ms), kind, detail, received)
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+class BoardEventStream:
+    """Board notifications as an async iterator of BoardEvent.
+
+    The board's millis() clock is mapped onto time.perf_counter() using the
+    smallest (receive time - board time) seen so far, so detected_at() treats
+    the fastest notification as having zero BLE delay.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.queue = asyncio.Queue()
+        self.last_sequence = None
+        self.missed = 0
+        self.offset = None
+
+    async def start(self):
+        await self.client.start_notify(BOARD_EVENT_CHAR_UUID, self._on_notify)
+
+    async def stop(self):
+        try:
+            await self.client.stop_notify(BOARD_EVENT_CHAR_UUID)
+        finally:
+            self.queue.put_nowait(None)
+
+    def _on_notify(self, sender, data):
+        event = parse_board_event(data, time.perf_counter())
+        if event is None:
+            return
+        if self.last_sequence is not None and event.sequence > self.last_sequence + 1:
+            self.missed += event.sequence - self.last_sequence - 1
+        self.last_sequence = event.sequence
+        offset = event.received - event.board_ms / 1000
+        if self.offset is None or offset < self.offset:
+            self.offset = offset
+        self.queue.put_nowait(event)
+
+    def detected_at(self, event):
+        return event.board_ms / 1000 + self.offset
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class RelayStats:
+    """Physical move to server confirmation, split at the BLE notification."""
+
+    def __init__(self):
+        self.samples = {"detect->notify": [], "notify->confirm": [], "detect->confirm": []}
+
+    def record(self, detected, received, confirmed):
+        self.samples["detect->notify"].append(received - detected)
+        self.samples["notify->confirm"].append(confirmed - received)
+        self.samples["detect->confirm"].append(confirmed - detected)
+
+    def summary(self):
+        lines = []
+        for metric, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            p50 = ordered[len(ordered) // 2] * 1000
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+            lines.append(f"{metric:<16} n={len(ordered)} p50={p50:.1f} ms p95={p95:.1f} ms max={ordered[-1] * 1000:.1f} ms")
+        return "\n".join(lines) or "No moves relayed."
+
+
+async def follow_server(dispatcher, model, updates, push):
+    # Keep the local board, and the physical board's expected state, in step with opponent moves and resyncs
+    while True:
+        data = await dispatcher.get(updates)
+        model.sync(data["fen"], data.get("move"))
+        await push(model.board.fen())
+
+
+async def relay_moves(stream, dispatcher, model, player_id, stats, push):
+    async for event in stream:
+        if event.kind == "reset":
+            print("Board was reset.")
+            break
+        if event.kind != "move":
+            continue
+
+        move = model.legal_move(event.detail[:2], event.detail[2:4], event.detail[4:] or None)
+        if move is None:
+            print(f"Board reported an illegal move: {event.detail}")
+            continue
+
+        response = await dispatcher.send_move({
+            "message_type": "move",
+            "playerID": player_id,
+            "move": model.move_payload(move)
+        })
+        confirmed = time.perf_counter()
+        if response is None or response.get("message_type") != "confirmation":
+            print(f"Move {event.detail} not confirmed: {response}")
+            continue
+        # follow_server may already have applied our move from the broadcast frame
+        model.sync(response["fen"], model.move_payload(move))
+        await push(model.board.fen())
+        stats.record(stream.detected_at(event), event.received, confirmed)
+        print(f"Relayed {event.detail} in {(confirmed - stream.detected_at(event)) * 1000:.0f} ms")
+        if response.get("game_over"):
+            break
+
+
+async def relay_game(client, session, player_id):
+    """Forward moves detected on the board to the game's WebSocket until the
+    game ends or the board is reset. Returns RelayStats."""
+    model = GameModel()
+    stats = RelayStats()
+    dispatcher = MessageDispatcher(session)
+    updates = dispatcher.subscribe("game-state", "move")
+    stream = BoardEventStream(client)
+    encoder = BoardDiffEncoder()
+    push_lock = asyncio.Lock()
+
+    async def push(fen):
+        # Keeps a multi-frame update from interleaving with another
+        async with push_lock:
+            await push_position(client, encoder, fen)
+
+    dispatcher.start()
+    follower = asyncio.create_task(follow_server(dispatcher, model, updates, push))
+    try:
+        await stream.start()
+        await push(model.board.fen())
+        await relay_moves(stream, dispatcher, model, player_id, stats, push)
+    finally:
+        follower.cancel()
+        await asyncio.gather(follower, return_exceptions=True)
+        try:
+            await stream.stop()
+        finally:
+            await dispatcher.stop()
+    if stream.missed:
+        print(f"{stream.missed} board event(s) missed")
+    if encoder.frames_sent:
+        print(f"Board updates: {encoder.frames_sent} frames, {encoder.bytes_sent} bytes")
+    return stats
@@ -131,6 +131,20 @@ WebSocketClient wsClient(wifiClient, serverAddress, port);
 #define PLAYERID_CHAR_UUID "bcf9cb8c-78f4-4b22-8f2c-ad5df34a34cd"
 #define RESET_CHAR_UUID "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e2"
 #define USE_TYPE_CHAR_UUID "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e3"
+#define PROVISION_CHAR_UUID "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e4"
+#define BOARD_EVENT_CHAR_UUID "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e5"
+#define BOARD_DIFF_CHAR_UUID "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e7"
+
+// Batched provisioning: one framed payload [version][type][length][value]... split into
+// chunks of [sequence | 0x80 on the last chunk][data] written to a single characteristic
+#define PROVISION_VERSION 1
+#define PROVISION_CHUNK_SIZE 244
+#define PROVISION_LAST_CHUNK 0x80
+#define FIELD_SSID 1
+#define FIELD_PASSWORD 2
+#define FIELD_GAME_ID 3
+#define FIELD_PLAYER_ID 4
+#define FIELD_USE_TYPE 5
 
 // Create BLE Service and Characteristics
 BLEService gameService(GAMESERVICE_CHAR_UUID);
@@ -140,6 +154,33 @@ BLEStringCharacteristic gameIDCharacteristic(GAMEID_CHAR_UUID, BLERead | BLEWrit
 BLEStringCharacteristic playerIDCharacteristic(PLAYERID_CHAR_UUID, BLERead | BLEWrite, 50);
 BLEByteCharacteristic resetCharacteristic(RESET_CHAR_UUID, BLEWrite);
 BLEStringCharacteristic useTypeCharacteristic(USE_TYPE_CHAR_UUID, BLERead | BLEWrite, 50);
+BLECharacteristic provisionCharacteristic(PROVISION_CHAR_UUID, BLEWrite | BLEWriteWithoutResponse, PROVISION_CHUNK_SIZE);
+
+uint8_t provisionBuffer[512];
+int provisionLength = 0;
+int provisionNextChunk = -1; // -1 = waiting for the first chunk of a payload
+
+// Board events notified to the phone as "<sequence>,<millis>,<kind>,<detail>", e.g. "7,123456,move,e2e4"
+BLEStringCharacteristic boardEventCharacteristic(BOARD_EVENT_CHAR_UUID, BLERead | BLENotify, 64);
+unsigned long boardEventSequence = 0;
+
+// Position updates from the phone, see board_diff.py:
+// diff frame, 11 bytes: [header][changed square mask, 8 bytes little-endian][4 piece codes, one nibble per set mask bit]
+// full frame (bit 6 set): [header][occupancy mask, 8 bytes][one nibble per occupied square], replaces the whole board
+// header bit 7 = more frames follow, bit 6 = full frame, bits 0-5 = update sequence
+// Squares are 0 = a1 .. 63 = h8; piece codes are 0 = empty, 1-6 = white P N B R Q K, 9-14 = black
+#define BLACK_PIECE_CODE 8
+#define BOARD_DIFF_FRAME_SIZE 11
+#define BOARD_DIFF_MASK_END 9
+#define BOARD_DIFF_MAX_FRAME_SIZE 41
+#define BOARD_DIFF_SLOTS 4
+#define BOARD_DIFF_MORE 0x80
+#define BOARD_DIFF_RESET 0x40
+#define BOARD_DIFF_SEQUENCE 0x3F
+BLECharacteristic boardDiffCharacteristic(BOARD_DIFF_CHAR_UUID, BLEWrite, BOARD_DIFF_MAX_FRAME_SIZE);
+String boardDiffSquares = "";
+int boardDiffExpected = -1;
+int boardDiffMissed = 0;
 
 void setup()
 {
@@ -162,6 +203,12 @@ void setup()
     gameService.addCharacteristic(playerIDCharacteristic);
     gameService.addCharacteristic(resetCharacteristic);
     gameService.addCharacteristic(useTypeCharacteristic);
+    gameService.addCharacteristic(provisionCharacteristic);
+    gameService.addCharacteristic(boardEventCharacteristic);
+    gameService.addCharacteristic(boardDiffCharacteristic);
+    // Chunks written without response can arrive faster than the loop polls, so handle each write as it lands
+    provisionCharacteristic.setEventHandler(BLEWritten, on_provision_written);
+    boardDiffCharacteristic.setEventHandler(BLEWritten, on_board_diff_written);
 
     BLE.addService(gameService);
     BLE.advertise();
@@ -201,6 +248,9 @@ void loop()
     if (String(useType) == "play") {
         play_game(); // Starts the game with proper connection
     }
+    else if (String(useType) == "relay") {
+        relay_game(); // Phone forwards detected moves to the server over its own connection
+    }
     else if (String(useType) == "replay") {
         replay_game(); // ReVIsualize history of a completed game
     }       
@@ -208,7 +258,127 @@ void loop()
     reset = 0;           // Setting here so that checking characteristics can propagate through all functions
 }
 
-void replay_game() {}
+// Arrow keys are reported to the phone, which answers with position updates (on_board_diff_written)
+void replay_game()
+{
+    upPressed = downPressed = leftPressed = rightPressed = false;
+    while (BLE.connected() && !reset)
+    {
+        if (rightPressed) { rightPressed = false; notify_board_event("key", "right", millis()); }
+        if (leftPressed)  { leftPressed = false;  notify_board_event("key", "left", millis()); }
+        if (upPressed)    { upPressed = false;    notify_board_event("key", "up", millis()); }
+        if (downPressed)  { downPressed = false;  notify_board_event("key", "down", millis()); }
+
+        BLE.poll();
+        read_ble_characteristics();
+    }
+    if (reset)
+    {
+        clear_characteristics();
+        notify_board_event("reset", "", millis());
+    }
+}
+
+// Report detected moves over BLE only; the phone relays them to the game server
+void relay_game()
+{
+    while (BLE.connected() && !reset)
+    {
+        std::pair<String, String> move = get_move();
+        unsigned long detectedAt = millis();
+        if (move.first.length() > 0 && move.second.length() > 0)
+        {
+            notify_board_event("move", move.first + move.second, detectedAt);
+        }
+        fromSquare = "";
+        toSquare = "";
+        sendButtonPressed = false;
+        BLE.poll();
+        read_ble_characteristics();
+    }
+    if (reset)
+    {
+        clear_characteristics();
+        notify_board_event("reset", "", millis());
+    }
+}
+
+// Apply one position update frame to expected_board_state
+void on_board_diff_written(BLEDevice central, BLECharacteristic characteristic)
+{
+    int length = characteristic.valueLength();
+    if (length < BOARD_DIFF_MASK_END)
+    {
+        return;
+    }
+    if (!(characteristic.value()[0] & BOARD_DIFF_RESET) && length != BOARD_DIFF_FRAME_SIZE)
+    {
+        return;
+    }
+    apply_board_diff(characteristic.value(), length);
+}
+
+void apply_board_diff(const uint8_t *frame, int length)
+{
+    uint8_t header = frame[0];
+    int sequence = header & BOARD_DIFF_SEQUENCE;
+    // Diff frames carry up to 4 codes, full frames two per byte after the mask
+    int slots = BOARD_DIFF_SLOTS;
+    if (header & BOARD_DIFF_RESET)
+    {
+        memset(expected_board_state, 0, sizeof(expected_board_state));
+        boardDiffSquares = "";
+        slots = (length - BOARD_DIFF_MASK_END) * 2;
+    }
+    else if (boardDiffExpected >= 0 && sequence != boardDiffExpected)
+    {
+        boardDiffMissed++;
+    }
+
+    int slot = 0;
+    for (int byteIndex = 0; byteIndex < 8 && slot < slots; byteIndex++)
+    {
+        for (int bit = 0; bit < 8 && slot < slots; bit++)
+        {
+            if (!(frame[1 + byteIndex] & (1 << bit)))
+            {
+                continue;
+            }
+            int square = byteIndex * 8 + bit;
+            int code = (frame[BOARD_DIFF_MASK_END + slot / 2] >> (4 * (slot % 2))) & 0x0F;
+            slot++;
+            // expected_board_state is indexed from rank 8 down, matching fen_to_expected_board()
+            int row = 7 - square / 8;
+            int col = square % 8;
+            if (code == 0)
+            {
+                expected_board_state[row][col] = 0;
+            }
+            else
+            {
+                expected_board_state[row][col] = code & BLACK_PIECE_CODE ? 1 : -1;
+            }
+            boardDiffSquares += indexToSquare(row, col);
+        }
+    }
+
+    if (header & BOARD_DIFF_MORE)
+    {
+        boardDiffExpected = sequence;
+        return;
+    }
+    boardDiffExpected = (sequence + 1) & BOARD_DIFF_SEQUENCE;
+    update_last_board_state();
+    update_LEDS(boardDiffSquares, 1);
+    boardDiffSquares = "";
+}
+
+void notify_board_event(String kind, String detail, unsigned long timestamp)
+{
+    boardEventSequence++;
+    String event = String(boardEventSequence) + "," + String(timestamp) + "," + kind + "," + detail;
+    boardEventCharacteristic.writeValue(event);
+}
 
 void check_connections()
 {
@@ -222,6 +392,7 @@ void check_characteristics()
     if (reset)
     {
         clear_characteristics();
+        notify_board_event("reset", "", millis());
     }
 }
 
@@ -239,6 +410,101 @@ void clear_characteristics()
     playerIDCharacteristic.setValue("");
     resetCharacteristic.setValue(0);
     useTypeCharacteristic.setValue("");
+    provisionLength = 0;
+    provisionNextChunk = -1;
+}
+
+// Reassemble the batched provisioning payload one chunk at a time
+void on_provision_written(BLEDevice central, BLECharacteristic characteristic)
+{
+    int length = characteristic.valueLength();
+    const uint8_t *chunk = characteristic.value();
+    if (length < 1)
+    {
+        return;
+    }
+
+    int sequence = chunk[0] & ~PROVISION_LAST_CHUNK;
+    if (sequence == 0)
+    {
+        provisionLength = 0;
+    }
+    else if (sequence != provisionNextChunk)
+    {
+        // Lost or repeated chunk, drop the payload and wait for the next one
+        Serial.println("Provisioning chunk out of order");
+        provisionNextChunk = -1;
+        return;
+    }
+    if (provisionLength + length - 1 > (int)sizeof(provisionBuffer))
+    {
+        Serial.println("Provisioning payload too large");
+        provisionNextChunk = -1;
+        return;
+    }
+
+    memcpy(provisionBuffer + provisionLength, chunk + 1, length - 1);
+    provisionLength += length - 1;
+    provisionNextChunk = sequence + 1;
+
+    if (chunk[0] & PROVISION_LAST_CHUNK)
+    {
+        apply_provisioning(provisionBuffer, provisionLength);
+        provisionNextChunk = -1;
+    }
+}
+
+// Copy a length-prefixed field into a NUL terminated buffer
+void copy_field(char *dest, int size, const uint8_t *value, int length)
+{
+    int n = length < size - 1 ? length : size - 1;
+    memcpy(dest, value, n);
+    dest[n] = '\0';
+}
+
+void apply_provisioning(const uint8_t *payload, int length)
+{
+    if (length < 1 || payload[0] != PROVISION_VERSION)
+    {
+        Serial.println("Unknown provisioning payload version");
+        return;
+    }
+
+    int i = 1;
+    while (i + 2 <= length && i + 2 + payload[i + 1] <= length)
+    {
+        int type = payload[i];
+        int fieldLength = payload[i + 1];
+        const uint8_t *value = payload + i + 2;
+        switch (type)
+        {
+        case FIELD_SSID:
+            copy_field(ssid, sizeof(ssid), value, fieldLength);
+            break;
+        case FIELD_PASSWORD:
+            copy_field(password, sizeof(password), value, fieldLength);
+            break;
+        case FIELD_GAME_ID:
+            copy_field(gameID, sizeof(gameID), value, fieldLength);
+            break;
+        case FIELD_PLAYER_ID:
+            copy_field(playerID, sizeof(playerID), value, fieldLength);
+            break;
+        case FIELD_USE_TYPE:
+            copy_field(useType, sizeof(useType), value, fieldLength);
+            break;
+        }
+        i += 2 + fieldLength;
+    }
+
+    Serial.print("Provisioned SSID: ");
+    Serial.print(ssid);
+    Serial.print(", Game ID: ");
+    Serial.print(gameID);
+    Serial.print(", User ID: ");
+    Serial.print(playerID);
+    Serial.print(", Use Type: ");
+    Serial.println(useType);
 }
 
 void read_ble_characteristics()
@@ -403,6 +669,7 @@ void play_game()
             if (myTurn)
             {
                 std::pair<String, String> move = get_move();
+                notify_board_event("move", move.first + move.second, millis());
                 send_move(move.first, move.second); // Confirmations will be handled by get_messages
             }
             else if (opponentsTurn)
@@ -846,6 +1113,7 @@ void validate_opponent_move()
 // String to send update to LED, determined by messageType
 // messageType 1 = opponent move
 // messageType 2 = emoji
+// messageType 3 = replay, s lists the squares that changed
 void update_LEDS(String s, int messageType)
 {
 }
@@ -0,0 +1,424 @@
+'''
+Local chess engine for AI games.
+
+Alpha-beta (negamax) search with iterative deepening, a transposition table,
+quiescence search on captures and move ordering (hash move, MVV-LVA captures,
+killer moves, history heuristic), stopped by a node/time budget. Move
+generation comes from python-chess; the search and evaluation live here.
+An optional opening book and shared position cache (opening_book.py) are
+consulted before searching.
+
+The difficulty values sent by the CLIs ("easy", "medium", "hard") map to
+search limits in DIFFICULTY_LIMITS.
+
+  python chess_engine.py --fen "<fen>" --difficulty hard
+  python chess_engine.py --bench
+'''
+
+import argparse
+import time
+import chess
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = MATE_SCORE + 1
+TT_SIZE = 1 << 20
+TIME_CHECK_NODES = 1024
+
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+
+PIECE_VALUES = [0, 100, 320, 330, 500, 900, 0]
+
+# Piece-square tables from White's point of view, a1 = index 0
+PAWN_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+ROOK_TABLE = [
+    0, 0, 0, 5, 5, 0, 0, 0,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+QUEEN_TABLE = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+KING_TABLE = [
+    20, 30, 10, 0, 0, 10, 30, 20,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+]
+
+
+def build_square_values():
+    # [color][piece_type][square] -> material + placement, Black mirrored
+    tables = [None, PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE]
+    values = [[None] * 7, [None] * 7]
+    for piece_type in chess.PIECE_TYPES:
+        white = [PIECE_VALUES[piece_type] + tables[piece_type][square] for square in chess.SQUARES]
+        values[chess.WHITE][piece_type] = white
+        values[chess.BLACK][piece_type] = [white[chess.square_mirror(square)] for square in chess.SQUARES]
+    return values
+
+
+SQUARE_VALUES = build_square_values()
+
+
+class SearchLimits:
+    def __init__(self, depth=64, time=None, nodes=None, cache_depth=None):
+        self.depth = depth
+        self.time = time
+        self.nodes = nodes
+        # Shallowest cached result that may stand in for this search
+        self.cache_depth = depth if cache_depth is None else cache_depth
+
+
+DIFFICULTY_LIMITS = {
+    "easy": SearchLimits(depth=1, time=0.2),
+    "medium": SearchLimits(depth=3, time=1.0),
+    "hard": SearchLimits(depth=64, time=3.0, cache_depth=5),
+}
+DEFAULT_DIFFICULTY = "medium"
+
+
+class SearchResult:
+    def __init__(self, move, score, depth, nodes, elapsed, source="search"):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.source = source
+
+    @property
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (f"{self.move.uci() if self.move else '(none)'} from {self.source} score {self.score} depth {self.depth} "
+                f"nodes {self.nodes} in {self.elapsed * 1000:.0f} ms ({self.nps:.0f} nodes/s)")
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def position_hash(board):
+    # Everything that decides the legal moves; cheaper than a Zobrist hash in pure Python
+    return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK],
+            board.turn, board.castling_rights, board.ep_square if board.has_legal_en_passant() else None)
+
+
+def score_to_tt(score, ply):
+    # Mate scores count plies from the root; the table stores them from the node instead
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def evaluate(board):
+    # Material plus piece-square tables, from the side to move's point of view
+    score = 0
+    for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+        occupied = board.occupied_co[color]
+        values = SQUARE_VALUES[color]
+        for piece_type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                                 (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                                 (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+            table = values[piece_type]
+            for square in chess.scan_forward(mask & occupied):
+                score += sign * table[square]
+    return score if board.turn == chess.WHITE else -score
+
+
+class Engine:
+    """Searches one position at a time; keeps its transposition table between
+    searches, so reuse one Engine per game. The book and cache may be shared."""
+
+    def __init__(self, tt_size=TT_SIZE, book=None, cache=None):
+        self.book = book
+        self.cache = cache
+        self.tt_size = tt_size
+        self.tt = {}
+        self.history = {}
+        self.killers = []
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+
+    def clear(self):
+        self.tt.clear()
+        self.history.clear()
+
+    def search(self, board, limits=None):
+        limits = limits or DIFFICULTY_LIMITS[DEFAULT_DIFFICULTY]
+        start = time.perf_counter()
+        known = self.known_move(board, limits)
+        if known is not None:
+            known.elapsed = time.perf_counter() - start
+            return known
+
+        # Only moves since the last capture or pawn move can repeat, so keep just those for is_repetition
+        board = board.copy(stack=board.halfmove_clock)
+        self.nodes = 0
+        self.deadline = start + limits.time if limits.time else None
+        self.node_limit = limits.nodes
+        self.killers = [[None, None] for _ in range(limits.depth + 64)]
+        if len(self.tt) > self.tt_size:
+            self.tt.clear()
+
+        legal = list(board.legal_moves)
+        if not legal:
+            return SearchResult(None, 0, 0, 0, 0.0)
+        best = SearchResult(legal[0], 0, 0, 0, 0.0)
+
+        for depth in range(1, limits.depth + 1):
+            try:
+                score = self.negamax(board, depth, -INFINITY, INFINITY, 0)
+            except SearchTimeout:
+                break
+            entry = self.tt.get(position_hash(board))
+            if entry is not None and entry[3] is not None:
+                best = SearchResult(entry[3], score, depth, self.nodes, 0.0)
+            # A forced mate will not get better with more depth
+            if abs(score) >= MATE_THRESHOLD or len(legal) == 1:
+                break
+
+        best.nodes = self.nodes
+        best.elapsed = time.perf_counter() - start
+        if self.cache is not None and best.depth:
+            self.cache.put(board, best.move, best.score, best.depth)
+        return best
+
+    def known_move(self, board, limits):
+        # Book first, then a cached search at least as deep as this one would go
+        if self.book is not None:
+            move = self.book.move(board)
+            if move is not None and board.is_legal(move):
+                return SearchResult(move, 0, 0, 0, 0.0, source="book")
+        if self.cache is not None:
+            entry = self.cache.get(board, limits.cache_depth)
+            if entry is not None and board.is_legal(entry.move):
+                return SearchResult(entry.move, entry.score, entry.depth, 0, 0.0, source="cache")
+        return None
+
+    def check_budget(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+
+    def order_moves(self, board, moves, hash_move, ply):
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        history = self.history
+
+        def score(move):
+            if move == hash_move:
+                return 10000000
+            if board.is_capture(move):
+                # MVV-LVA: most valuable victim first, least valuable attacker as tie-break
+                victim = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+                return 1000000 + PIECE_VALUES[victim] * 10 - board.piece_type_at(move.from_square)
+            if move.promotion:
+                return 900000 + PIECE_VALUES[move.promotion]
+            if move == killers[0]:
+                return 800000
+            if move == killers[1]:
+                return 700000
+            return history.get((board.turn, move.from_square, move.to_square), 0)
+
+        return sorted(moves, key=score, reverse=True)
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_NODES == 0:
+            self.check_budget()
+
+        if ply and (board.is_repetition(2) or board.halfmove_clock >= 100):
+            return 0
+
+        key = position_hash(board)
+        entry = self.tt.get(key)
+        hash_move = None
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, hash_move = entry
+            entry_score = score_from_tt(entry_score, ply)
+            if entry_depth >= depth and ply:
+                if entry_flag == TT_EXACT:
+                    return entry_score
+                if entry_flag == TT_LOWER and entry_score >= beta:
+                    return entry_score
+                if entry_flag == TT_UPPER and entry_score <= alpha:
+                    return entry_score
+
+        if depth <= 0:
+            return self.quiescence(board, alpha, beta, ply)
+
+        moves = list(board.legal_moves)
+        if not moves:
+            return -(MATE_SCORE - ply) if board.is_check() else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for move in self.order_moves(board, moves, hash_move, ply):
+            quiet = not board.is_capture(move) and not move.promotion
+            board.push(move)
+            try:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if quiet:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    history_key = (board.turn, move.from_square, move.to_square)
+                    self.history[history_key] = self.history.get(history_key, 0) + depth * depth
+                break
+
+        if best_score <= original_alpha:
+            flag = TT_UPPER
+        elif best_score >= beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        self.tt[key] = (depth, score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+    def quiescence(self, board, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_NODES == 0:
+            self.check_budget()
+
+        stand_pat = evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = list(board.generate_legal_captures())
+        for move in self.order_moves(board, captures, None, len(self.killers) - 1):
+            board.push(move)
+            try:
+                score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            finally:
+                board.pop()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def limits_for(difficulty):
+    return DIFFICULTY_LIMITS.get(difficulty or DEFAULT_DIFFICULTY, DIFFICULTY_LIMITS[DEFAULT_DIFFICULTY])
+
+
+def best_move(fen, difficulty=DEFAULT_DIFFICULTY, engine=None):
+    # Convenience wrapper for callers holding a FEN, e.g. the AI reply in a game server
+    engine = engine or Engine()
+    return engine.search(chess.Board(fen), limits_for(difficulty)).move
+
+
+BENCH_POSITIONS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bq1rk1/pp2bppp/2n1pn2/2pp4/3P4/2PBPN2/PP1N1PPP/R1BQ1RK1 w - - 0 8",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+
+
+def benchmark(difficulties=("easy", "medium", "hard")):
+    for difficulty in difficulties:
+        limits = limits_for(difficulty)
+        total_nodes = 0
+        total_time = 0.0
+        depths = []
+        for fen in BENCH_POSITIONS:
+            result = Engine().search(chess.Board(fen), limits)
+            total_nodes += result.nodes
+            total_time += result.elapsed
+            depths.append(result.depth)
+        count = len(BENCH_POSITIONS)
+        print(f"{difficulty:<7} avg time-to-move {total_time / count * 1000:7.0f} ms  "
+              f"avg depth {sum(depths) / count:4.1f}  {total_nodes / total_time:8.0f} nodes/s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Search a position with the local chess engine")
+    parser.add_argument("--fen", default=chess.STARTING_FEN, help="position to search")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTY_LIMITS), default=DEFAULT_DIFFICULTY)
+    parser.add_argument("--bench", action="store_true", help="report nodes/s and time-to-move for every difficulty")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.bench:
+        benchmark()
+    else:
+        print(Engine().search(chess.Board(args.fen), limits_for(args.difficulty)))
@@ -1,25 +1,25 @@
 import asyncio
-import websockets
-import http.client
 import json
-import chess
+import os
+from game_model import GameModel
+from game_session import GameSession, MessageDispatcher
+from http_session import HTTPSession, parse_base_url
 
 player_id = "EricC"
 password = "Fire1776"
-BASE_URL = "chess-app-v5.concannon-e.workers.dev"
+# Override with e.g. CHESS_APP_URL=http://127.0.0.1:8787 to target mock_server.py
+SERVER_URL = os.environ.get("CHESS_APP_URL", "https://chess-app-v5.concannon-e.workers.dev")
+BASE_URL, PORT, USE_TLS = parse_base_url(SERVER_URL)
 
-def display_fen_as_board(fen):
-    board = chess.Board(fen)
-    board_str = str(board)  # Get a string representation of the board
-    print(board_str)
+def display_board(model):
+    print(model.board)
 
 async def create_game(conn, token):
     headers = {
         "Content-Type": "application/json",
         "authorization": token
     }
-    conn.request("POST", f"/create?playerID={player_id}&ai={False}&depth=1", body=None, headers=headers)
-    response = conn.getresponse()
+    response = conn.request("POST", f"/create?playerID={player_id}&ai={False}&depth=1", body=None, headers=headers)
     
     if response.status == 200:
         data = json.loads(response.read().decode())
@@ -38,8 +38,7 @@ async def join_game(conn, token):
         "Content-Type": "application/json",
         "authorization": token
     }
-    conn.request("POST", f"/player/join-game?playerID={player_id}&game_id={game_id}", body=None, headers=headers)
-    response = conn.getresponse()
+    response = conn.request("POST", f"/player/join-game?playerID={player_id}&gameID={game_id}", body=None, headers=headers)
     
     if response.status == 200:
         print("Successfully joined game {game_id}")
@@ -47,20 +46,27 @@ async def join_game(conn, token):
         print("Already in game: {game_id}, reconnecting...")
         return game_id
     else:
-        print(f"Failed to join game. Status code: {response.status}, {json.loads(response.read().decode()).get("error")}")
+        print(f"Failed to join game. Status code: {response.status}, {json.loads(response.read().decode()).get('error')}")
         return None
     
     return game_id
 
 
-async def play_game(websocket):
+async def play_game(session):
     player_color = None
+    model = GameModel()
+
+    # One reader task owns the socket; board updates and chat get their own queues
+    dispatcher = MessageDispatcher(session)
+    board_updates = dispatcher.subscribe("game-state", "move")
+    player_messages = dispatcher.subscribe("player_message")
+    dispatcher.start()
+    chat_task = asyncio.create_task(show_player_messages(dispatcher, player_messages))
 
     try:
         while True:
             print("Next loop: waiting for message")
-            response = await websocket.recv()
-            data = json.loads(response)
+            data = await dispatcher.get(board_updates)
             print(data, type(data))
 
             # Handle game state update
@@ -69,85 +75,102 @@ async def play_game(websocket):
                 fen = data['fen']
                 print(f"Game State Updated: {fen}")
                 print(f"You are playing as {player_color}")
-                display_fen_as_board(fen)
+                model.sync(fen)
+                display_board(model)
                 
                 
                 # Prompt for move if it's the player's turn
                 if data['turn'] == player_color[0]:
-                    await send_move(websocket)
+                    await send_move(dispatcher, model)
 
             # Handle opponent's move
             elif data.get("message_type") == "move":
+                # AI replies only carry the resulting FEN, not the move
                 move = data.get("move")
-                print(f"Opponent moved: {move['from']} to {move['to']}")
+                if move:
+                    print(f"Opponent moved: {move['from']} to {move['to']}")
                 fen = data.get("fen")
-                display_fen_as_board(fen)
+                model.sync(fen, move)
+                display_board(model)
                 # Prompt for move if it's the player's turn
                 if data['turn'] == player_color[0]:
                     print("Your turn!")
-                    await send_move(websocket)
+                    await send_move(dispatcher, model)
+
+    except ConnectionError as e:
+        print(e)
+    finally:
+        chat_task.cancel()
+        try:
+            await chat_task
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        await dispatcher.stop()
 
-    except websockets.exceptions.ConnectionClosed as e:
-        print(f"WebSocket closed unexpectedly: {e.reason}")
-        await handle_reconnect()
 
+async def show_player_messages(dispatcher, queue):
+    while True:
+        data = await dispatcher.get(queue)
+        print(f"\nMessage from {data.get('playerID', 'opponent')}: {data.get('message')}")
 
-async def send_move(websocket):
+
+async def send_move(dispatcher, model):
 
     valid_move = False
     while not valid_move:
-        from_square, to_square = getMoveLogic()
+        from_square, to_square = await getMoveLogic()
+
+        # Reject illegal moves locally instead of paying a server round-trip
+        move = model.legal_move(from_square, to_square)
+        if move is None:
+            print(f"Illegal move: {from_square} to {to_square}")
+            continue
 
-        await websocket.send(json.dumps({
+        response = await dispatcher.send_move({
             "message_type": "move",
             "playerID": player_id,
-            "move": {
-                "from": from_square,
-                "to": to_square
-            }
-        }))
+            "move": model.move_payload(move)
+        })
+        if response is None:
+            # Reconnected; the next game-state decides whose turn it is
+            return
         print(f"Move sent: {from_square} to {to_square}")
-
-        try:
-            confirmation = await websocket.recv()
-            print(confirmation)
-            response = json.loads(confirmation)
-            print(response)
-
-            if response.get("message_type") == "confirmation":
-                valid_move = True
-                fen = response['fen']
-                display_fen_as_board(fen)
-                print(f"Move confirmed: {fen}")
-            else:
-                print(f"Illegal move: {response.get('error')}")
-        except websockets.exceptions.ConnectionClosed as e:
-            print(f"WebSocket closed during move confirmation: {e.reason}")
-            await handle_reconnect()
-
-
-def getMoveLogic():
-    from_square = input("Enter move from (e.g., e2): ")
-    to_square = input("Enter move to (e.g., e4): ")
+        print(response)
+
+        if response.get("message_type") == "confirmation":
+            valid_move = True
+            fen = response['fen']
+            model.push(move)
+            model.sync(fen)
+            display_board(model)
+            print(f"Move confirmed: {fen}")
+        elif response.get("message_type") == "game-state":
+            # Connection dropped while waiting; the board loop resyncs from this state
+            return
+        else:
+            print(f"Illegal move: {response.get('error')}")
+
+
+async def ainput(prompt):
+    # Read stdin on a worker thread so the reader task keeps draining frames
+    return await asyncio.to_thread(input, prompt)
+
+
+async def getMoveLogic():
+    from_square = await ainput("Enter move from (e.g., e2): ")
+    to_square = await ainput("Enter move to (e.g., e4): ")
     return from_square, to_square
 
 
-async def handle_reconnect():
-    print("Attempting to reconnect...")
-    await asyncio.sleep(1)  # Wait before reconnecting
-    await main()  # Re-run the main function to reconnect
-
-
 async def main():
     choice = input("Create (1) or Join (2) a game? (1/2): ")
     
     endpoint = f"/player/login?playerID={player_id}&password={password}"
 
-    conn = http.client.HTTPSConnection(BASE_URL)
+    conn = HTTPSession(BASE_URL, PORT, use_tls=USE_TLS)
 
-    conn.request("GET", endpoint, headers={"Content-Type": "application/json"}
+    response = conn.request("GET", endpoint, headers={"Content-Type": "application/json"}
 )
-    response = conn.getresponse()
     token = json.loads(response.read().decode()).get("token")
     if response.status == 200:
         print(f"Welcome {player_id}!")
@@ -161,12 +184,15 @@ async def main():
         return
 
     if game_id:
-        URL = f"wss://{BASE_URL}/connect?gameID={game_id}&playerID={player_id}"
-        token_header = {"authorization": token}
-        async with websockets.connect(URL, additional_headers=token_header) as websocket:
-            print(f"Connected to game {game_id} as {player_id}")
-            await play_game(websocket)
-    else: await handle_reconnect()
+        session = GameSession(f"{BASE_URL}:{PORT}", game_id, player_id, token, use_tls=USE_TLS)
+        await session.connect()
+        print(f"Connected to game {game_id} as {player_id}")
+        try:
+            await play_game(session)
+        finally:
+            await session.close()
+    else:
+        print("Could not create or join a game.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+import chess
+
+
+def position_key(fen):
+    # Piece placement, side to move and castling rights. The en passant
+    # field is left out because chess.js and python-chess disagree on when
+    # to print it, and the move clocks do not affect the position.
+    return " ".join(fen.split(" ")[:3])
+
+
+class GameModel:
+    """Local board kept in step with the server by applying move deltas.
+
+    Incoming FENs are checked against the local position with a string
+    comparison of their leading fields. The FEN is only parsed into the
+    board when the two disagree (first sync, missed frame, reconnect).
+    """
+
+    def __init__(self, fen=chess.STARTING_FEN):
+        self.board = chess.Board(fen)
+        self.key = position_key(self.board.fen())
+        self.resyncs = 0
+
+    def legal_move(self, from_square, to_square, promotion=None):
+        # Returns the chess.Move if legal, otherwise None. Pawn moves to the
+        # last rank promote to a queen unless told otherwise.
+        try:
+            move = chess.Move(chess.parse_square(from_square), chess.parse_square(to_square))
+            if promotion:
+                move.promotion = chess.Piece.from_symbol(promotion).piece_type
+        except ValueError:
+            return None
+        if not promotion and self.board.piece_type_at(move.from_square) == chess.PAWN and chess.square_rank(move.to_square) in (0, 7):
+            move.promotion = chess.QUEEN
+        return move if self.board.is_legal(move) else None
+
+    def move_payload(self, move):
+        payload = {"from": chess.square_name(move.from_square), "to": chess.square_name(move.to_square)}
+        if move.promotion:
+            payload["promotion"] = chess.piece_symbol(move.promotion)
+        return payload
+
+    def push(self, move):
+        self.board.push(move)
+        self.key = position_key(self.board.fen())
+
+    def sync(self, fen, move=None):
+        # Apply the {from, to} delta if one came with the frame, then verify.
+        # Returns True when the local board already matched the server.
+        if move is not None and position_key(fen) != self.key:
+            local_move = self.legal_move(move["from"], move["to"], move.get("promotion"))
+            if local_move is not None:
+                self.push(local_move)
+
+        if position_key(fen) == self.key:
+            return True
+
+        self.board.set_fen(fen)
+        self.key = position_key(self.board.fen())
+        self.resyncs += 1
+        return False
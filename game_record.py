@@ -0,0 +1,422 @@
+'''
+Compact binary store for archived games.
+
+Each move is packed into 16 bits (from, to, promotion). Every game keeps its
+players, result and start position in a small header, plus a packed board
+snapshot every CHECKPOINT_INTERVAL plies so any ply is at most that many
+moves away from a stored position. Games are located through a directory at
+the end of the file, so the memory-mapped reader opens a store without
+reading the games themselves.
+
+  python game_record.py import-pgn games.pgn -o archive.cgr
+  python game_record.py import-json replays.json -o archive.cgr
+  python game_record.py export-pgn archive.cgr -o games.pgn
+  python game_record.py show archive.cgr 12 --ply 40
+
+JSON games look like the Worker's /replay response with extra fields:
+  {"gameID": "...", "white": "...", "black": "...", "result": "1-0", "moves": ["e4", "e5", ...]}
+Moves may also be {"from": "e2", "to": "e4", "promotion": "q"} objects.
+'''
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+import chess
+import chess.pgn
+
+STORE_MAGIC = b"CGRS"
+STORE_VERSION = 1
+STORE_HEADER = struct.Struct("<4sHHIQ")       # magic, version, reserved, game count, directory offset
+GAME_HEADER = struct.Struct("<IHBBH")         # plies, checkpoint interval, result, reserved, checkpoint count
+DIRECTORY_ENTRY = struct.Struct("<Q")
+CHECKPOINT_INTERVAL = 32
+
+RESULTS = ["*", "1-0", "0-1", "1/2-1/2"]
+
+# 4-bit piece codes: piece type (1-6) for White, piece type | 8 for Black, 0 = empty
+BLACK_PIECE = 8
+POSITION_TAIL = struct.Struct("<QBBHH")       # occupancy, side | castling << 1, ep file + 1, halfmove, fullmove
+
+
+def piece_code(piece):
+    if piece is None:
+        return 0
+    return piece.piece_type | (0 if piece.color == chess.WHITE else BLACK_PIECE)
+
+
+def piece_from_code(code):
+    if not code:
+        return None
+    return chess.Piece(code & 7, chess.WHITE if code < BLACK_PIECE else chess.BLACK)
+
+
+# -----------------------
+# Moves and positions
+# -----------------------
+def encode_move(move):
+    # from | to << 6 | promotion piece type << 12
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(value):
+    promotion = (value >> 12) & 7
+    return chess.Move(value & 63, (value >> 6) & 63, promotion or None)
+
+
+def pack_nibbles(codes):
+    packed = bytearray((len(codes) + 1) // 2)
+    for index, code in enumerate(codes):
+        packed[index // 2] |= code << (4 * (index % 2))
+    return bytes(packed)
+
+
+def unpack_nibbles(data, count):
+    return [(data[index // 2] >> (4 * (index % 2))) & 15 for index in range(count)]
+
+
+def pack_board(board):
+    # Occupancy bitboard, then one nibble per occupied square in square order
+    occupied = board.occupied
+    codes = [piece_code(board.piece_at(square)) for square in chess.scan_forward(occupied)]
+    castling = sum(1 << bit for bit, square in enumerate((chess.H1, chess.A1, chess.H8, chess.A8))
+                   if board.castling_rights & chess.BB_SQUARES[square])
+    ep_file = chess.square_file(board.ep_square) + 1 if board.ep_square is not None else 0
+    flags = (0 if board.turn == chess.WHITE else 1) | (castling << 1)
+    return (POSITION_TAIL.pack(occupied, flags, ep_file, min(board.halfmove_clock, 0xFFFF), min(board.fullmove_number, 0xFFFF))
+            + pack_nibbles(codes))
+
+
+def unpack_board(data, offset=0):
+    # Returns (board, offset after the packed position)
+    occupied, flags, ep_file, halfmove, fullmove = POSITION_TAIL.unpack_from(data, offset)
+    offset += POSITION_TAIL.size
+    squares = list(chess.scan_forward(occupied))
+    size = (len(squares) + 1) // 2
+    codes = unpack_nibbles(data[offset:offset + size], len(squares))
+    board = chess.Board(None)
+    board.set_piece_map({square: piece_from_code(code) for square, code in zip(squares, codes)})
+    board.turn = chess.WHITE if flags & 1 == 0 else chess.BLACK
+    castling = flags >> 1
+    board.castling_rights = 0
+    for bit, square in enumerate((chess.H1, chess.A1, chess.H8, chess.A8)):
+        if castling & (1 << bit):
+            board.castling_rights |= chess.BB_SQUARES[square]
+    if ep_file:
+        board.ep_square = chess.square(ep_file - 1, 5 if board.turn == chess.WHITE else 2)
+    board.halfmove_clock = halfmove
+    board.fullmove_number = fullmove
+    return board, offset + size
+
+
+def check_interval(checkpoint_interval):
+    if not 0 < checkpoint_interval <= 0xFFFF:
+        raise ValueError(f"checkpoint interval must be between 1 and 65535 plies, got {checkpoint_interval}")
+
+
+def pack_string(value):
+    data = (value or "").encode("utf-8")[:255]
+    return bytes([len(data)]) + data
+
+
+def unpack_string(data, offset):
+    length = data[offset]
+    return bytes(data[offset + 1:offset + 1 + length]).decode("utf-8", errors="replace"), offset + 1 + length
+
+
+# -----------------------
+# Games
+# -----------------------
+class GameRecord:
+    def __init__(self, game_id="", white="", black="", result="*", start_fen=chess.STARTING_FEN, moves=None):
+        self.game_id = game_id
+        self.white = white
+        self.black = black
+        self.result = result if result in RESULTS else "*"
+        self.start_fen = start_fen
+        self.moves = moves or []
+
+    def board(self):
+        return chess.Board(self.start_fen)
+
+    @classmethod
+    def from_pgn(cls, game):
+        headers = game.headers
+        return cls(headers.get("GameID", headers.get("Site", "")), headers.get("White", ""), headers.get("Black", ""),
+                   headers.get("Result", "*"), game.board().fen(), list(game.mainline_moves()))
+
+    def to_pgn(self):
+        board = self.board()
+        game = chess.pgn.Game()
+        if self.start_fen != chess.STARTING_FEN:
+            game.setup(board)
+        game.headers["White"] = self.white or "?"
+        game.headers["Black"] = self.black or "?"
+        game.headers["Result"] = self.result
+        if self.game_id:
+            game.headers["GameID"] = self.game_id
+        node = game
+        for move in self.moves:
+            node = node.add_variation(move)
+        return game
+
+    @classmethod
+    def from_json(cls, data):
+        board = chess.Board(data.get("fen") or chess.STARTING_FEN)
+        start_fen = board.fen()
+        moves = []
+        for move in data.get("moves", []):
+            if isinstance(move, dict):
+                parsed = chess.Move(chess.parse_square(move["from"]), chess.parse_square(move["to"]))
+                if move.get("promotion"):
+                    parsed.promotion = chess.Piece.from_symbol(move["promotion"]).piece_type
+                elif board.piece_type_at(parsed.from_square) == chess.PAWN and chess.square_rank(parsed.to_square) in (0, 7):
+                    parsed.promotion = chess.QUEEN
+            else:
+                parsed = board.parse_san(move)
+            board.push(parsed)
+            moves.append(parsed)
+        return cls(data.get("gameID", ""), data.get("white", ""), data.get("black", ""),
+                   data.get("result", "*"), start_fen, moves)
+
+    def to_json(self):
+        board = self.board()
+        sans = []
+        for move in self.moves:
+            sans.append(board.san(move))
+            board.push(move)
+        data = {"gameID": self.game_id, "white": self.white, "black": self.black, "result": self.result, "moves": sans}
+        if self.start_fen != chess.STARTING_FEN:
+            data["fen"] = self.start_fen
+        return data
+
+    def encode(self, checkpoint_interval=CHECKPOINT_INTERVAL):
+        check_interval(checkpoint_interval)
+        board = self.board()
+        checkpoints = []
+        for ply, move in enumerate(self.moves, 1):
+            board.push(move)
+            if ply % checkpoint_interval == 0:
+                checkpoints.append(pack_board(board))
+
+        body = bytearray(GAME_HEADER.pack(len(self.moves), checkpoint_interval, RESULTS.index(self.result), 0, len(checkpoints)))
+        body += pack_string(self.game_id) + pack_string(self.white) + pack_string(self.black)
+        body += pack_string("" if self.start_fen == chess.STARTING_FEN else self.start_fen)
+        body += struct.pack(f"<{len(self.moves)}H", *(encode_move(move) for move in self.moves))
+        # Checkpoint offsets are relative to the start of the game block
+        offset = len(body) + 4 * len(checkpoints)
+        for checkpoint in checkpoints:
+            body += struct.pack("<I", offset)
+            offset += len(checkpoint)
+        for checkpoint in checkpoints:
+            body += checkpoint
+        return bytes(body)
+
+
+class StoredGame:
+    """A game inside a memory-mapped store; fields are decoded on access."""
+
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+        self.plies, self.checkpoint_interval, result, _, self.checkpoint_count = GAME_HEADER.unpack_from(data, offset)
+        self.result = RESULTS[result] if result < len(RESULTS) else "*"
+        position = offset + GAME_HEADER.size
+        self.game_id, position = unpack_string(data, position)
+        self.white, position = unpack_string(data, position)
+        self.black, position = unpack_string(data, position)
+        start_fen, position = unpack_string(data, position)
+        self.start_fen = start_fen or chess.STARTING_FEN
+        self.moves_offset = position
+        self.checkpoints_offset = position + 2 * self.plies
+
+    def __len__(self):
+        return self.plies
+
+    def move(self, ply):
+        # The move played at ply (0-based)
+        return decode_move(struct.unpack_from("<H", self.data, self.moves_offset + 2 * ply)[0])
+
+    def moves(self, start=0, end=None):
+        end = self.plies if end is None else min(end, self.plies)
+        if end <= start:
+            return []
+        values = struct.unpack_from(f"<{end - start}H", self.data, self.moves_offset + 2 * start)
+        return [decode_move(value) for value in values]
+
+    def board_at(self, ply):
+        # Position after `ply` moves, from the nearest checkpoint at or before it
+        ply = max(0, min(ply, self.plies))
+        checkpoint = ply // self.checkpoint_interval
+        if checkpoint:
+            relative = struct.unpack_from("<I", self.data, self.checkpoints_offset + 4 * (checkpoint - 1))[0]
+            board, _ = unpack_board(self.data, self.offset + relative)
+            start = checkpoint * self.checkpoint_interval
+        else:
+            board = chess.Board(self.start_fen)
+            start = 0
+        for move in self.moves(start, ply):
+            board.push(move)
+        return board
+
+    def record(self):
+        return GameRecord(self.game_id, self.white, self.black, self.result, self.start_fen, self.moves())
+
+
+class GameStore:
+    """Read-only, memory-mapped game store."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.directory_offset = STORE_HEADER.unpack_from(self.data, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a game store")
+        self.ids = None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        offset = DIRECTORY_ENTRY.unpack_from(self.data, self.directory_offset + index * DIRECTORY_ENTRY.size)[0]
+        return StoredGame(self.data, offset)
+
+    def __iter__(self):
+        return (self[index] for index in range(self.count))
+
+    def find(self, game_id):
+        if self.ids is None:
+            self.ids = {game.game_id: index for index, game in enumerate(self) if game.game_id}
+        index = self.ids.get(game_id)
+        return None if index is None else self[index]
+
+
+class GameStoreWriter:
+    def __init__(self, path, checkpoint_interval=CHECKPOINT_INTERVAL):
+        check_interval(checkpoint_interval)
+        self.file = open(path, "wb")
+        self.checkpoint_interval = checkpoint_interval
+        self.offsets = []
+        self.file.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, 0, 0, 0))
+
+    def add(self, record):
+        self.offsets.append(self.file.tell())
+        self.file.write(record.encode(self.checkpoint_interval))
+
+    def close(self):
+        directory_offset = self.file.tell()
+        for offset in self.offsets:
+            self.file.write(DIRECTORY_ENTRY.pack(offset))
+        self.file.seek(0)
+        self.file.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, 0, len(self.offsets), directory_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -----------------------
+# Bulk import / export
+# -----------------------
+def read_pgn_records(paths):
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                yield GameRecord.from_pgn(game)
+
+
+def read_json_records(paths):
+    # A file holds one game object, a list of them, or one game per line
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            data = json.loads(text)
+            games = data if isinstance(data, list) else [data]
+        except ValueError:
+            games = [json.loads(line) for line in text.splitlines() if line.strip()]
+        for game in games:
+            yield GameRecord.from_json(game)
+
+
+def write_store(records, path, checkpoint_interval=CHECKPOINT_INTERVAL):
+    count = 0
+    with GameStoreWriter(path, checkpoint_interval) as writer:
+        for record in records:
+            writer.add(record)
+            count += 1
+    return count
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compact binary store for archived games")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("import-pgn", "import-json"):
+        command = commands.add_parser(name, help=f"build a store from {name[7:].upper()} files")
+        command.add_argument("inputs", nargs="+")
+        command.add_argument("-o", "--output", required=True, help="store file to write")
+        command.add_argument("--checkpoint-interval", type=int, default=CHECKPOINT_INTERVAL, help="plies between stored positions")
+    for name in ("export-pgn", "export-json"):
+        command = commands.add_parser(name, help=f"write every game as {name[7:].upper()}")
+        command.add_argument("store")
+        command.add_argument("-o", "--output", default="-", help="output file (default stdout)")
+    show = commands.add_parser("show", help="print a game's position at a ply")
+    show.add_argument("store")
+    show.add_argument("game", help="game number or game ID")
+    show.add_argument("--ply", type=int, default=None, help="ply to show (default: final position)")
+    args = parser.parse_args()
+    try:
+        check_interval(getattr(args, "checkpoint_interval", CHECKPOINT_INTERVAL))
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command.startswith("import"):
+        reader = read_pgn_records if args.command == "import-pgn" else read_json_records
+        count = write_store(reader(args.inputs), args.output, args.checkpoint_interval)
+        print(f"{count} games written to {args.output}")
+    elif args.command.startswith("export"):
+        out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        with GameStore(args.store) as store:
+            if args.command == "export-pgn":
+                for game in store:
+                    print(game.record().to_pgn(), file=out, end="\n\n")
+            else:
+                json.dump([game.record().to_json() for game in store], out)
+        if out is not sys.stdout:
+            out.close()
+    else:
+        with GameStore(args.store) as store:
+            game = store[int(args.game)] if args.game.isdigit() else store.find(args.game)
+            if game is None:
+                print(f"No game {args.game}")
+            else:
+                ply = len(game) if args.ply is None else max(0, min(args.ply, len(game)))
+                print(f"{game.white} vs {game.black} ({game.result}), ply {ply}/{len(game)}")
+                print(game.board_at(ply))
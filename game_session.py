@@ -0,0 +1,188 @@
+import asyncio
+import json
+import random
+import websockets
+
+RECONNECT_BASE_DELAY = 0.5  # seconds
+RECONNECT_MAX_DELAY = 30
+RECONNECT_MAX_ATTEMPTS = 10
+
+
+class GameSession:
+    """WebSocket connection to one game that survives dropped connections.
+
+    On a drop it reconnects with the same token and gameID using jittered
+    exponential backoff. The server sends a fresh game-state frame on every
+    connect, so callers resync from the next message they receive.
+    """
+
+    def __init__(self, host, game_id, player_id, token, use_tls=True,
+                 max_attempts=RECONNECT_MAX_ATTEMPTS, base_delay=RECONNECT_BASE_DELAY,
+                 max_delay=RECONNECT_MAX_DELAY):
+        self.host = host
+        self.game_id = game_id
+        self.player_id = player_id
+        self.token = token
+        self.use_tls = use_tls
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.websocket = None
+        self.reconnects = 0
+        self._reconnecting = None
+
+    @property
+    def url(self):
+        scheme = "wss" if self.use_tls else "ws"
+        return f"{scheme}://{self.host}/connect?gameID={self.game_id}&playerID={self.player_id}"
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, additional_headers={"authorization": self.token})
+        return self.websocket
+
+    async def reconnect(self, failed=None):
+        # recv() and send() can both see the same drop; they share one reconnect
+        # task, and a socket that has already been replaced is not reconnected
+        if failed is not None and self.websocket is not failed:
+            return
+        if self._reconnecting is None or self._reconnecting.done():
+            self._reconnecting = asyncio.create_task(self._reconnect())
+        # Cancelling one waiter must not cancel the reconnect the other is waiting on
+        await asyncio.shield(self._reconnecting)
+
+    async def _reconnect(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+        for attempt in range(self.max_attempts):
+            # Full jitter keeps a room full of boards from reconnecting in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            print(f"Reconnecting to game {self.game_id} in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})...")
+            await asyncio.sleep(delay)
+            try:
+                await self.connect()
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                print(f"Reconnect failed: {e}")
+                continue
+            self.reconnects += 1
+            print(f"Reconnected to game {self.game_id}")
+            return
+        raise ConnectionError(f"Could not reconnect to game {self.game_id} after {self.max_attempts} attempts")
+
+    async def recv(self):
+        # Returns the next decoded frame, reconnecting transparently on a drop
+        while True:
+            websocket = self.websocket
+            try:
+                return json.loads(await websocket.recv())
+            except websockets.exceptions.ConnectionClosed as e:
+                print(f"WebSocket closed unexpectedly: {e.reason}")
+                await self.reconnect(websocket)
+
+    async def send(self, message):
+        # A frame sent on a dead socket may or may not have reached the server,
+        # so it is not resent. Returns False and lets the caller act on the
+        # game-state that follows the reconnect.
+        websocket = self.websocket
+        try:
+            await websocket.send(json.dumps(message))
+            return True
+        except websockets.exceptions.ConnectionClosed as e:
+            print(f"WebSocket closed while sending: {e.reason}")
+            await self.reconnect(websocket)
+            return False
+
+    async def close(self):
+        if self._reconnecting is not None and not self._reconnecting.done():
+            self._reconnecting.cancel()
+            try:
+                await self._reconnecting
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+        if self.websocket is not None:
+            await self.websocket.close()
+
+
+class MessageDispatcher:
+    """Single reader task that routes incoming frames by message_type.
+
+    Consumers subscribe a queue to one or more message types. A move sent
+    through send_move waits on a future that the reader resolves with the
+    matching confirmation or error, so frames arriving in the meantime are
+    never mistaken for the reply.
+    """
+
+    # Frames that answer an outstanding move. Error frames from the Worker
+    # do not always carry a message_type, so those are treated as errors.
+    MOVE_REPLY_TYPES = ("confirmation", "error", "game-state")
+
+    def __init__(self, session):
+        self.session = session
+        self.routes = {}
+        self.unrouted = 0
+        self.error = None
+        self._pending_move = None
+        self._reader = None
+
+    def subscribe(self, *message_types):
+        queue = asyncio.Queue()
+        for message_type in message_types:
+            self.routes[message_type] = queue
+        return queue
+
+    def start(self):
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def stop(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+
+    async def _read_loop(self):
+        try:
+            while True:
+                data = await self.session.recv()
+                message_type = data.get("message_type", "error")
+
+                pending = self._pending_move
+                if pending is not None and not pending.done() and message_type in self.MOVE_REPLY_TYPES:
+                    pending.set_result(data)
+                    # A game-state after a reconnect is still needed by the board loop
+                    if message_type != "game-state":
+                        continue
+
+                queue = self.routes.get(message_type)
+                if queue is None:
+                    self.unrouted += 1
+                else:
+                    queue.put_nowait(data)
+        except ConnectionError as e:
+            self.error = e
+            if self._pending_move is not None and not self._pending_move.done():
+                self._pending_move.set_exception(e)
+            # Wake every consumer so they can see the failure
+            for queue in set(self.routes.values()):
+                queue.put_nowait(None)
+
+    async def get(self, queue):
+        data = await queue.get()
+        if data is None:
+            raise self.error
+        return data
+
+    async def send_move(self, message, timeout=10):
+        # Returns the reply frame, or None if the connection dropped while sending
+        # or no reply came in time; the next game-state then decides the turn
+        if self.error is not None:
+            raise self.error
+        self._pending_move = asyncio.get_running_loop().create_future()
+        try:
+            if not await self.session.send(message):
+                return None
+            return await asyncio.wait_for(self._pending_move, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending_move = None
@@ -0,0 +1,285 @@
+import asyncio
+import http.client
+import json
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Errors raised when a pooled keep-alive socket was closed by the server
+# while it sat idle. Requests are retried on a fresh connection only when
+# the method is idempotent or the error came before the request was fully
+# written; otherwise the server may already have acted on it.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.ResponseNotReady,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+# Same idea for the asyncio transport, where a stale socket shows up as an
+# early EOF while reading the status line.
+ASYNC_STALE_CONNECTION_ERRORS = (
+    asyncio.IncompleteReadError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+def can_retry(method, sent):
+    return not sent or method.upper() in IDEMPOTENT_METHODS
+
+
+def parse_base_url(url):
+    # "https://host" -> ("host", 443, True); "http://127.0.0.1:8787" -> ("127.0.0.1", 8787, False)
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    use_tls = parts.scheme in ("https", "wss")
+    return parts.hostname, parts.port or (443 if use_tls else 80), use_tls
+
+
+class Response:
+    """Fully read HTTP response, so the connection can go back to the pool."""
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def json(self):
+        try:
+            return json.loads(self.body.decode())
+        except ValueError:
+            return None
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+
+class RequestStats:
+    """Per-endpoint request timings for an HTTP session."""
+
+    def __init__(self):
+        self.timings = {}
+        self.requests = 0
+        self.reused = 0
+        self.reconnects = 0
+        self._lock = threading.Lock()
+
+    def record(self, method, endpoint, elapsed, reused):
+        # Drop the query string, it holds player IDs and passwords
+        key = f"{method} {endpoint.split('?', 1)[0]}"
+        with self._lock:
+            self.timings.setdefault(key, []).append(elapsed)
+            self.requests += 1
+            if reused:
+                self.reused += 1
+
+    def summary(self):
+        lines = [f"{self.requests} requests, {self.reused} on reused connections, {self.reconnects} reconnects"]
+        for key, samples in sorted(self.timings.items()):
+            ordered = sorted(samples)
+            mean = sum(ordered) / len(ordered)
+            median = ordered[len(ordered) // 2]
+            lines.append(
+                f"  {key}: n={len(ordered)} mean={mean * 1000:.1f}ms "
+                f"p50={median * 1000:.1f}ms max={ordered[-1] * 1000:.1f}ms"
+            )
+        return "\n".join(lines)
+
+
+class HTTPSession:
+    """Keep-alive HTTP(S) session backed by a small connection pool."""
+
+    def __init__(self, host, port=443, max_connections=4, timeout=10, use_tls=True):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self.stats = RequestStats()
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        if self.use_tls:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def _release(self, conn, reusable):
+        with self._lock:
+            if reusable and len(self._idle) < self.max_connections:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, endpoint, body=None, headers=None):
+        while True:
+            conn, reused = self._acquire()
+            start = time.perf_counter()
+            sent = False
+            try:
+                conn.request(method, endpoint, body=body, headers=headers or {})
+                sent = True
+                response = conn.getresponse()
+                data = response.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused or not can_retry(method, sent):
+                    raise
+                # Pooled socket went stale, retry on a fresh connection
+                self.stats.reconnects += 1
+                continue
+            except Exception:
+                conn.close()
+                raise
+
+            elapsed = time.perf_counter() - start
+            self.stats.record(method, endpoint, elapsed, reused)
+            self._release(conn, not response.will_close)
+            headers = {name.lower(): value for name, value in response.getheaders()}
+            return Response(response.status, response.reason, headers, data)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class AsyncHTTPSession:
+    """Keep-alive HTTP(S) session for asyncio code, with per-request timeouts."""
+
+    def __init__(self, host, port=443, max_connections=4, timeout=10, use_tls=True):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self.stats = RequestStats()
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self._ssl_context = ssl.create_default_context() if use_tls else None
+
+    async def _acquire(self):
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self._ssl_context,
+            server_hostname=self.host if self.use_tls else None,
+        )
+        return reader, writer, False
+
+    def _release(self, reader, writer, reusable):
+        if reusable and len(self._idle) < self.max_connections:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def _encode_request(self, method, endpoint, body, headers):
+        if isinstance(body, str):
+            body = body.encode()
+        lines = [f"{method} {endpoint} HTTP/1.1", f"Host: {self.host}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        if body is not None or method in ("POST", "PUT", "PATCH"):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode() + (body or b"")
+
+    async def _read_response(self, reader, method):
+        status_line = await reader.readuntil(b"\r\n")
+        version, status, reason = (status_line.decode("latin-1").rstrip("\r\n").split(" ", 2) + [""])[:3]
+        status = int(status)
+
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        will_close = headers.get("connection", "").lower() == "close" or (
+            version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive"
+        )
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    # Skip trailers up to the terminating blank line
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            will_close = True
+        return Response(status, reason, headers, body), will_close
+
+    async def _request(self, method, endpoint, body, headers):
+        payload = self._encode_request(method, endpoint, body, headers)
+        while True:
+            reader, writer, reused = await self._acquire()
+            start = time.perf_counter()
+            sent = False
+            try:
+                writer.write(payload)
+                await writer.drain()
+                sent = True
+                response, will_close = await self._read_response(reader, method)
+            except ASYNC_STALE_CONNECTION_ERRORS:
+                writer.close()
+                if not reused or not can_retry(method, sent):
+                    raise
+                # Pooled socket went stale, retry on a fresh connection
+                self.stats.reconnects += 1
+                continue
+            except BaseException:
+                # Timeouts and cancellation leave the socket mid-response
+                writer.close()
+                raise
+
+            elapsed = time.perf_counter() - start
+            self.stats.record(method, endpoint, elapsed, reused)
+            self._release(reader, writer, not will_close)
+            return response
+
+    async def request(self, method, endpoint, body=None, headers=None, timeout=None):
+        async with self._slots:
+            return await asyncio.wait_for(
+                self._request(method, endpoint, body, headers),
+                timeout if timeout is not None else self.timeout,
+            )
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
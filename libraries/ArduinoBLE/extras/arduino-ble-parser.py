@@ -2,84 +2,309 @@
 Convert ArduinoBLE debug files into Btsnoop files ready to be analyzed using wireshark or hcidump
 Btsnoop file format reference
  https://www.fte.com/WebHelpII/Sodera/Content/Technical_Information/BT_Snoop_File_Format.htm
+
+The debug log is converted in a single streaming pass. Use '-' as input or
+output path to read from stdin or write to stdout, e.g.
+  cat debug.log | python arduino-ble-parser.py -i - -o - > capture.btsnoop
+
+Large files can be split at line boundaries and converted on several cores:
+  python arduino-ble-parser.py -i debug.log -o capture.btsnoop -j 0
+
+Packet timestamps come from the serial monitor prefix ("12:34:56.789 -> HCI ...")
+when present, on the date given by --start. Lines without a prefix, or every
+line with --timestamps cadence, are spaced --cadence-us apart. Without --start
+the first log clock goes on the last day that keeps it before the input file's
+modification time (now for stdin), and cadence timestamps start at that time.
+--start end instead reads the file once more to take its modification time as
+the end of the capture. Every "_recvBuffer overflow" line printed by ArduinoBLE
+counts as one dropped packet.
 '''
 
-import  os
+import os
+import sys
+import time
+import struct
+import binascii
 import argparse
+import datetime
+import multiprocessing
 
 DEBUG = False
+BUFFER_SIZE = 1 << 20
+CHUNK_SIZE = 16 << 20
+
+# Btsnoop file header: identification pattern, version, datalink type (1002 = HCI UART H4)
+BTSNOOP_HEADER = struct.Struct(">8sII")
+BTSNOOP_MAGIC = b"btsnoop\0"
+BTSNOOP_VERSION = 1
+BTSNOOP_DATALINK_H4 = 1002
+
+# Btsnoop packet record: original length, included length, flags, cumulative drops, timestamp
+BTSNOOP_RECORD = struct.Struct(">IIIIq")
+
+# Btsnoop timestamps count microseconds since midnight, January 1st, 0 AD
+BTSNOOP_EPOCH_OFFSET = 0x00dcddb30f2f8000
+DAY_US = 24 * 3600 * 1000000
+DROP_MARKER = b"_recvBuffer overflow"
 
 parser = argparse.ArgumentParser()
-parser.add_argument('-i', dest='inputPath', type=str, required=True, help='input file containing debug log')
-parser.add_argument('-o', dest='outputPath', type=str, required=True, help='result file that will contain the btsnoop encoded debug file')
-args = parser.parse_args()
-
-# Extract only hci debug messages
-def extractHCIDebugPrint(inputPath, outputPath):
-  inputFile = open(inputPath, 'r')
-  outputFile = open(outputPath, 'w')
-  for inputLine in inputFile:
-    lineItems = inputLine.split()
-    if (len(lineItems) < 7) or (lineItems[1] != "->") or (lineItems[2] != "HCI"):
-      if (len(lineItems) < 4) or (lineItems[0] != "HCI") or ((lineItems[3] != "<-") and (lineItems[3] != "->")):
-        continue
-    outputFile.write(inputLine)  
-  outputFile.close()
+parser.add_argument('-i', dest='inputPath', type=str, required=True, help='input file containing debug log (- for stdin)')
+parser.add_argument('-o', dest='outputPath', type=str, required=True, help='result file that will contain the btsnoop encoded debug file (- for stdout)')
+parser.add_argument('-j', dest='jobs', type=int, default=1, help='worker processes for chunked conversion (0 = all cores, 1 = single streaming pass)')
+parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=CHUNK_SIZE, help='approximate chunk size in bytes for parallel conversion')
+parser.add_argument('--timestamps', dest='timestampMode', choices=['log', 'cadence'], default='log', help='use serial monitor timestamps when present (log) or a fixed cadence for every packet')
+parser.add_argument('--cadence-us', dest='cadence', type=int, default=1000, help='microseconds between packets that have no log timestamp')
+parser.add_argument('--start', dest='start', type=str, default=None, help="capture start as ISO date/time, or 'end' to work it back from the input file's modification time with an extra pass (default: anchor the first log clock to the modification time, or now for stdin)")
+
+# Return microseconds since midnight for a "HH:MM:SS.mmm" serial monitor timestamp, None if malformed
+def parseClock(clockItem):
+  try:
+    hours, minutes, seconds = clockItem.split(b":")
+    return ((int(hours) * 60 + int(minutes)) * 60) * 1000000 + round(float(seconds) * 1000000)
+  except ValueError:
+    return None
+
+# Return (clock, hciType, hciDirection, hciMessage) for an hci debug line, None for any other line
+def parseHCIDebugLine(inputLine):
+  # Cheap substring test before paying for split() on unrelated log lines
+  if b"HCI" not in inputLine:
+    return None
+  lineItems = inputLine.split()
+  if (len(lineItems) < 7) or (lineItems[1] != b"->") or (lineItems[2] != b"HCI"):
+    if (len(lineItems) < 4) or (lineItems[0] != b"HCI") or ((lineItems[3] != b"<-") and (lineItems[3] != b"->")):
+      return None
+  # For a safer script, do not use indexes but look for symbols in the line
+  baseIndex = lineItems.index(b"HCI")
+  if len(lineItems) <= baseIndex + 4:
+    return None
+  clock = parseClock(lineItems[0]) if baseIndex == 2 else None
+  return clock, lineItems[baseIndex + 1], lineItems[baseIndex + 2], lineItems[baseIndex + 4]
 
 # Return packet in btsnoop format
-def buildBinaryPacket(hciMessage, hciDirection, hciType):
-  commandFlag = 1 if (hciType == "COMMAND" or hciType == "EVENT") else 0
-  directionFlag =  0 if (hciDirection == "TX") else 1
-  flagHex = ("0" * 7) + str((commandFlag * 2) + directionFlag)
-  timestampHex = "0" * 16
-  packetDropHex = "0" * 8
-  dataLengthHex = format( (int(len(hciMessage) / 2)), 'x')
-  packetLengthHex = ("0" * (8 - len(dataLengthHex))) + dataLengthHex
-  binaryPacket = bytearray.fromhex(packetLengthHex + packetLengthHex + flagHex + packetDropHex + timestampHex + hciMessage)
+def buildBinaryPacket(hciMessage, hciDirection, hciType, timestamp=0, packetDrops=0):
+  commandFlag = 1 if (hciType == b"COMMAND" or hciType == b"EVENT") else 0
+  directionFlag = 0 if (hciDirection == b"TX") else 1
+  hciData = binascii.unhexlify(hciMessage)
+  binaryPacket = BTSNOOP_RECORD.pack(len(hciData), len(hciData), (commandFlag * 2) + directionFlag, packetDrops, timestamp) + hciData
   if DEBUG:
-    print(len(hciMessage))
-    print(dataLengthHex)
-    print(packetLengthHex)
-    print(flagHex)
-    print('\n')
+    print(len(hciData), file=sys.stderr)
+    print(hciDirection, hciType, timestamp, packetDrops, file=sys.stderr)
   return binaryPacket
 
 def buildBinaryHeader():
-  defaultHeader = "6274736e6f6f700000000001000003ea"
-  binaryHeader = bytearray.fromhex(defaultHeader)
-  return binaryHeader
-
-def convertToBtsnoop(inputPath, outputPath):
-  # Open output file and write the Btsnoop header
-  outputFile = open(outputPath,'wb')
-  header = buildBinaryHeader()
-  outputFile.write(header)
-
-  # Open input file containing HCI debug packets
-  inputFile = open(inputPath, 'r')
-  for inputLine in inputFile:
-    lineItems = inputLine.split()
-    # For a safer script, do not use indexes but look for symbols in the line
-    baseIndex = lineItems.index("HCI")
-    hciMessage = lineItems[baseIndex + 4]
-    hciDirection = lineItems[baseIndex + 2]
-    hciType = lineItems[baseIndex + 1]
-    # Build and write the encoded line
-    btsnoopPacket = buildBinaryPacket(hciMessage, hciDirection, hciType)
+  return BTSNOOP_HEADER.pack(BTSNOOP_MAGIC, BTSNOOP_VERSION, BTSNOOP_DATALINK_H4)
+
+# Convert a local datetime into a btsnoop timestamp
+def toBtsnoopTime(moment):
+  return int(moment.timestamp() * 1000000) + BTSNOOP_EPOCH_OFFSET
+
+# Timestamp and drop counter state carried from one packet to the next
+class RecordClock:
+  # With anchored=False, start is only a reference: the day of the first log clock is picked when it is seen
+  def __init__(self, mode, start, cadence, anchored=True):
+    self.mode = mode
+    self.cadence = cadence
+    self.reference = start
+    self.anchored = anchored
+    startMidnight = datetime.datetime.combine(start.date(), datetime.time())
+    self.midnight = toBtsnoopTime(startMidnight)
+    self.lastTimestamp = toBtsnoopTime(start) - cadence
+    self.lastClock = None
+    self.drops = 0
+
+  def copy(self):
+    clock = RecordClock.__new__(RecordClock)
+    clock.__dict__.update(self.__dict__)
+    return clock
+
+  # Put the first log clock on the last day that keeps it at or before the reference time
+  def anchor(self, clock):
+    if clock > toBtsnoopTime(self.reference) - self.midnight:
+      self.midnight -= DAY_US
+    self.anchored = True
+
+  def timestampFor(self, clock):
+    if self.mode == 'log' and clock is not None:
+      if not self.anchored:
+        self.anchor(clock)
+      # The serial monitor only prints the time of day; a large jump backwards is midnight
+      if self.lastClock is not None and clock < self.lastClock - DAY_US // 2:
+        self.midnight += DAY_US
+      self.lastClock = clock
+      self.lastTimestamp = self.midnight + clock
+    else:
+      self.lastTimestamp += self.cadence
+    return self.lastTimestamp
+
+  # Advance over a chunk described by summarizeChunk() without re-reading it
+  def advance(self, summary):
+    firstClock, lastClock, rollovers, packetsAfterClock, packets, drops = summary
+    self.drops += drops
+    if self.mode == 'log' and lastClock is not None:
+      if not self.anchored:
+        self.anchor(firstClock)
+      if self.lastClock is not None and firstClock < self.lastClock - DAY_US // 2:
+        self.midnight += DAY_US
+      self.midnight += rollovers * DAY_US
+      self.lastClock = lastClock
+      self.lastTimestamp = self.midnight + lastClock + packetsAfterClock * self.cadence
+    else:
+      self.lastTimestamp += packets * self.cadence
+
+# Yield the btsnoop record for every hci debug line in lines, updating recordClock
+def encodeHCILines(lines, recordClock):
+  for inputLine in lines:
+    hciLine = parseHCIDebugLine(inputLine)
+    if hciLine is None:
+      if DROP_MARKER in inputLine:
+        recordClock.drops += 1
+      continue
+    clock, hciType, hciDirection, hciMessage = hciLine
+    yield buildBinaryPacket(hciMessage, hciDirection, hciType, recordClock.timestampFor(clock), recordClock.drops)
+
+# Stream hci debug lines from inputFile into btsnoop records on outputFile.
+# Returns the number of input bytes read and packets written.
+def convertToBtsnoop(inputFile, outputFile, recordClock):
+  outputFile.write(buildBinaryHeader())
+  bytesRead = 0
+  packetCount = 0
+  def countedLines():
+    nonlocal bytesRead
+    for inputLine in inputFile:
+      bytesRead += len(inputLine)
+      yield inputLine
+  for btsnoopPacket in encodeHCILines(countedLines(), recordClock):
     outputFile.write(btsnoopPacket)
-    if DEBUG:
-      print(hciDirection)
-      print(hciMessage)
-      print(hciType)
-      print('\n')
-  outputFile.close()
-
-inputPath = args.inputPath
-outputPath = args.outputPath
-tempFile = "temp-debug-print.txt"
-# Run
-extractHCIDebugPrint(inputPath,tempFile)
-convertToBtsnoop(tempFile, outputPath)
-# Delete temp file
-os.remove(tempFile) 
+    packetCount += 1
+  return bytesRead, packetCount
+
+# Split the input file into (start, end) byte ranges that end on line boundaries
+def findChunkRanges(inputPath, chunkSize):
+  fileSize = os.path.getsize(inputPath)
+  boundaries = [0]
+  with open(inputPath, 'rb') as inputFile:
+    while boundaries[-1] + chunkSize < fileSize:
+      inputFile.seek(boundaries[-1] + chunkSize)
+      inputFile.readline()
+      boundaries.append(inputFile.tell())
+  if boundaries[-1] < fileSize:
+    boundaries.append(fileSize)
+  return list(zip(boundaries, boundaries[1:]))
+
+def readChunkLines(inputPath, start, end):
+  with open(inputPath, 'rb') as inputFile:
+    inputFile.seek(start)
+    data = inputFile.read(end - start)
+  # Split on \n only, like iterating over the file does
+  return data.split(b"\n")
+
+# Worker, first pass: what a chunk does to the clock and drop counter, independent of earlier chunks.
+# Returns (firstClock, lastClock, rollovers, packetsAfterLastClock, packets, drops).
+def summarizeChunk(chunk):
+  inputPath, start, end = chunk
+  return summarizeLines(readChunkLines(inputPath, start, end))
+
+def summarizeLines(lines):
+  firstClock = lastClock = None
+  rollovers = packetsAfterClock = packets = drops = 0
+  for inputLine in lines:
+    hciLine = parseHCIDebugLine(inputLine)
+    if hciLine is None:
+      if DROP_MARKER in inputLine:
+        drops += 1
+      continue
+    packets += 1
+    clock = hciLine[0]
+    if clock is None:
+      packetsAfterClock += 1
+      continue
+    if firstClock is None:
+      firstClock = clock
+    elif clock < lastClock - DAY_US // 2:
+      rollovers += 1
+    lastClock = clock
+    packetsAfterClock = 0
+  return firstClock, lastClock, rollovers, packetsAfterClock, packets, drops
+
+# Worker, second pass: convert one chunk into concatenated btsnoop records
+def convertChunk(chunk):
+  inputPath, start, end, recordClock = chunk
+  packets = list(encodeHCILines(readChunkLines(inputPath, start, end), recordClock))
+  return b"".join(packets), len(packets)
+
+# Convert inputPath on a process pool; chunks are written back in input order
+def convertToBtsnoopParallel(inputPath, outputFile, recordClock, jobs, chunkSize=CHUNK_SIZE):
+  outputFile.write(buildBinaryHeader())
+  ranges = findChunkRanges(inputPath, chunkSize)
+  packetCount = 0
+  with multiprocessing.Pool(jobs or None) as pool:
+    # Timestamps and drop counts carry across chunks, so first find the state each chunk starts from
+    chunks = []
+    for (start, end), summary in zip(ranges, pool.imap(summarizeChunk, [(inputPath, start, end) for start, end in ranges])):
+      chunks.append((inputPath, start, end, recordClock.copy()))
+      recordClock.advance(summary)
+    for chunkData, chunkPackets in pool.imap(convertChunk, chunks):
+      outputFile.write(chunkData)
+      packetCount += chunkPackets
+  return os.path.getsize(inputPath), packetCount
+
+def openInput(inputPath):
+  if inputPath == '-':
+    return sys.stdin.buffer
+  return open(inputPath, 'rb', buffering=BUFFER_SIZE)
+
+def openOutput(outputPath):
+  if outputPath == '-':
+    return sys.stdout.buffer
+  return open(outputPath, 'wb', buffering=BUFFER_SIZE)
+
+def captureStart(args):
+  if args.start == 'end':
+    return captureStartFromEnd(args)
+  if args.start:
+    return datetime.datetime.fromisoformat(args.start)
+  if args.inputPath == '-':
+    return datetime.datetime.now()
+  return datetime.datetime.fromtimestamp(os.path.getmtime(args.inputPath))
+
+# --start end: the file's modification time is when the capture ended, so walk back over its length
+def captureStartFromEnd(args):
+  end = datetime.datetime.fromtimestamp(os.path.getmtime(args.inputPath))
+  with open(args.inputPath, 'rb', buffering=BUFFER_SIZE) as inputFile:
+    firstClock, lastClock, rollovers, packetsAfterClock, packets, drops = summarizeLines(inputFile)
+  if args.timestampMode == 'cadence' or firstClock is None:
+    return end - datetime.timedelta(microseconds=max(packets - 1, 0) * args.cadence)
+  length = lastClock - firstClock + rollovers * DAY_US + packetsAfterClock * args.cadence
+  approximate = end - datetime.timedelta(microseconds=length)
+  # Put the first log clock on whichever day lands it nearest the estimate
+  start = datetime.datetime.combine(approximate.date(), datetime.time()) + datetime.timedelta(microseconds=firstClock)
+  if start - approximate > datetime.timedelta(hours=12):
+    start -= datetime.timedelta(days=1)
+  elif approximate - start > datetime.timedelta(hours=12):
+    start += datetime.timedelta(days=1)
+  return start
 
+if __name__ == '__main__':
+  args = parser.parse_args()
+  if args.jobs != 1 and args.inputPath == '-':
+    parser.error('parallel conversion (-j) needs a seekable input file, not stdin')
+  if args.start == 'end' and args.inputPath == '-':
+    parser.error('--start end needs an input file, not stdin')
+  recordClock = RecordClock(args.timestampMode, captureStart(args), args.cadence, anchored=args.start is not None)
+  startTime = time.perf_counter()
+  inputFile = openInput(args.inputPath) if args.jobs == 1 else None
+  outputFile = openOutput(args.outputPath)
+  try:
+    if inputFile is None:
+      bytesRead, packetCount = convertToBtsnoopParallel(args.inputPath, outputFile, recordClock, args.jobs, args.chunkSize)
+    else:
+      bytesRead, packetCount = convertToBtsnoop(inputFile, outputFile, recordClock)
+  finally:
+    outputFile.flush()
+    if inputFile is not None and inputFile is not sys.stdin.buffer:
+      inputFile.close()
+    if outputFile is not sys.stdout.buffer:
+      outputFile.close()
+  elapsed = max(time.perf_counter() - startTime, 1e-9)
+  # Report on stderr so stdout stays usable as the btsnoop stream
+  print("%d packets from %.1f MB in %.2fs (%.1f MB/s)" % (packetCount, bytesRead / 1e6, elapsed, bytesRead / 1e6 / elapsed), file=sys.stderr)
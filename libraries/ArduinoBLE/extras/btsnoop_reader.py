@@ -0,0 +1,200 @@
+'''
+Random-access reader for btsnoop files written by arduino-ble-parser.py
+
+The file is memory-mapped and only the 24 byte record headers are walked to
+build an offset index, so payloads are never decoded until a record is read.
+The index is saved next to the capture (<file>.idx) and reused while the
+capture is unchanged, which makes reopening a large capture instant.
+
+  python btsnoop_reader.py capture.btsnoop --type EVENT --from 12:00:00 --to 12:00:05
+'''
+
+import os
+import sys
+import mmap
+import array
+import bisect
+import struct
+import argparse
+import datetime
+import collections
+
+BTSNOOP_HEADER = struct.Struct(">8sII")
+BTSNOOP_MAGIC = b"btsnoop\0"
+BTSNOOP_RECORD = struct.Struct(">IIIIq")
+BTSNOOP_EPOCH_OFFSET = 0x00dcddb30f2f8000
+
+# Record flag bits
+FLAG_RECEIVED = 0x01
+FLAG_COMMAND_EVENT = 0x02
+
+# Magic, capture size, capture mtime, record count, timestamps sorted
+INDEX_MAGIC = b"btsnidx2"
+INDEX_HEADER = struct.Struct(">8sQQQ?")
+
+BtsnoopRecord = collections.namedtuple('BtsnoopRecord', ['number', 'originalLength', 'flags', 'drops', 'timestamp', 'data'])
+
+# Direction and packet type as printed by ArduinoBLE debug logs
+def recordDirection(flags):
+  return "RX" if flags & FLAG_RECEIVED else "TX"
+
+def recordType(flags):
+  if flags & FLAG_COMMAND_EVENT:
+    return "EVENT" if flags & FLAG_RECEIVED else "COMMAND"
+  return "ACLDATA"
+
+def fromBtsnoopTime(timestamp):
+  return datetime.datetime.fromtimestamp((timestamp - BTSNOOP_EPOCH_OFFSET) / 1000000)
+
+def toBtsnoopTime(moment):
+  return int(moment.timestamp() * 1000000) + BTSNOOP_EPOCH_OFFSET
+
+class BtsnoopReader:
+  def __init__(self, path, useIndexFile=True):
+    self.path = path
+    self.file = open(path, 'rb')
+    self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, self.version, self.datalink = BTSNOOP_HEADER.unpack_from(self.map, 0)
+    if magic != BTSNOOP_MAGIC:
+      self.close()
+      raise ValueError("%s is not a btsnoop file" % path)
+    self.offsets = array.array('Q')
+    self.timestamps = array.array('q')
+    # Timestamps from a log can step back (e.g. a cadence packet after a logged one), bisect needs them sorted
+    self.sortedTimes = True
+    indexPath = path + ".idx"
+    if not (useIndexFile and self.loadIndex(indexPath)):
+      self.buildIndex()
+      if useIndexFile:
+        self.saveIndex(indexPath)
+
+  def close(self):
+    self.map.close()
+    self.file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def buildIndex(self):
+    offset = BTSNOOP_HEADER.size
+    size = len(self.map)
+    unpackRecord = BTSNOOP_RECORD.unpack_from
+    lastTimestamp = None
+    while offset + BTSNOOP_RECORD.size <= size:
+      _, includedLength, _, _, timestamp = unpackRecord(self.map, offset)
+      if offset + BTSNOOP_RECORD.size + includedLength > size:
+        # Truncated final record, e.g. a capture still being written
+        break
+      if lastTimestamp is not None and timestamp < lastTimestamp:
+        self.sortedTimes = False
+      lastTimestamp = timestamp
+      self.offsets.append(offset)
+      self.timestamps.append(timestamp)
+      offset += BTSNOOP_RECORD.size + includedLength
+
+  # The index file is only trusted when size and mtime match the capture
+  def indexKey(self):
+    stat = os.stat(self.path)
+    return stat.st_size, stat.st_mtime_ns
+
+  def loadIndex(self, indexPath):
+    try:
+      with open(indexPath, 'rb') as indexFile:
+        magic, size, mtime, count, sortedTimes = INDEX_HEADER.unpack(indexFile.read(INDEX_HEADER.size))
+        if magic != INDEX_MAGIC or (size, mtime) != self.indexKey():
+          return False
+        self.offsets.fromfile(indexFile, count)
+        self.timestamps.fromfile(indexFile, count)
+    except (OSError, EOFError, struct.error):
+      self.offsets = array.array('Q')
+      self.timestamps = array.array('q')
+      return False
+    self.sortedTimes = sortedTimes
+    return True
+
+  def saveIndex(self, indexPath):
+    try:
+      with open(indexPath, 'wb') as indexFile:
+        indexFile.write(INDEX_HEADER.pack(INDEX_MAGIC, *self.indexKey(), len(self.offsets), self.sortedTimes))
+        self.offsets.tofile(indexFile)
+        self.timestamps.tofile(indexFile)
+    except OSError:
+      # Read-only location, the in-memory index still works
+      pass
+
+  def __len__(self):
+    return len(self.offsets)
+
+  def __getitem__(self, number):
+    if isinstance(number, slice):
+      return [self.record(i) for i in range(*number.indices(len(self)))]
+    if number < 0:
+      number += len(self)
+    return self.record(number)
+
+  def __iter__(self):
+    return (self.record(i) for i in range(len(self)))
+
+  def flags(self, number):
+    return struct.unpack_from(">I", self.map, self.offsets[number] + 8)[0]
+
+  def record(self, number):
+    offset = self.offsets[number]
+    originalLength, includedLength, flags, drops, timestamp = BTSNOOP_RECORD.unpack_from(self.map, offset)
+    start = offset + BTSNOOP_RECORD.size
+    return BtsnoopRecord(number, originalLength, flags, drops, timestamp, self.map[start:start + includedLength])
+
+  # Record numbers with timestamps in [start, end), both btsnoop timestamps or None for open ends
+  def timeRange(self, start=None, end=None):
+    if not self.sortedTimes:
+      return [i for i, t in enumerate(self.timestamps) if (start is None or t >= start) and (end is None or t < end)]
+    low = 0 if start is None else bisect.bisect_left(self.timestamps, start)
+    high = len(self) if end is None else bisect.bisect_left(self.timestamps, end)
+    return range(low, high)
+
+  # Yield records matching a direction ("TX"/"RX") and/or type ("COMMAND"/"EVENT"/"ACLDATA")
+  def filter(self, direction=None, hciType=None, start=None, end=None):
+    for number in self.timeRange(start, end):
+      flags = self.flags(number)
+      if direction is not None and recordDirection(flags) != direction:
+        continue
+      if hciType is not None and recordType(flags) != hciType:
+        continue
+      yield self.record(number)
+
+# Accept either a full ISO date/time or a time of day on the capture's first day
+def parseTimeArgument(value, reader):
+  if value is None:
+    return None
+  try:
+    moment = datetime.datetime.fromisoformat(value)
+  except ValueError:
+    firstDay = fromBtsnoopTime(reader.timestamps[0]).date() if len(reader) else datetime.date.today()
+    moment = datetime.datetime.combine(firstDay, datetime.time.fromisoformat(value))
+  return toBtsnoopTime(moment)
+
+parser = argparse.ArgumentParser()
+parser.add_argument('inputPath', type=str, help='btsnoop file to read')
+parser.add_argument('--direction', choices=['TX', 'RX'], default=None, help='only show packets in this direction')
+parser.add_argument('--type', dest='hciType', choices=['COMMAND', 'EVENT', 'ACLDATA'], default=None, help='only show this packet type')
+parser.add_argument('--from', dest='start', type=str, default=None, help='first timestamp to show (ISO date/time or HH:MM:SS[.ffffff])')
+parser.add_argument('--to', dest='end', type=str, default=None, help='show packets before this timestamp')
+parser.add_argument('-n', dest='limit', type=int, default=None, help='stop after this many packets')
+parser.add_argument('--no-index-file', dest='useIndexFile', action='store_false', help='do not read or write the .idx sidecar file')
+
+if __name__ == '__main__':
+  args = parser.parse_args()
+  with BtsnoopReader(args.inputPath, args.useIndexFile) as reader:
+    records = reader.filter(args.direction, args.hciType, parseTimeArgument(args.start, reader), parseTimeArgument(args.end, reader))
+    try:
+      for shown, record in enumerate(records):
+        if args.limit is not None and shown >= args.limit:
+          break
+        print("%d %s %s %s drops=%d %s" % (record.number, fromBtsnoopTime(record.timestamp).isoformat(" "),
+          recordDirection(record.flags), recordType(record.flags), record.drops, record.data.hex()))
+    except BrokenPipeError:
+      # Piped into head, stop quietly
+      sys.stderr.close()
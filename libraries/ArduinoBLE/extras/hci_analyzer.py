@@ -0,0 +1,243 @@
+'''
+HCI/ATT decoding and request/response latency for btsnoop captures written by arduino-ble-parser.py
+
+Each packet is classified by its H4 type: commands by opcode, events by event
+code, ACL data by connection handle and, for the ATT channel, by ATT opcode.
+Requests are then paired with their responses:
+  HCI command          -> Command Complete / Command Status with the same opcode
+  ATT request (RX/TX)  -> ATT response or Error Response on the same handle, other direction
+and the time between the two is reported per operation as a histogram.
+
+  python hci_analyzer.py capture.btsnoop
+  python hci_analyzer.py capture.btsnoop --from 12:00:00 --to 12:01:00 --counts
+'''
+
+import sys
+import argparse
+import collections
+from btsnoop_reader import BtsnoopReader, parseTimeArgument
+
+# H4 packet types, first byte of every record
+H4_COMMAND = 0x01
+H4_ACLDATA = 0x02
+H4_EVENT = 0x04
+
+EVT_DISCONNECTION_COMPLETE = 0x05
+EVT_COMMAND_COMPLETE = 0x0e
+EVT_COMMAND_STATUS = 0x0f
+EVT_NUMBER_OF_COMPLETED_PKTS = 0x13
+EVT_LE_META_EVENT = 0x3e
+
+ATT_CID = 0x0004
+ATT_OP_ERROR = 0x01
+
+COMMAND_NAMES = {
+  0x0406: "Disconnect",
+  0x0c01: "Set Event Mask",
+  0x0c03: "Reset",
+  0x1001: "Read Local Version",
+  0x1009: "Read BD ADDR",
+  0x1405: "Read RSSI",
+  0x2001: "LE Set Event Mask",
+  0x2002: "LE Read Buffer Size",
+  0x2005: "LE Set Random Address",
+  0x2006: "LE Set Advertising Parameters",
+  0x2008: "LE Set Advertising Data",
+  0x2009: "LE Set Scan Response Data",
+  0x200a: "LE Set Advertise Enable",
+  0x200b: "LE Set Scan Parameters",
+  0x200c: "LE Set Scan Enable",
+  0x200d: "LE Create Connection",
+  0x200e: "LE Create Connection Cancel",
+  0x2013: "LE Connection Update",
+  0x2016: "LE Read Remote Features",
+  0x2018: "LE Rand",
+  0x201a: "LE Long Term Key Reply",
+}
+
+EVENT_NAMES = {
+  EVT_DISCONNECTION_COMPLETE: "Disconnection Complete",
+  0x08: "Encryption Change",
+  EVT_COMMAND_COMPLETE: "Command Complete",
+  EVT_COMMAND_STATUS: "Command Status",
+  EVT_NUMBER_OF_COMPLETED_PKTS: "Number Of Completed Packets",
+  EVT_LE_META_EVENT: "LE Meta",
+}
+
+LE_META_NAMES = {
+  0x01: "LE Connection Complete",
+  0x02: "LE Advertising Report",
+  0x03: "LE Connection Update Complete",
+  0x05: "LE Long Term Key Request",
+  0x0a: "LE Enhanced Connection Complete",
+}
+
+ATT_NAMES = {
+  0x01: "Error Rsp",
+  0x02: "MTU Req", 0x03: "MTU Rsp",
+  0x04: "Find Info Req", 0x05: "Find Info Rsp",
+  0x06: "Find By Type Req", 0x07: "Find By Type Rsp",
+  0x08: "Read By Type Req", 0x09: "Read By Type Rsp",
+  0x0a: "Read Req", 0x0b: "Read Rsp",
+  0x0c: "Read Blob Req", 0x0d: "Read Blob Rsp",
+  0x10: "Read By Group Req", 0x11: "Read By Group Rsp",
+  0x12: "Write Req", 0x13: "Write Rsp",
+  0x16: "Prepare Write Req", 0x17: "Prepare Write Rsp",
+  0x18: "Execute Write Req", 0x19: "Execute Write Rsp",
+  0x1b: "Notification",
+  0x1d: "Indication", 0x1e: "Confirmation",
+  0x52: "Write Cmd",
+}
+
+# ATT request opcode -> response opcode; everything else is unacknowledged
+ATT_RESPONSES = {
+  0x02: 0x03, 0x04: 0x05, 0x06: 0x07, 0x08: 0x09, 0x0a: 0x0b, 0x0c: 0x0d,
+  0x10: 0x11, 0x12: 0x13, 0x16: 0x17, 0x18: 0x19, 0x1d: 0x1e,
+}
+ATT_REQUESTS = {response: request for request, response in ATT_RESPONSES.items()}
+
+# Histogram bucket upper bounds in microseconds
+HISTOGRAM_BOUNDS = [250, 500, 1000, 2500, 5000, 7500, 10000, 15000, 30000, 50000, 100000, 250000, 500000, 1000000]
+
+def commandName(opcode):
+  return COMMAND_NAMES.get(opcode, "Command 0x%04x" % opcode)
+
+def eventName(code, data):
+  if code == EVT_LE_META_EVENT and len(data) > 3:
+    return LE_META_NAMES.get(data[3], "LE Meta 0x%02x" % data[3])
+  return EVENT_NAMES.get(code, "Event 0x%02x" % code)
+
+def attName(opcode):
+  return ATT_NAMES.get(opcode, "ATT 0x%02x" % opcode)
+
+# Return (kind, detail) for a record: kind is COMMAND/EVENT/ACLDATA/ATT/UNKNOWN,
+# detail is the opcode, event code, connection handle or (handle, ATT opcode)
+def classifyPacket(data):
+  if len(data) >= 3 and data[0] == H4_COMMAND:
+    return "COMMAND", data[1] | (data[2] << 8)
+  if len(data) >= 2 and data[0] == H4_EVENT:
+    return "EVENT", data[1]
+  if len(data) >= 5 and data[0] == H4_ACLDATA:
+    handleFlags = data[1] | (data[2] << 8)
+    handle = handleFlags & 0x0fff
+    # Only first fragments (packet boundary flag != 01) carry an L2CAP header
+    if (handleFlags >> 12) & 0x3 != 0x1 and len(data) >= 10 and (data[7] | (data[8] << 8)) == ATT_CID:
+      return "ATT", (handle, data[9])
+    return "ACLDATA", handle
+  return "UNKNOWN", data[0] if len(data) else None
+
+# Pairs requests with responses and keeps latency samples per operation
+class LatencyTracker:
+  def __init__(self):
+    self.pendingCommands = {}
+    self.pendingAtt = {}
+    self.samples = collections.defaultdict(list)
+    self.unanswered = collections.Counter()
+
+  def start(self, key, name, timestamp, pending):
+    if key in pending:
+      # A second request before the first was answered, count the first as lost
+      self.unanswered[pending[key][0]] += 1
+    pending[key] = (name, timestamp)
+
+  def finish(self, key, timestamp, pending, suffix=""):
+    request = pending.pop(key, None)
+    if request is not None:
+      self.samples[request[0] + suffix].append(timestamp - request[1])
+
+  def add(self, record):
+    data = record.data
+    kind, detail = classifyPacket(data)
+    if kind == "COMMAND":
+      self.start(detail, commandName(detail), record.timestamp, self.pendingCommands)
+    elif kind == "EVENT" and detail == EVT_COMMAND_COMPLETE and len(data) >= 6:
+      self.finish(data[4] | (data[5] << 8), record.timestamp, self.pendingCommands)
+    elif kind == "EVENT" and detail == EVT_COMMAND_STATUS and len(data) >= 7:
+      self.finish(data[5] | (data[6] << 8), record.timestamp, self.pendingCommands, " (status)")
+    elif kind == "ATT":
+      handle, opcode = detail
+      received = record.flags & 0x01
+      if opcode in ATT_RESPONSES:
+        self.start((handle, received), attName(opcode), record.timestamp, self.pendingAtt)
+      elif opcode in ATT_REQUESTS or opcode == ATT_OP_ERROR:
+        # Responses travel the other way from their request
+        suffix = " (error)" if opcode == ATT_OP_ERROR else ""
+        self.finish((handle, not received), record.timestamp, self.pendingAtt, suffix)
+    return kind, detail
+
+  def close(self):
+    for name, _ in list(self.pendingCommands.values()) + list(self.pendingAtt.values()):
+      self.unanswered[name] += 1
+    self.pendingCommands.clear()
+    self.pendingAtt.clear()
+
+def packetLabel(kind, detail, data):
+  if kind == "COMMAND":
+    return "CMD " + commandName(detail)
+  if kind == "EVENT":
+    return "EVT " + eventName(detail, data)
+  if kind == "ATT":
+    return "ATT " + attName(detail[1])
+  if kind == "ACLDATA":
+    return "ACL handle 0x%03x" % detail
+  return "Unknown"
+
+def percentile(ordered, pct):
+  return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def formatHistogram(samples, width=40):
+  counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+  for sample in samples:
+    bucket = 0
+    while bucket < len(HISTOGRAM_BOUNDS) and sample > HISTOGRAM_BOUNDS[bucket]:
+      bucket += 1
+    counts[bucket] += 1
+  peak = max(counts)
+  lines = []
+  for bucket, count in enumerate(counts):
+    if not count:
+      continue
+    label = "<= %7.2f ms" % (HISTOGRAM_BOUNDS[bucket] / 1000) if bucket < len(HISTOGRAM_BOUNDS) else " > %7.2f ms" % (HISTOGRAM_BOUNDS[-1] / 1000)
+    lines.append("    %s %-*s %d" % (label, width, "#" * max(1, count * width // peak), count))
+  return lines
+
+def formatReport(tracker, packetCounts=None):
+  lines = []
+  if packetCounts is not None:
+    lines.append("packets")
+    for label, count in packetCounts.most_common():
+      lines.append("  %-40s %8d" % (label, count))
+    lines.append("")
+  lines.append("%-40s %7s %9s %9s %9s %9s" % ("operation", "count", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+  for name in sorted(tracker.samples, key=lambda name: -len(tracker.samples[name])):
+    ordered = sorted(tracker.samples[name])
+    p50, p95, p99 = (percentile(ordered, pct) / 1000 for pct in (50, 95, 99))
+    lines.append("%-40s %7d %9.2f %9.2f %9.2f %9.2f" % (name, len(ordered), p50, p95, p99, ordered[-1] / 1000))
+    lines.extend(formatHistogram(ordered))
+  for name, count in tracker.unanswered.most_common():
+    lines.append("unanswered %s x%d" % (name, count))
+  return "\n".join(lines)
+
+# Decode every record in the window, returning the tracker and per-label packet counts
+def analyze(reader, start=None, end=None):
+  tracker = LatencyTracker()
+  packetCounts = collections.Counter()
+  for record in reader.filter(start=start, end=end):
+    kind, detail = tracker.add(record)
+    packetCounts[packetLabel(kind, detail, record.data)] += 1
+  tracker.close()
+  return tracker, packetCounts
+
+parser = argparse.ArgumentParser()
+parser.add_argument('inputPath', type=str, help='btsnoop file written by arduino-ble-parser.py')
+parser.add_argument('--from', dest='start', type=str, default=None, help='first timestamp to analyze (ISO date/time or HH:MM:SS[.ffffff])')
+parser.add_argument('--to', dest='end', type=str, default=None, help='analyze packets before this timestamp')
+parser.add_argument('--counts', action='store_true', help='also print packet counts per command, event and ATT opcode')
+
+if __name__ == '__main__':
+  args = parser.parse_args()
+  with BtsnoopReader(args.inputPath) as reader:
+    tracker, packetCounts = analyze(reader, parseTimeArgument(args.start, reader), parseTimeArgument(args.end, reader))
+  print(formatReport(tracker, packetCounts if args.counts else None))
+  if not tracker.samples:
+    print("no request/response pairs found", file=sys.stderr)
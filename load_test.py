@@ -0,0 +1,193 @@
+'''
+Headless load generator for the chess game server.
+
+Spins up N simulated players on one asyncio loop. Players log in, pair up
+into games (even players create, odd players join), connect to the game
+WebSocket and play random legal moves. Reports latency percentiles for
+login, game creation, join, WebSocket connect and move-to-confirmation.
+
+Example against a local server:
+  python mock_server.py --port 8787 &
+  python load_test.py --players 200 --moves 20 --url http://127.0.0.1:8787
+'''
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from game_model import GameModel
+from game_session import GameSession, MessageDispatcher
+from http_session import AsyncHTTPSession, parse_base_url
+
+SERVER_URL = os.environ.get("CHESS_APP_URL", "https://chess-app-v5.concannon-e.workers.dev")
+HEADERS = {"Content-Type": "application/json"}
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, metric, elapsed):
+        self.samples.setdefault(metric, []).append(elapsed)
+
+    def error(self, metric, reason):
+        self.errors.setdefault(metric, {}).setdefault(reason, 0)
+        self.errors[metric][reason] += 1
+
+    def percentile(self, ordered, pct):
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def report(self):
+        lines = [f"{'metric':<10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for metric in ("login", "create", "join", "connect", "move"):
+            ordered = sorted(self.samples.get(metric, []))
+            if not ordered:
+                lines.append(f"{metric:<10} {0:>7}")
+                continue
+            p50, p95, p99 = (self.percentile(ordered, pct) * 1000 for pct in (50, 95, 99))
+            lines.append(f"{metric:<10} {len(ordered):>7} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {ordered[-1] * 1000:>9.1f}")
+        for metric, reasons in self.errors.items():
+            for reason, count in reasons.items():
+                lines.append(f"error {metric}: {reason} x{count}")
+        return "\n".join(lines)
+
+
+class SimulatedPlayer:
+    def __init__(self, player_id, password, http, recorder, args):
+        self.player_id = player_id
+        self.password = password
+        self.http = http
+        self.recorder = recorder
+        self.args = args
+        self.headers = HEADERS
+
+    async def timed_request(self, metric, method, endpoint):
+        start = time.perf_counter()
+        response = await self.http.request(method, endpoint, headers=self.headers)
+        if response.status != 200:
+            self.recorder.error(metric, f"HTTP {response.status}")
+            return None
+        self.recorder.record(metric, time.perf_counter() - start)
+        return response.json() or {}
+
+    async def log_in(self):
+        data = await self.timed_request("login", "GET", f"/player/login?playerID={self.player_id}&password={self.password}")
+        if data is None or not data.get("token"):
+            return False
+        self.token = data["token"]
+        self.headers = {**HEADERS, "authorization": self.token}
+        return True
+
+    async def create_game(self):
+        data = await self.timed_request("create", "POST", f"/create?playerID={self.player_id}&ai=false")
+        return data.get("gameID") if data else None
+
+    async def join_game(self, game_id):
+        data = await self.timed_request("join", "POST", f"/player/join-game?playerID={self.player_id}&gameID={game_id}")
+        return data is not None
+
+    async def play(self, game_id):
+        host, port, use_tls = parse_base_url(self.args.url)
+        session = GameSession(f"{host}:{port}", game_id, self.player_id, self.token, use_tls=use_tls)
+        start = time.perf_counter()
+        await session.connect()
+        self.recorder.record("connect", time.perf_counter() - start)
+
+        dispatcher = MessageDispatcher(session)
+        board_updates = dispatcher.subscribe("game-state", "move")
+        dispatcher.start()
+        model = GameModel()
+        color = None
+        try:
+            while model.board.ply() < self.args.moves and not model.board.is_game_over():
+                data = await dispatcher.get(board_updates)
+                model.sync(data["fen"], data.get("move"))
+                # Move frames carry the sender's color, so only trust game-state
+                if data["message_type"] == "game-state":
+                    color = data["color"]
+                if color is None or data["turn"] != color[0] or model.board.ply() >= self.args.moves or model.board.is_game_over():
+                    continue
+                await self.make_move(dispatcher, model)
+        finally:
+            await dispatcher.stop()
+            await session.close()
+
+    async def make_move(self, dispatcher, model):
+        if self.args.think_time:
+            await asyncio.sleep(random.uniform(0, self.args.think_time))
+        move = random.choice(list(model.board.legal_moves))
+        start = time.perf_counter()
+        response = await dispatcher.send_move({
+            "message_type": "move",
+            "playerID": self.player_id,
+            "move": model.move_payload(move),
+        })
+        if response is None:
+            # Reconnected mid-send; the game-state that follows decides the turn
+            return
+        if response.get("message_type") != "confirmation":
+            # A locally legal move being refused means the boards diverged
+            self.recorder.error("move", response.get("error", "no confirmation"))
+            raise RuntimeError(f"move {move.uci()} rejected by server")
+        self.recorder.record("move", time.perf_counter() - start)
+        model.push(move)
+        model.sync(response["fen"])
+
+
+async def run_pair(creator, joiner, recorder):
+    if not all(await asyncio.gather(creator.log_in(), joiner.log_in())):
+        return
+    game_id = await creator.create_game()
+    if not game_id or not await joiner.join_game(game_id):
+        return
+    await asyncio.gather(creator.play(game_id), joiner.play(game_id))
+
+
+async def run(args):
+    recorder = LatencyRecorder()
+    host, port, use_tls = parse_base_url(args.url)
+    http = AsyncHTTPSession(host, port, max_connections=args.connections, use_tls=use_tls)
+    players = [
+        SimulatedPlayer(f"{args.prefix}{index}", args.password, http, recorder, args)
+        for index in range(args.players)
+    ]
+
+    async def guarded(creator, joiner):
+        try:
+            await asyncio.wait_for(run_pair(creator, joiner, recorder), args.timeout)
+        except asyncio.TimeoutError:
+            recorder.error("game", "timeout")
+        except Exception as e:
+            recorder.error("game", type(e).__name__)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(guarded(players[i], players[i + 1]) for i in range(0, len(players) - 1, 2)))
+    elapsed = time.perf_counter() - start
+    await http.close()
+
+    moves = len(recorder.samples.get("move", []))
+    print(f"{args.players} players, {moves} moves in {elapsed:.2f}s ({moves / elapsed:.1f} moves/s)")
+    print(recorder.report())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive simulated players against the chess game server")
+    parser.add_argument("--players", type=int, default=10, help="number of simulated players (paired into games)")
+    parser.add_argument("--moves", type=int, default=20, help="plies to play per game")
+    parser.add_argument("--url", default=SERVER_URL, help="server base URL, e.g. http://127.0.0.1:8787 for mock_server.py")
+    parser.add_argument("--prefix", default="loadtest", help="player IDs are <prefix><n>")
+    parser.add_argument("--password", default="LoadTest123", help="password shared by all simulated players")
+    parser.add_argument("--connections", type=int, default=64, help="HTTP keep-alive pool size")
+    parser.add_argument("--think-time", type=float, default=0, help="max random delay before each move, in seconds")
+    parser.add_argument("--timeout", type=float, default=300, help="per-game timeout in seconds")
+    args = parser.parse_args()
+    if args.players < 2 or args.players % 2:
+        parser.error("--players must be an even number of at least 2, players are paired into games")
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,422 @@
+'''
+Local stand-in for the chess-app-v5 Worker, for offline benchmarking of the
+Python clients.
+
+Implements the REST endpoints the CLIs use and the /connect WebSocket
+protocol (game-state, move, confirmation, player_message) over plain HTTP
+with keep-alive. Latency and failure rates can be injected per request.
+
+  python mock_server.py --port 8787 --latency 20 --jitter 10 --failure-rate 0.01
+  CHESS_APP_URL=http://127.0.0.1:8787 python phone_app_cli.py
+'''
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import secrets
+import struct
+from urllib.parse import urlsplit, parse_qs
+import chess
+from chess_engine import Engine, limits_for
+from opening_book import OpeningBook, PositionCache
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 500: "Internal Server Error"}
+
+
+# -----------------------
+# WebSocket framing (RFC 6455, server side)
+# -----------------------
+class WebSocketConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    async def recv(self):
+        # Returns the next text message, or None once the peer closes
+        message = b""
+        while True:
+            first, second = await self.reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack(">H", await self.reader.readexactly(2))
+            elif length == 127:
+                length, = struct.unpack(">Q", await self.reader.readexactly(8))
+            mask = await self.reader.readexactly(4) if second & 0x80 else None
+            payload = await self.reader.readexactly(length)
+            if mask:
+                # Unmask the whole payload with one big-integer XOR
+                key = (mask * (length // 4 + 1))[:length]
+                payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+
+            if opcode == 0x8:
+                await self.close()
+                return None
+            if opcode == 0x9:
+                await self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            message += payload
+            if first & 0x80:
+                return message.decode()
+
+    async def _send_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack(">BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+        self.writer.write(header + payload)
+        await self.writer.drain()
+
+    async def send(self, message):
+        if not self.closed:
+            await self._send_frame(0x1, json.dumps(message).encode())
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                await self._send_frame(0x8, struct.pack(">H", 1000))
+            except ConnectionError:
+                pass
+            self.writer.close()
+
+
+# -----------------------
+# Game state
+# -----------------------
+class MockGame:
+    def __init__(self, game_id, ai=False, difficulty=None, book=None, cache=None):
+        self.game_id = game_id
+        self.board = chess.Board()
+        self.players = []
+        self.colors = {}
+        self.sockets = {}
+        self.ai = ai
+        self.difficulty = difficulty
+        self.engine = Engine(book=book, cache=cache) if ai else None
+
+    def color_of(self, player_id):
+        return "white" if self.colors.get("white") == player_id else "black"
+
+    def info(self, player_id, message_type="game-state"):
+        # Mirrors standardGameInfo() in the Worker
+        return {
+            "fen": self.board.fen(),
+            "color": self.color_of(player_id),
+            "turn": "w" if self.board.turn == chess.WHITE else "b",
+            "game_over": self.board.is_game_over(),
+            "checkmate": self.board.is_checkmate(),
+            "players": ", ".join(self.players),
+            "message_type": message_type,
+        }
+
+    def parse_move(self, move):
+        try:
+            parsed = chess.Move(chess.parse_square(move["from"]), chess.parse_square(move["to"]))
+            if move.get("promotion"):
+                parsed.promotion = chess.Piece.from_symbol(move["promotion"]).piece_type
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+        if not move.get("promotion") and self.board.piece_type_at(parsed.from_square) == chess.PAWN and chess.square_rank(parsed.to_square) in (0, 7):
+            parsed.promotion = chess.QUEEN
+        return parsed if self.board.is_legal(parsed) else None
+
+    def san_moves(self):
+        # The Worker stores each game's moves as SAN for /replay
+        board = chess.Board()
+        sans = []
+        for move in self.board.move_stack:
+            sans.append(board.san(move))
+            board.push(move)
+        return sans
+
+    def ai_move(self):
+        # Local search instead of the Worker's stockfish.online call
+        return self.engine.search(self.board, limits_for(self.difficulty)).move
+
+
+class MockServer:
+    def __init__(self, latency=0, jitter=0, failure_rate=0, drop_rate=0, book=None):
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.users = {}
+        self.tokens = {}
+        self.games = {}
+        self.active_games = {}
+        self.friends = {}
+        self.requests = 0
+        # Shared by every AI game so repeated positions are answered from memory
+        self.book = book
+        self.position_cache = PositionCache()
+
+    # -----------------------
+    # Connection handling
+    # -----------------------
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                url = urlsplit(target)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+                if url.path == "/connect" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.handle_websocket(reader, writer, headers, params)
+                    return
+
+                self.requests += 1
+                await self.inject_latency()
+                if random.random() < self.failure_rate:
+                    status, payload, extra = 500, {"message_type": "error", "error": "Injected failure"}, {}
+                else:
+                    status, payload, extra = self.route(method, url.path, params, headers)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.write_response(writer, status, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return method, target, headers, body
+
+    def write_response(self, writer, status, payload, extra, keep_alive):
+        body = b"" if status == 304 else json.dumps(payload).encode()
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Content-Type: application/json", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in extra.items()]
+        if not keep_alive:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+
+    async def inject_latency(self):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # -----------------------
+    # REST endpoints
+    # -----------------------
+    def route(self, method, path, params, headers):
+        player_id = params.get("playerID")
+        if path == "/player/login":
+            return self.log_in(player_id, params.get("password"))
+        if path == "/player/register":
+            self.users[player_id] = params.get("password")
+            return 200, {"message": "User registered successfully."}, {}
+        if path == "/player/reset-password":
+            return 200, {}, {}
+
+        if path == "/replay":
+            # Like the Worker, replays only need a valid token, not a player ID
+            if headers.get("authorization") not in self.tokens:
+                return 403, {"message_type": "error", "error": "Authentication Failed"}, {}
+            game = self.games.get(params.get("gameID"))
+            return 200, {"moves": game.san_moves() if game else []}, {}
+
+        if self.tokens.get(headers.get("authorization")) != player_id:
+            return 403, {"message_type": "error", "error": "Authentication Failed"}, {}
+
+        if path == "/create":
+            return self.create_game(player_id, params)
+        if path == "/player/join-game":
+            return self.join_game(player_id, params.get("gameID"))
+        if path == "/player/games":
+            return self.cacheable(headers, {"games": [self.game_summary(game_id) for game_id in self.active_games.get(player_id, [])]})
+        if path == "/player/friends":
+            return self.cacheable(headers, {"friends": sorted(self.friends.get(player_id, set()))})
+        if path == "/player/friends/add":
+            self.friends.setdefault(player_id, set()).add(params.get("friendID"))
+            return 200, {}, {}
+        if path == "/player/friends/remove":
+            self.friends.setdefault(player_id, set()).discard(params.get("friendID"))
+            return 200, {}, {}
+        if path == "/player/challenge":
+            return 200, {}, {}
+        if path == "/player/end-game":
+            return self.end_game(player_id, params.get("gameID"))
+        if path == "/player/end-all-games":
+            self.active_games[player_id] = []
+            return 200, {"success": True}, {}
+        return 404, {"message_type": "error", "error": "Not Found"}, {}
+
+    def log_in(self, player_id, password):
+        # Unknown players are registered on first login so load tests need no setup
+        if self.users.setdefault(player_id, password) != password:
+            return 404, {}, {}
+        token = secrets.token_hex(16)
+        self.tokens[token] = player_id
+        return 200, {"token": token}, {}
+
+    def create_game(self, player_id, params):
+        game_id = secrets.token_hex(4)
+        self.games[game_id] = MockGame(game_id, params.get("ai") == "true", params.get("difficulty"),
+                                       self.book, self.position_cache)
+        self.games[game_id].players.append(player_id)
+        self.active_games.setdefault(player_id, []).append(game_id)
+        return 200, {"gameID": game_id}, {}
+
+    def join_game(self, player_id, game_id):
+        game = self.games.get(game_id)
+        if game is None:
+            return 404, {"message_type": "error", "error": "Game not found."}, {}
+        if player_id in game.players:
+            return 403, {"message_type": "error", "error": "You are already in this game!"}, {}
+        if len(game.players) >= 2:
+            return 403, {"message_type": "error", "error": "Game is full. Cannot join."}, {}
+        game.players.append(player_id)
+        self.active_games.setdefault(player_id, []).append(game_id)
+        return 200, {"message_type": "game-joined", "gameID": game_id}, {}
+
+    def end_game(self, player_id, game_id):
+        games = self.active_games.get(player_id, [])
+        if game_id not in games:
+            return 400, {"error": "Game not in active games."}, {}
+        games.remove(game_id)
+        return 200, {"success": True}, {}
+
+    def game_summary(self, game_id):
+        game = self.games[game_id]
+        return {"gameID": game_id, "players": ", ".join(game.players), "turn": "w" if game.board.turn else "b"}
+
+    def cacheable(self, headers, payload):
+        etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16] + '"'
+        if headers.get("if-none-match") == etag:
+            return 304, None, {"ETag": etag}
+        return 200, payload, {"ETag": etag}
+
+    # -----------------------
+    # WebSocket game protocol
+    # -----------------------
+    async def handle_websocket(self, reader, writer, headers, params):
+        game = self.games.get(params.get("gameID"))
+        player_id = params.get("playerID")
+        if game is None or not player_id:
+            self.write_response(writer, 400, {"error": "Missing gameID or playerID"}, {}, False)
+            await writer.drain()
+            writer.close()
+            return
+
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+
+        websocket = WebSocketConnection(reader, writer)
+        game.sockets[player_id] = websocket
+        if not game.colors.get("white"):
+            game.colors["white"] = player_id
+        elif not game.colors.get("black") and game.colors["white"] != player_id:
+            game.colors["black"] = player_id
+        await websocket.send(game.info(player_id))
+
+        try:
+            while True:
+                message = await websocket.recv()
+                if message is None:
+                    break
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    data = None
+                if not isinstance(data, dict):
+                    await websocket.send({"message_type": "error", "error": "Invalid message"})
+                    continue
+                if data.get("message_type") == "move":
+                    await self.inject_latency()
+                    if random.random() < self.drop_rate:
+                        await websocket.close()
+                        break
+                    await self.process_move(game, websocket, data)
+                elif data.get("message_type") == "player_message":
+                    await self.send_to_opponent(game, websocket, data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if game.sockets.get(player_id) is websocket:
+                del game.sockets[player_id]
+            writer.close()
+
+    async def process_move(self, game, websocket, data):
+        player_id = data.get("playerID")
+        if game.color_of(player_id)[0] != ("w" if game.board.turn else "b"):
+            await websocket.send({"message_type": "error", "error": "Not your turn"})
+            return
+        move = game.parse_move(data.get("move") or {})
+        if move is None:
+            await websocket.send({"message_type": "error", "error": "Invalid move"})
+            return
+
+        game.board.push(move)
+        await websocket.send(game.info(player_id, "confirmation"))
+        if game.ai and not game.board.is_game_over():
+            # Like the Worker, AI replies carry the new FEN but no move field
+            game.board.push(await asyncio.to_thread(game.ai_move))
+            await websocket.send(game.info(player_id, "move"))
+        else:
+            payload = game.info(player_id, "move")
+            payload["move"] = {"from": chess.square_name(move.from_square), "to": chess.square_name(move.to_square)}
+            await self.send_to_opponent(game, websocket, payload)
+
+    async def send_to_opponent(self, game, sender, payload):
+        for websocket in list(game.sockets.values()):
+            if websocket is not sender:
+                await websocket.send(payload)
+
+
+async def serve(args):
+    book = OpeningBook(args.book) if args.book else None
+    server = MockServer(args.latency, args.jitter, args.failure_rate, args.drop_rate, book)
+    listener = await asyncio.start_server(server.handle_connection, args.host, args.port)
+    print(f"Mock game server listening on http://{args.host}:{args.port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local stand-in for the chess game Worker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0, help="injected latency per request/move, in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="uniform +/- jitter on the injected latency, in ms")
+    parser.add_argument("--failure-rate", type=float, default=0, help="fraction of REST requests answered with HTTP 500")
+    parser.add_argument("--drop-rate", type=float, default=0, help="fraction of moves that drop the WebSocket instead")
+    parser.add_argument("--book", default=None, help="Polyglot opening book for AI games (see opening_book.py)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
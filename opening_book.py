@@ -0,0 +1,170 @@
+'''
+Opening book and position cache for AI moves.
+
+The book is a Polyglot .bin file: 16 byte entries (Zobrist key, move, weight,
+learn) sorted by key, so lookups are a binary search over a memory-mapped
+file. Books are built offline from PGN game records; a move's weight is its
+score over all games that reached the position (win 2, draw 1, loss 0).
+
+  python opening_book.py build games.pgn more_games.pgn -o book.bin --plies 20
+  python opening_book.py probe book.bin --fen "<fen>"
+
+PositionCache holds recent search results keyed by Zobrist hash with LRU
+eviction. An entry only answers a search asking for at most its depth.
+'''
+
+import argparse
+import collections
+import struct
+import threading
+import chess
+import chess.pgn
+import chess.polyglot
+
+BOOK_ENTRY = struct.Struct(">QHHI")
+BOOK_PLIES = 20
+BOOK_MIN_GAMES = 2
+CACHE_CAPACITY = 100000
+RESULT_POINTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1)}
+
+
+class CachedMove:
+    def __init__(self, move, score, depth):
+        self.move = move
+        self.score = score
+        self.depth = depth
+
+
+class PositionCache:
+    """LRU map from Zobrist hash to the deepest search result seen for it."""
+
+    def __init__(self, capacity=CACHE_CAPACITY):
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()
+        # Engines for different games search on worker threads
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, board, min_depth):
+        key = chess.polyglot.zobrist_hash(board)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.depth < min_depth:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, board, move, score, depth):
+        key = chess.polyglot.zobrist_hash(board)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.depth > depth:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = CachedMove(move, score, depth)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"Position cache: {len(self.entries)} positions, {self.hits}/{lookups} hits ({rate:.0f}%)"
+
+
+class OpeningBook:
+    """Read-only Polyglot book; picks the highest weighted move by default."""
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = chess.polyglot.open_reader(path)
+
+    def close(self):
+        self.reader.close()
+
+    def move(self, board, weighted_random=False):
+        try:
+            if weighted_random:
+                return self.reader.weighted_choice(board).move
+            return self.reader.find(board).move
+        except IndexError:
+            return None
+
+    def entries(self, board):
+        return list(self.reader.find_all(board))
+
+
+def encode_book_move(board, move):
+    # Polyglot writes castling as king-takes-rook and promotions in bits 12-14
+    from_square, to_square = move.from_square, move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if chess.square_file(to_square) > chess.square_file(from_square) else 0
+        to_square = chess.square(rook_file, chess.square_rank(from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (from_square << 6) | (promotion << 12)
+
+
+def build_book(pgn_paths, output_path, plies=BOOK_PLIES, min_games=BOOK_MIN_GAMES):
+    # Returns (games read, entries written)
+    stats = collections.defaultdict(lambda: [0, 0])  # (key, encoded move) -> [games, points]
+    games = 0
+    for path in pgn_paths:
+        with open(path, encoding="utf-8", errors="replace") as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                points = RESULT_POINTS.get(game.headers.get("Result"))
+                if points is None:
+                    continue
+                games += 1
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= plies:
+                        break
+                    entry = stats[(chess.polyglot.zobrist_hash(board), encode_book_move(board, move))]
+                    entry[0] += 1
+                    entry[1] += points[0 if board.turn == chess.WHITE else 1]
+                    board.push(move)
+
+    entries = []
+    for (key, encoded), (count, points) in stats.items():
+        if count < min_games:
+            continue
+        # Never write weight 0, Polyglot readers skip those moves
+        entries.append((key, encoded, min(0xFFFF, max(1, points))))
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(output_path, "wb") as book:
+        for key, encoded, weight in entries:
+            book.write(BOOK_ENTRY.pack(key, encoded, weight, 0))
+    return games, len(entries)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build or probe a Polyglot opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a book from PGN files")
+    build.add_argument("pgn", nargs="+", help="PGN files with game results")
+    build.add_argument("-o", "--output", required=True, help="book file to write")
+    build.add_argument("--plies", type=int, default=BOOK_PLIES, help="only book the first N plies of each game")
+    build.add_argument("--min-games", type=int, default=BOOK_MIN_GAMES, help="drop moves played in fewer games")
+    probe = commands.add_parser("probe", help="list book moves for a position")
+    probe.add_argument("book", help="book file")
+    probe.add_argument("--fen", default=chess.STARTING_FEN)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "build":
+        games, entries = build_book(args.pgn, args.output, args.plies, args.min_games)
+        print(f"{entries} book entries from {games} games written to {args.output}")
+    else:
+        book = OpeningBook(args.book)
+        board = chess.Board(args.fen)
+        for entry in book.entries(board):
+            print(f"{board.san(entry.move):<8} weight {entry.weight}")
+        book.close()
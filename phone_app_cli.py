@@ -1,26 +1,35 @@
-import http.client
 import json
+import os
 import asyncio
-from bleak import BleakScanner, BleakClient
-import subprocess
+from ble_discovery import DeviceCache, connect_board
+from board_events import relay_game
+from replay_navigator import ReplayNavigator, replay_on_board
+from game_session import GameSession
+from ble_provisioning import provision
+from http_session import AsyncHTTPSession, parse_base_url
+from response_cache import ResponseCache
+from wifi_credentials import WifiCredentials, default_provider
 import re
+import time
 
-# UUIDs (match Arduino's characteristics)
-SSID_CHAR_UUID = "8266532f-1fe1-4af9-97e1-3b7c04ef8201"
-PASSWORD_CHAR_UUID = "91abf729-1b45-4147-b8f7-b93620e8bce1"
-GAMEID_CHAR_UUID = "5f91bb09-093c-42d7-b615-a2b110369a2e"
-PLAYERID_CHAR_UUID = "bcf9cb8c-78f4-4b22-8f2c-ad5df34a34cd"
-RESET_CHAR_UUID = "cfb3a8c4-85c7-4e9f-9f0b-b1c6e22b15e2"
-
-ARDUINO_NAME = "GIGA_R1_Bluetooth"
-BASE_URL = "chess-app-v5.concannon-e.workers.dev"
-PORT = 443
+# Override with e.g. CHESS_APP_URL=http://127.0.0.1:8787 to target mock_server.py
+SERVER_URL = os.environ.get("CHESS_APP_URL", "https://chess-app-v5.concannon-e.workers.dev")
+BASE_URL, PORT, USE_TLS = parse_base_url(SERVER_URL)
 HEADERS = {"Content-Type": "application/json"}
+BATCH_CONCURRENCY = 8
+GAMES_PATH = "/player/games"
+FRIENDS_PATH = "/player/friends"
+
+
+async def ainput(prompt):
+    # Read stdin on a worker thread so background tasks keep running
+    return await asyncio.to_thread(input, prompt)
 
 
 class ChessAppCLI:
     def __init__(self):
-        self.conn = http.client.HTTPSConnection(BASE_URL, PORT)
+        self.session = AsyncHTTPSession(BASE_URL, PORT, max_connections=BATCH_CONCURRENCY, use_tls=USE_TLS)
+        self.cache = ResponseCache()
         self.authenticated = False
         self.player_id = ""
         self.password = ""
@@ -30,6 +39,9 @@ class ChessAppCLI:
         self.email = ""
         self.friends = []
         self.devices = []
+        self.client = None
+        self.device_cache = DeviceCache()
+        self.wifi = WifiCredentials(default_provider())
         self.auth_headers = HEADERS
 
     # -----------------------
@@ -50,24 +62,27 @@ class ChessAppCLI:
                 print("3. Scan for Bluetooth Devices")
                 print("4. Log Out")
 
-            choice = input("Select an option: ")
+            choice = await ainput("Select an option: ")
             if not self.authenticated:
                 if choice == "1":
-                    self.log_in()
+                    await self.log_in()
                 elif choice == "2":
-                    self.sign_up()
+                    await self.sign_up()
                 elif choice == "3":
-                    self.reset_password()
+                    await self.reset_password()
                 elif choice == "4":
                     await self.scan_and_connect_bluetooth()
                 elif choice == "5":
                     print("Exiting...")
+                    print(self.session.stats.summary())
+                    print(self.cache.summary())
+                    await self.session.close()
                     break
                 else:
                     print("Invalid option. Please try again.")
             else:
                 if choice == "1":
-                    self.manage_friends()
+                    await self.manage_friends()
                 elif choice == "2":
                     await self.manage_games()
                 elif choice == "3":
@@ -80,9 +95,9 @@ class ChessAppCLI:
     # -----------------------
     # Log In
     # -----------------------
-    def log_in(self):
-        self.player_id = input("Enter Player ID: ")
-        self.password = input("Enter Password: ")
+    async def log_in(self):
+        self.player_id = await ainput("Enter Player ID: ")
+        self.password = await ainput("Enter Password: ")
 
         if not self.player_id or not self.password:
             print("Error: Player ID and Password are required.")
@@ -90,12 +105,12 @@ class ChessAppCLI:
 
         try:
             endpoint = f"/player/login?playerID={self.player_id}&password={self.password}"
-            self.conn.request("GET", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("GET", endpoint, headers=self.auth_headers)
 
             if response.status == 200:
                 print(f"Welcome {self.player_id}!")
                 self.authenticated = True
+                self.cache.clear()
                 self.token = json.loads(response.read().decode()).get("token")
                 self.auth_headers = {**HEADERS, "authorization": self.token}
             elif response.status == 403:
@@ -106,16 +121,14 @@ class ChessAppCLI:
                 print("Invalid username or password.")
         except Exception as e:
             print(f"Error logging in: {e}")
-        finally:
-            self.conn.close()
 
     # -----------------------
     # Sign Up
     # -----------------------
-    def sign_up(self):
-        player_id = input("Choose Player ID: ")
-        password = input("Create Password: ")
-        email = input("Enter Email: ")
+    async def sign_up(self):
+        player_id = await ainput("Choose Player ID: ")
+        password = await ainput("Create Password: ")
+        email = await ainput("Enter Email: ")
 
         if not player_id or not password or not email:
             print("All fields are required.")
@@ -132,8 +145,7 @@ class ChessAppCLI:
 
         try:
             endpoint = f"/player/register?playerID={player_id}&email={email}&password={password}"
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
 
             if response.status == 200:
                 print("Registration successful!")
@@ -141,20 +153,17 @@ class ChessAppCLI:
                 print("Registration failed.")
         except Exception as e:
             print(f"Error registering player: {e}")
-        finally:
-            self.conn.close()
 
     # -----------------------
     # Reset Password
     # -----------------------
-    def reset_password(self):
-        player_id = input("Enter Player ID: ")
-        email = input("Enter Email: ")
+    async def reset_password(self):
+        player_id = await ainput("Enter Player ID: ")
+        email = await ainput("Enter Email: ")
 
         try:
             endpoint = f"/player/reset-password?playerID={player_id}&email={email}"
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
 
             if response.status == 200:
                 print("Password reset email sent.")
@@ -162,38 +171,30 @@ class ChessAppCLI:
                 print("Password reset failed.")
         except Exception as e:
             print(f"Error resetting password: {e}")
-        finally:
-            self.conn.close()
 
     # -----------------------
     # Fetch Ongoing Games
     # -----------------------
-    def fetch_ongoing_games(self):
+    async def fetch_ongoing_games(self):
         if not self.authenticated:
             print("Please log in to view ongoing games.")
             return
 
-        games = self.fetch_ongoing_games_common()
+        games = await self.fetch_ongoing_games_common()
         if games:
             print("\n--- Ongoing Games ---")
             for game in games:
                 print(f"Game ID: {game['gameID']} | Players: {game['players']} | Turn: {game['turn']}")
 
 
-    def fetch_ongoing_games_common(self):
+    async def fetch_ongoing_games_common(self):
         try:
             endpoint = f"/player/games?playerID={self.player_id}"
-            self.conn.request("GET", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
-
-            try:
-                data = json.loads(response.read().decode())
-            except Exception as e:
-                data = None
+            status, data = await self.cached_get(endpoint)
 
-            if response.status == 200 and data and data.get("games"):
+            if status == 200 and data and data.get("games"):
                 return data.get("games")
-            elif response.status == 403:
+            elif status == 403:
                 print("Authentication Failed!")
                 self.authenticated = False
                 self.auth_headers = HEADERS
@@ -204,71 +205,77 @@ class ChessAppCLI:
         except Exception as e:
             print(f"Error fetching games: {e}")
             return []
-        finally:
-            self.conn.close()
 
     # -----------------------
-    # Bluetooth Scanning and Connecting
+    # Cached GET
     # -----------------------
-    async def scan_and_connect_bluetooth(self):
-        print("Scanning for Bluetooth devices...")
+    async def cached_get(self, endpoint):
+        # Serve from cache while fresh, revalidate with If-None-Match once stale
+        path = endpoint.split("?", 1)[0]
+        entry = self.cache.get(path, self.player_id)
+        if entry and entry.is_fresh():
+            self.cache.hits += 1
+            return 200, entry.data
 
-        devices = await BleakScanner.discover()
-        arduino_device = None
+        headers = self.auth_headers
+        if entry and entry.etag:
+            headers = {**headers, "If-None-Match": entry.etag}
 
-        if not devices:
-            print("No bluetooth devices found")
-            return None
+        response = await self.session.request("GET", endpoint, headers=headers)
+        if response.status == 304 and entry:
+            self.cache.revalidated += 1
+            entry.refresh()
+            return 200, entry.data
 
-        # Find Arduino based on advertised name
-        for device in devices:
-            if ARDUINO_NAME == device.name:
-                arduino_device = device
-                print(f"Found Arduino: {arduino_device.name} ({arduino_device.address})")
-                break
-
-        if arduino_device:
-            self.client = BleakClient(arduino_device.address)
-            try:
-                await self.client.connect()
-            except:
-                print("error connecting to arduino")
-                return
-            print(f"Connected to {arduino_device.address}")
-            
-            # List available services and characteristics
-            services = await self.client.get_services()
-            print(services)
-            for service in services:
-                print(f"[Service] {service.uuid}")
-                for char in service.characteristics:
-                    print(f"  [Characteristic] {char.uuid} - {char.properties}")
-            # await self.update_characteristics(client)
+        self.cache.misses += 1
+        data = response.json()
+        if response.status == 200:
+            self.cache.put(path, self.player_id, data, response.getheader("etag"))
         else:
-            print("Arduino not found. Please ensure it is powered on and in range.")
-        return
+            self.cache.invalidate(path, player_id=self.player_id)
+        return response.status, data
 
-    async def update_characteristics(self, game):
-        # Write to BLE characteristics
-        print("updating characteristics of ", self.client.address)
-        await self.client.write_gatt_char(SSID_CHAR_UUID, self.ssid.encode('utf-8'))
-        print("SSID updated.")
+    # -----------------------
+    # Bluetooth Scanning and Connecting
+    # -----------------------
+    async def scan_and_connect_bluetooth(self):
+        print("Connecting to board...")
+        if self.client and self.client.is_connected:
+            print(f"Already connected to {self.client.address}")
+            return
 
-        await self.client.write_gatt_char(PASSWORD_CHAR_UUID, self.wifi_password.encode('utf-8'))
-        print("Password updated.")
+        try:
+            self.client, timer = await connect_board(self.device_cache)
+        except Exception as e:
+            print(f"error connecting to arduino: {e}")
+            self.client = None
+            return
 
-        await self.client.write_gatt_char(GAMEID_CHAR_UUID, game["gameID"].encode('utf-8'))
-        print("Game ID updated.")
+        if not self.client:
+            print("Arduino not found. Please ensure it is powered on and in range.")
+            return
+        print(f"Connected to {self.client.address}")
+        print(timer)
 
-        await self.client.write_gatt_char(PLAYERID_CHAR_UUID, self.player_id.encode('utf-8'))
-        print("User ID updated.")
+        # Only list characteristics when they differ from the cached handle map
+        if timer.handles_changed:
+            for uuid, handle in self.device_cache.handles.items():
+                print(f"  [Characteristic] {uuid} - handle {handle}")
         return
 
+    async def update_characteristics(self, game, use_type="play"):
+        # Write to BLE characteristics
+        print("updating characteristics of ", self.client.address)
+        # Single framed write on current firmware, five writes on older boards
+        result = await provision(self.client, self.ssid, self.wifi_password, game["gameID"], self.player_id, use_type)
+        print(result)
+        return result
+
 
     # -----------------------
     # Manage Friends
     # -----------------------
-    def manage_friends(self):
+    async def manage_friends(self):
         while True:
             print("\n--- Manage Friends ---")
             print("1. View Friends List")
@@ -277,15 +284,15 @@ class ChessAppCLI:
             print("4. Challenge Friend")
             print("5. Back to Main Menu")
 
-            choice = input("Select an option: ")
+            choice = await ainput("Select an option: ")
             if choice == "1":
-                self.view_friends()
+                await self.view_friends()
             elif choice == "2":
-                self.add_friend()
+                await self.add_friend()
             elif choice == "3":
-                self.remove_friend()
+                await self.remove_friend()
             elif choice == "4":
-                self.challenge_friend()
+                await self.challenge_friend()
             elif choice == "5":
                 break
             else:
@@ -294,18 +301,16 @@ class ChessAppCLI:
     # -----------------------
     # View Friends List
     # -----------------------
-    def view_friends(self):
+    async def view_friends(self):
         if not self.authenticated:
             print("Please log in to view your friends.")
             return
 
         try:
             endpoint = f"/player/friends?playerID={self.player_id}"
-            self.conn.request("GET", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
-            data = json.loads(response.read().decode())
+            status, data = await self.cached_get(endpoint)
 
-            if response.status == 200:
+            if status == 200:
                 self.friends = data.get("friends", [])
                 if self.friends:
                     print("\n--- Friends List ---")
@@ -313,7 +318,7 @@ class ChessAppCLI:
                         print(f"- {friend}")
                 else:
                     print("No friends found.")
-            elif response.status == 403:
+            elif status == 403:
                 print("Authentication Failed!")
                 self.authenticated = False
                 self.auth_headers = HEADERS
@@ -321,18 +326,16 @@ class ChessAppCLI:
                 print("Failed to fetch friends list.")
         except Exception as e:
             print(f"Error fetching friends: {e}")
-        finally:
-            self.conn.close()
 
     # -----------------------
     # Add Friend
     # -----------------------
-    def add_friend(self):
+    async def add_friend(self):
         if not self.authenticated:
             print("Please log in to add friends.")
             return
 
-        friend_id = input("Enter Friend's Player ID: ").strip()
+        friend_id = (await ainput("Enter Friend's Player ID: ")).strip()
         if not friend_id:
             print("Friend ID cannot be empty.")
             return
@@ -343,11 +346,11 @@ class ChessAppCLI:
 
         try:
             endpoint = f"/player/friends/add?playerID={self.player_id}&friendID={friend_id}"
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
 
             if response.status == 200:
                 self.friends.append(friend_id)
+                self.cache.invalidate(FRIENDS_PATH, player_id=self.player_id)
                 print(f"{friend_id} has been added to your friends list.")
             elif response.status == 403:
                 print("Authentication Failed!")
@@ -357,13 +360,11 @@ class ChessAppCLI:
                 print("Failed to add friend.")
         except Exception as e:
             print(f"Error adding friend: {e}")
-        finally:
-            self.conn.close()
 
     # -----------------------
     # Remove Friend
     # -----------------------
-    def remove_friend(self):
+    async def remove_friend(self):
         if not self.authenticated:
             print("Please log in to manage friends.")
             return
@@ -377,22 +378,22 @@ class ChessAppCLI:
             print(f"{idx + 1}. {friend}")
 
         try:
-            choice = int(input("Select friend to remove (0 to cancel): "))
+            choice = int(await ainput("Select friend to remove (0 to cancel): "))
             if choice == 0:
                 return
 
             friend_id = self.friends[choice - 1]
-            confirm = input(f"Remove {friend_id}? (y/n): ").strip().lower()
+            confirm = (await ainput(f"Remove {friend_id}? (y/n): ")).strip().lower()
 
             if confirm != 'y':
                 return
 
             endpoint = f"/player/friends/remove?playerID={self.player_id}&friendID={friend_id}"
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
 
             if response.status == 200:
                 self.friends.remove(friend_id)
+                self.cache.invalidate(FRIENDS_PATH, player_id=self.player_id)
                 print(f"{friend_id} has been removed.")
             elif response.status == 403:
                 print("Authentication Failed!")
@@ -404,13 +405,11 @@ class ChessAppCLI:
             print("Invalid selection.")
         except Exception as e:
             print(f"Error removing friend: {e}")
-        finally:
-            self.conn.close()
 
     # -----------------------
     # Challenge Friend
     # -----------------------
-    def challenge_friend(self):
+    async def challenge_friend(self):
         if not self.authenticated:
             print("Please log in to challenge friends.")
             return
@@ -424,14 +423,19 @@ class ChessAppCLI:
             print(f"{idx + 1}. {friend}")
 
         try:
-            choice = int(input("Select friend to challenge (0 to cancel): "))
-            if choice == 0:
+            choices = self.parse_selection(await ainput("Select friend(s) to challenge, comma separated (0 to cancel): "))
+            if not choices or 0 in choices:
                 return
 
-            friend_id = self.friends[choice - 1]
+            if len(choices) > 1:
+                friend_ids = [self.friends[choice - 1] for choice in choices]
+                results, elapsed = await self.batch_challenge(friend_ids)
+                self.print_batch_results("Challenge", results, elapsed)
+                return
+
+            friend_id = self.friends[choices[0] - 1]
             endpoint = f"/player/challenge?playerID={self.player_id}&opponentID={friend_id}"
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
 
             if response.status == 200:
                 print(f"Challenge sent to {friend_id}.")
@@ -445,8 +449,6 @@ class ChessAppCLI:
             print("Invalid selection.")
         except Exception as e:
             print(f"Error challenging friend: {e}")
-        finally:
-            self.conn.close()
 
 
     # -----------------------
@@ -460,20 +462,26 @@ class ChessAppCLI:
             print("3. Leave Game")
             print("4. View Ongoing Games")
             print("5. Send Game to Board")
-            print("6. Back to Main Menu")
+            print("6. Play Game Through Board")
+            print("7. Replay Game on Board")
+            print("8. Back to Main Menu")
 
-            choice = input("Select an option: ")
+            choice = await ainput("Select an option: ")
             if choice == "1":
-                self.create_game()
+                await self.create_game()
             elif choice == "2":
-                self.join_game()
+                await self.join_game()
             elif choice == "3":
-                self.leave_game()
+                await self.leave_game()
             elif choice == "4":
-                self.fetch_ongoing_games()
+                await self.fetch_ongoing_games()
             elif choice == "5":
                 await self.send_game_to_board()
             elif choice == "6":
+                await self.relay_board_moves()
+            elif choice == "7":
+                await self.replay_game_on_board()
+            elif choice == "8":
                 break
             else:
                 print("Invalid option. Try again.")
@@ -482,56 +490,103 @@ class ChessAppCLI:
     # -----------------------
     # Send Game to Board
     # -----------------------
-    async def send_game_to_board(self):
+    async def send_game_to_board(self, use_type="play"):
         if not self.authenticated:
             print("Please log in to send game to board.")
             return
         
-        if not self.client.is_connected:
+        if not self.client or not self.client.is_connected:
             print("No board connected. Please connect to a board first.")
             return
         
-        self.ssid, self.wifi_password = self.get_connected_wifi_info()
+        # Reading the OS Wi-Fi settings shells out, so keep it off the event loop
+        self.ssid, self.wifi_password = await asyncio.to_thread(self.get_connected_wifi_info)
         if not self.ssid or not self.wifi_password:
             print("Must be connected to wifi.")
             return
 
-        games = self.fetch_ongoing_games_common()
+        games = await self.fetch_ongoing_games_common()
         if games:
             print("\n--- Ongoing Games ---")
             for idx, game in enumerate(games):
                 print(f"{idx + 1}. Game ID: {game['gameID']}, Opponent: {game['players']}, Turn: {game['turn']}")
 
-            game_choice = input("\nSelect a game to send to the board (Enter number): ")
+            game_choice = await ainput("\nSelect a game to send to the board (Enter number): ")
             
             try:
                 selected_game = games[int(game_choice) - 1]
-                await self.transmit_game_to_board(selected_game)
             except (IndexError, ValueError):
                 print("Invalid selection.")
+                return None
+            if await self.transmit_game_to_board(selected_game, use_type):
+                return selected_game
+        return None
 
 
     # -----------------------
-    # Get WiFi info
+    # Relay Board Moves
     # -----------------------
-    def get_connected_wifi_info(self):
+    async def relay_board_moves(self):
+        # The board only detects moves; they reach the server over this app's WebSocket
+        game = await self.send_game_to_board(use_type="relay")
+        if not game:
+            return
+
+        session = GameSession(f"{BASE_URL}:{PORT}", game["gameID"], self.player_id, self.token, use_tls=USE_TLS)
         try:
-            # Get the currently connected network
-            current_network_data = subprocess.check_output(['netsh', 'wlan', 'show', 'interfaces']).decode('utf-8').split('\n')
-            current_network = [line.split(":")[1][1:-1] for line in current_network_data if "SSID" in line and "BSSID" not in line]
+            await session.connect()
+            print(f"Relaying moves from the board to game {game['gameID']}. Reset the board to stop.")
+            stats = await relay_game(self.client, session, self.player_id)
+            print(stats.summary())
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            print(f"Game connection lost: {e}")
+        finally:
+            await session.close()
 
-            if current_network:
-                ssid = current_network[0]
 
-                # Get the password for the connected network
-                results = subprocess.check_output(['netsh', 'wlan', 'show', 'profile', ssid, 'key=clear']).decode('utf-8').split('\n')
-                password = [line.split(":")[1][1:-1] for line in results if "Key Content" in line]
+    # -----------------------
+    # Replay Game on Board
+    # -----------------------
+    async def replay_game_on_board(self):
+        # The board's arrow keys step through the game; only changed squares are sent back
+        if not self.authenticated:
+            print("Please log in to replay a game.")
+            return
 
-                # Return SSID and password
-                return ssid, password[0] if password else None
-            else:
-                return None, None  # No Wi-Fi network connected
+        if not self.client or not self.client.is_connected:
+            print("No board connected. Please connect to a board first.")
+            return
 
+        game_id = await ainput("Enter the Game ID to replay: ")
+        try:
+            # Not cached: the response cache is keyed on the path without the game ID
+            response = await self.session.request("GET", f"/replay?gameID={game_id}", headers=self.auth_headers)
+            data = response.json()
+            if response.status != 200:
+                print(f"Failed to get replay: {data.get('error')}")
+                return
+            navigator = ReplayNavigator.from_sans(data.get("moves") or [])
+        except ValueError as e:
+            print(f"Replay has an invalid move: {e}")
+            return
+        except Exception as e:
+            print(f"Error fetching replay: {e}")
+            return
+
+        if not await self.transmit_game_to_board({"gameID": game_id}, use_type="replay"):
+            return
+        print(f"Replaying {len(navigator)} plies. Use the board's arrow keys; reset the board to stop.")
+        ply = await replay_on_board(self.client, navigator)
+        print(f"Replay stopped at ply {ply}.")
+
+
+    # -----------------------
+    # Get WiFi info
+    # -----------------------
+    def get_connected_wifi_info(self):
+        # Cached per SSID; the provider is only asked again when the network changes
+        try:
+            return self.wifi.get()
         except Exception as e:
             print(f"Error: {e}")
             return None, None  # In case of an error
@@ -540,18 +595,20 @@ class ChessAppCLI:
     # -----------------------
     # Transmit Game to Board via Bluetooth
     # -----------------------
-    async def transmit_game_to_board(self, game):
+    async def transmit_game_to_board(self, game, use_type="play"):
         try:
-            await self.update_characteristics(game)
+            await self.update_characteristics(game, use_type)
             print(f"Game {game['gameID']} sent to board.")
+            return True
         except Exception as e:
             print(f"Error sending game to board: {e}")
+            return False
 
 
     # -----------------------
     # Create New Game
     # -----------------------
-    def create_game(self):
+    async def create_game(self):
         if not self.authenticated:
             print("Please log in to create a game.")
             return
@@ -559,7 +616,7 @@ class ChessAppCLI:
         # Step 1: Ask if the player wants to play against AI
         while True:
             print("Would you like to play against AI? (yes/no)")
-            ai_choice = input().strip().lower()
+            ai_choice = (await ainput("")).strip().lower()
             if ai_choice in ["yes", "y", "no", "n"]:
                 break
             else:
@@ -575,7 +632,7 @@ class ChessAppCLI:
                 print("1. Easy")
                 print("2. Medium")
                 print("3. Hard")
-                difficulty_choice = input().strip()
+                difficulty_choice = (await ainput("")).strip()
 
                 if difficulty_choice == "1":
                     difficulty = "easy"
@@ -597,45 +654,51 @@ class ChessAppCLI:
             endpoint += "&ai=false"
 
         # Step 4: Make the request to create the game
-        self.conn.request("POST", endpoint, headers=self.auth_headers)
-        response = self.conn.getresponse()
-        data = json.loads(response.read().decode())
+        try:
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
+            data = json.loads(response.read().decode())
 
-        # Step 5: Handle the response
-        if response.status == 200:
-            game_id = data.get("gameID")
-            print(f"Game created successfully! Game ID: {game_id}")
-        elif response.status == 403:
+            # Step 5: Handle the response
+            if response.status == 200:
+                game_id = data.get("gameID")
+                self.cache.invalidate(GAMES_PATH, player_id=self.player_id)
+                print(f"Game created successfully! Game ID: {game_id}")
+            elif response.status == 403:
                 print("Authentication Failed!")
                 self.authenticated = False
                 self.auth_headers = HEADERS
-        else:
-            print("Failed to create game.")
-
-        # Ensure the connection is closed
-        self.conn.close()
+            else:
+                print("Failed to create game.")
+        except Exception as e:
+            print(f"Error creating game: {e}")
 
 
     # -----------------------
     # Join Existing Game
     # -----------------------
-    def join_game(self):
+    async def join_game(self):
         if not self.authenticated:
             print("Please log in to join a game.")
             return
 
-        game_id = input("Enter Game ID to join: ").strip()
-        if not game_id:
+        game_ids = [game_id.strip() for game_id in (await ainput("Enter Game ID(s) to join, comma separated: ")).split(",") if game_id.strip()]
+        if not game_ids:
             print("Game ID cannot be empty.")
             return
 
+        if len(game_ids) > 1:
+            results, elapsed = await self.batch_join_games(game_ids)
+            self.print_batch_results("Join", results, elapsed)
+            return
+
+        game_id = game_ids[0]
         endpoint = f"/player/join-game?playerID={self.player_id}&gameID={game_id}"
         try:
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
             data = json.loads(response.read().decode())
             print(data)
             if response.status == 200:
+                self.cache.invalidate(GAMES_PATH, player_id=self.player_id)
                 print(f"Successfully joined game {game_id}.")
             elif response.status == 403:
                 print("Authentication Failed!")
@@ -645,20 +708,18 @@ class ChessAppCLI:
                 print("Failed to join game.")
         except Exception as e:
             print(f"Error joining game: {e}")
-        finally:
-            self.conn.close()
 
 
     # -----------------------
     # Leave Existing Game
     # -----------------------
-    def leave_game(self):
+    async def leave_game(self):
         if not self.authenticated:
             print("Please log in to leave a game.")
             return
 
         # Fetch ongoing games using the common function
-        active_games = self.fetch_ongoing_games_common()
+        active_games = await self.fetch_ongoing_games_common()
         
         if not active_games:
             print("No active games to leave.")
@@ -669,36 +730,42 @@ class ChessAppCLI:
         for idx, game in enumerate(active_games, 1):
             print(f"{idx}. Game ID: {game['gameID']} - Players: {game['players']}")
 
-        # Prompt user to select a game to leave
+        # Prompt user to select the game(s) to leave
         try:
-            choice = int(input("Enter the number of the game you want to leave: "))
-            if choice < 0 or choice > len(active_games):
+            choices = self.parse_selection(await ainput("Enter the number(s) of the game(s) you want to leave, comma separated (0 for all): "))
+            if not choices or any(choice < 0 or choice > len(active_games) for choice in choices):
                 print("Invalid selection.")
                 return
             
-            if choice == 0:
+            if 0 in choices:
                 print("leaving all games")
-                return self.leave_all_games()
+                return await self.leave_all_games()
+
+            elif len(choices) > 1:
+                game_ids = [active_games[choice - 1]['gameID'] for choice in choices]
+                results, elapsed = await self.batch_end_games(game_ids)
+                self.print_batch_results("Leave", results, elapsed)
+                return results
 
             else:
-                selected_game = active_games[choice - 1]
+                selected_game = active_games[choices[0] - 1]
                 game_id = selected_game['gameID']
                 print("leaving specific game")
-                return self.leave_specific_game(game_id)
+                return await self.leave_specific_game(game_id)
 
         except ValueError:
             print("Invalid input. Please enter a number.")
             return
 
         
-    def leave_all_games(self):
+    async def leave_all_games(self):
         endpoint = f"/player/end-all-games?playerID={self.player_id}"
         try:
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
 
             # Handle the response
             if response.status == 200:
+                self.cache.invalidate(GAMES_PATH, player_id=self.player_id)
                 print(f"Successfully left games.")
             elif response.status == 403:
                 print("Authentication Failed!")
@@ -709,19 +776,17 @@ class ChessAppCLI:
                 print(f"Failed to leave games: {data.get('error', 'Unknown error')}")
         except Exception as e:
             print(f"Error leaving game: {e}")
-        finally:
-            self.conn.close()
 
 
-    def leave_specific_game(self, game_id):
+    async def leave_specific_game(self, game_id):
         endpoint = f"/player/end-game?playerID={self.player_id}&gameID={game_id}"
         try:
-            self.conn.request("POST", endpoint, headers=self.auth_headers)
-            response = self.conn.getresponse()
+            response = await self.session.request("POST", endpoint, headers=self.auth_headers)
             
 
             # Handle the response
             if response.status == 200:
+                self.cache.invalidate(GAMES_PATH, player_id=self.player_id)
                 print(f"Successfully left game {game_id}.")
             elif response.status == 403:
                 print("Authentication Failed!")
@@ -732,16 +797,76 @@ class ChessAppCLI:
                 print(f"Failed to leave game {game_id}: {data.get('error', 'Unknown error')}")
         except Exception as e:
             print(f"Error leaving game: {e}")
-        finally:
-            self.conn.close()
+
+
+    # -----------------------
+    # Batch Operations
+    # -----------------------
+    async def run_batch(self, method, requests, limit=BATCH_CONCURRENCY):
+        # requests is a list of (item, endpoint) pairs, issued concurrently
+        semaphore = asyncio.Semaphore(limit)
+
+        async def run_one(item, endpoint):
+            async with semaphore:
+                try:
+                    response = await self.session.request(method, endpoint, headers=self.auth_headers)
+                    return {"item": item, "status": response.status, "data": response.json()}
+                except Exception as e:
+                    return {"item": item, "status": None, "error": str(e) or type(e).__name__}
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_one(item, endpoint) for item, endpoint in requests))
+        elapsed = time.perf_counter() - start
+
+        if any(result["status"] == 403 for result in results):
+            print("Authentication Failed!")
+            self.authenticated = False
+            self.auth_headers = HEADERS
+        return results, elapsed
+
+
+    async def batch_end_games(self, game_ids, limit=BATCH_CONCURRENCY):
+        requests = [(game_id, f"/player/end-game?playerID={self.player_id}&gameID={game_id}") for game_id in game_ids]
+        batch = await self.run_batch("POST", requests, limit)
+        self.cache.invalidate(GAMES_PATH, player_id=self.player_id)
+        return batch
+
+
+    async def batch_challenge(self, friend_ids, limit=BATCH_CONCURRENCY):
+        requests = [(friend_id, f"/player/challenge?playerID={self.player_id}&opponentID={friend_id}") for friend_id in friend_ids]
+        return await self.run_batch("POST", requests, limit)
+
+
+    async def batch_join_games(self, game_ids, limit=BATCH_CONCURRENCY):
+        requests = [(game_id, f"/player/join-game?playerID={self.player_id}&gameID={game_id}") for game_id in game_ids]
+        batch = await self.run_batch("POST", requests, limit)
+        self.cache.invalidate(GAMES_PATH, player_id=self.player_id)
+        return batch
+
+
+    def print_batch_results(self, action, results, elapsed):
+        succeeded = sum(1 for result in results if result["status"] == 200)
+        print(f"\n--- {action} Results ({succeeded}/{len(results)} succeeded in {elapsed:.2f}s) ---")
+        for result in results:
+            if result["status"] == 200:
+                print(f"{result['item']}: OK")
+            else:
+                error = result.get("error") or (result.get("data") or {}).get("error", "Unknown error")
+                print(f"{result['item']}: failed ({result['status']}) {error}")
 
 
     # -----------------------
     # Utilities
     # -----------------------
+    def parse_selection(self, selection):
+        # "1, 3,4" -> [1, 3, 4]; raises ValueError on non-numeric input
+        return [int(choice) for choice in selection.split(",") if choice.strip()]
+
+
     def log_out(self):
         self.authenticated = False
         self.auth_headers = HEADERS
+        self.cache.clear()
         print("Logged out.")
 
 
@@ -0,0 +1,155 @@
+'''
+Step through a finished game on the board ("Game replay loop" in arduino loop plan.txt).
+
+The board's arrow keys arrive as "key" board events; each step is pushed as a
+board_diff position update, so only the squares that changed are sent.
+Stepping one ply pushes or pops a single move. Jumps restore the nearest
+snapshot (kept every checkpoint_interval plies, or read from a stored game)
+and replay at most that many moves.
+'''
+
+import chess
+from board_diff import BoardDiffEncoder, push_position
+from board_events import BoardEventStream
+from game_record import CHECKPOINT_INTERVAL, GameRecord, piece_code
+
+KEY_STEPS = {"right": 1, "left": -1}
+KEY_JUMPS = {"up": 10, "down": -10}
+
+
+def move_squares(board, move):
+    # Squares a move can change, worked out before it is pushed
+    squares = [move.from_square, move.to_square]
+    if board.is_en_passant(move):
+        squares.append(chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square)))
+    elif board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        kingside = board.is_kingside_castling(move)
+        # python-chess encodes castling as the king's two-square move
+        squares.append(chess.square(7 if kingside else 0, rank))
+        squares.append(chess.square(5 if kingside else 3, rank))
+    return squares
+
+
+def changed_squares(before, after):
+    # Every square whose piece differs between two boards
+    mask = 0
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            mask |= before.pieces_mask(piece_type, color) ^ after.pieces_mask(piece_type, color)
+    return list(chess.scan_forward(mask))
+
+
+class ReplayNavigator:
+    """A cursor over a game; every step returns [(square, piece code)] for
+    the squares that changed."""
+
+    def __init__(self, start_fen, moves, checkpoint_interval=CHECKPOINT_INTERVAL, snapshot=None):
+        self.start_fen = start_fen
+        self.moves = moves
+        self.checkpoint_interval = checkpoint_interval
+        # snapshot(ply) -> board, e.g. StoredGame.board_at; otherwise snapshots are kept as plies are reached
+        self.load_snapshot = snapshot
+        self.snapshots = {0: chess.Board(start_fen)}
+        self.board = chess.Board(start_fen)
+        self.ply = 0
+
+    @classmethod
+    def from_record(cls, record, checkpoint_interval=CHECKPOINT_INTERVAL):
+        return cls(record.start_fen, record.moves, checkpoint_interval)
+
+    @classmethod
+    def from_stored(cls, game):
+        return cls(game.start_fen, game.moves(), game.checkpoint_interval, game.board_at)
+
+    @classmethod
+    def from_sans(cls, sans, start_fen=chess.STARTING_FEN):
+        # The Worker's /replay response
+        return cls.from_record(GameRecord.from_json({"fen": start_fen, "moves": sans}))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def changes(self, squares):
+        return [(square, piece_code(self.board.piece_at(square))) for square in squares]
+
+    def forward(self):
+        if self.ply >= len(self.moves):
+            return []
+        move = self.moves[self.ply]
+        squares = move_squares(self.board, move)
+        self.board.push(move)
+        self.ply += 1
+        if self.ply % self.checkpoint_interval == 0 and self.ply not in self.snapshots and self.load_snapshot is None:
+            self.snapshots[self.ply] = self.board.copy(stack=False)
+        return self.changes(squares)
+
+    def back(self):
+        if self.ply == 0:
+            return []
+        if not self.board.move_stack:
+            # Restored from a snapshot: rebuild the stack from the one before it
+            self.board = self.snapshot_board(self.ply - 1)
+            self.board.push(self.moves[self.ply - 1])
+        move = self.board.pop()
+        self.ply -= 1
+        return self.changes(move_squares(self.board, move))
+
+    def snapshot_board(self, ply):
+        # Board at `ply`, from the nearest snapshot at or before it
+        checkpoint = ply - ply % self.checkpoint_interval
+        if checkpoint in self.snapshots:
+            board = self.snapshots[checkpoint].copy(stack=False)
+        elif self.load_snapshot is not None:
+            board = self.load_snapshot(checkpoint)
+        else:
+            checkpoint = max(snapshot for snapshot in self.snapshots if snapshot <= ply)
+            board = self.snapshots[checkpoint].copy(stack=False)
+        for move in self.moves[checkpoint:ply]:
+            board.push(move)
+            if len(board.move_stack) % self.checkpoint_interval == 0 and self.load_snapshot is None:
+                self.snapshots.setdefault(checkpoint + len(board.move_stack), board.copy(stack=False))
+        return board
+
+    def seek(self, ply):
+        ply = max(0, min(ply, len(self.moves)))
+        if abs(ply - self.ply) == 1:
+            return self.forward() if ply > self.ply else self.back()
+        if ply == self.ply:
+            return []
+        before = self.board
+        self.board = self.snapshot_board(ply)
+        self.ply = ply
+        return self.changes(changed_squares(before, self.board))
+
+    def step(self, key):
+        if key in KEY_STEPS:
+            return self.seek(self.ply + KEY_STEPS[key])
+        if key in KEY_JUMPS:
+            return self.seek(self.ply + KEY_JUMPS[key])
+        if key == "start":
+            return self.seek(0)
+        if key == "end":
+            return self.seek(len(self.moves))
+        return []
+
+
+async def replay_on_board(client, navigator):
+    """Drive the board's replay loop until it is reset. Returns the last ply shown."""
+    stream = BoardEventStream(client)
+    encoder = BoardDiffEncoder()
+    await stream.start()
+    try:
+        # The first update is a full frame, after that only what changes
+        await push_position(client, encoder, navigator.board.fen())
+        async for event in stream:
+            if event.kind == "reset":
+                break
+            if event.kind != "key":
+                continue
+            if navigator.step(event.detail):
+                await push_position(client, encoder, navigator.board.fen())
+                print(f"Ply {navigator.ply}/{len(navigator)}")
+    finally:
+        await stream.stop()
+    return navigator.ply
@@ -0,0 +1,50 @@
+import time
+
+DEFAULT_TTL = 30  # seconds
+
+
+class CacheEntry:
+    def __init__(self, data, etag, ttl):
+        self.data = data
+        self.etag = etag
+        self.ttl = ttl
+        self.expires_at = time.monotonic() + ttl
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires_at
+
+    def refresh(self):
+        self.expires_at = time.monotonic() + self.ttl
+
+
+class ResponseCache:
+    """Client-side cache of GET response bodies keyed by endpoint path and player.
+
+    Entries are served without a request while fresh. Once stale they are
+    kept so the next request can revalidate them with If-None-Match.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, path, player_id):
+        return self.entries.get((path, player_id))
+
+    def put(self, path, player_id, data, etag=None):
+        entry = CacheEntry(data, etag, self.ttl)
+        self.entries[(path, player_id)] = entry
+        return entry
+
+    def invalidate(self, *paths, player_id):
+        for path in paths:
+            self.entries.pop((path, player_id), None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def summary(self):
+        return f"cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} misses"
@@ -0,0 +1,51 @@
+import chess
+import pytest
+from bitboards import BitboardBatch, board_perft, perft
+
+# Standard perft positions with their published node counts for depths 1-3
+PERFT_POSITIONS = [
+    (chess.STARTING_FEN, [20, 400, 8902]),
+    # Kiwipete: castling, en passant and promotions all in reach
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862]),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812]),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467]),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379]),
+    ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890]),
+]
+
+
+@pytest.mark.parametrize("fen,counts", PERFT_POSITIONS)
+def test_perft(fen, counts):
+    batch = BitboardBatch.from_fens([fen])
+    for depth, count in enumerate(counts, 1):
+        assert perft(batch, depth) == count
+    assert board_perft(chess.Board(fen), 2) == counts[1]
+
+
+def test_legal_moves_match_python_chess():
+    # Every position one ply from the perft positions, as one batch
+    fens = []
+    for fen, _ in PERFT_POSITIONS:
+        board = chess.Board(fen)
+        fens.append(fen)
+        for move in board.legal_moves:
+            board.push(move)
+            fens.append(board.fen())
+            board.pop()
+
+    batch = BitboardBatch.from_fens(fens)
+    moves, children = batch.legal_moves()
+    child_fens = children.to_fens()
+    generated = [{} for _ in fens]
+    for row in range(len(moves)):
+        generated[moves.position[row]][moves.uci(row)] = child_fens[row]
+
+    for fen, found in zip(fens, generated):
+        board = chess.Board(fen)
+        expected = {}
+        for move in board.legal_moves:
+            board.push(move)
+            # to_fens keeps an en passant square whenever a pseudo-legal capture exists
+            expected[move.uci()] = board.fen(en_passant="xfen")
+            board.pop()
+        assert found == expected, fen
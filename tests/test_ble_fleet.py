@@ -0,0 +1,103 @@
+import asyncio
+from ble_fleet import BoardFleet, FakeBackend, FakeClient, assign_games
+from ble_provisioning import PROVISION_CHAR_UUID
+
+
+class GattErrorClient(FakeClient):
+    """Fails the first `failures` writes while keeping the link up."""
+
+    def __init__(self, device, backend):
+        super().__init__(device, backend)
+        self.disconnected = False
+
+    async def write_gatt_char(self, char_specifier, data, response=None):
+        if self.backend.failures.get(self.address, 0) > 0:
+            self.backend.failures[self.address] -= 1
+            raise OSError("GATT write failed")
+        await super().write_gatt_char(char_specifier, data, response)
+
+    async def disconnect(self):
+        self.disconnected = True
+        await super().disconnect()
+
+
+class FlakyBackend(FakeBackend):
+    def __init__(self, count, failures=None, **kwargs):
+        super().__init__(count, connect_latency=0, interval=0, **kwargs)
+        self.failures = dict(failures or {})
+        self.connected = []
+
+    async def connect(self, device):
+        client = GattErrorClient(device, self)
+        await client.connect()
+        self.connected.append(client)
+        return client
+
+
+def provision(fleet, game_ids):
+    async def run():
+        devices = await fleet.discover(timeout=0)
+        try:
+            return await fleet.provision_all("ssid", "secret", assign_games(devices, game_ids), "host")
+        finally:
+            await fleet.close()
+    return asyncio.run(run())
+
+
+def test_provisions_every_board():
+    backend = FlakyBackend(5)
+    results = provision(BoardFleet(backend, base_delay=0), ["g1", "g2", "g3", "g4", "g5"])
+
+    assert [result.ok for result in results] == [True] * 5
+    assert [result.attempts for result in results] == [1] * 5
+    assert [result.game_id for result in results] == ["g1", "g2", "g3", "g4", "g5"]
+    for client in backend.connected:
+        assert client.writes and all(write[0].uuid == PROVISION_CHAR_UUID for write in client.writes)
+
+
+def test_retries_after_failure_and_disconnects_failed_link():
+    backend = FlakyBackend(2)
+    backend.failures = {backend.devices[0].address: 2}
+    results = provision(BoardFleet(backend, retries=3, base_delay=0), ["g1"])
+
+    assert results[0].ok and results[0].attempts == 3
+    assert results[1].ok and results[1].attempts == 1
+    failed = [client for client in backend.connected if client.address == backend.devices[0].address]
+    # Each failed attempt reconnected after disconnecting the link that was still up
+    assert len(failed) == 3
+    assert all(client.disconnected for client in failed[:2])
+
+
+def test_gives_up_after_retries():
+    backend = FlakyBackend(1)
+    backend.failures = {backend.devices[0].address: 10}
+    results = provision(BoardFleet(backend, retries=2, base_delay=0), ["g1"])
+
+    assert not results[0].ok
+    assert results[0].attempts == 2
+    assert "GATT write failed" in results[0].error
+
+
+def test_concurrency_cap():
+    class CountingBackend(FakeBackend):
+        def __init__(self, count):
+            super().__init__(count, connect_latency=0.01, interval=0.01)
+            self.active = 0
+            self.max_active = 0
+
+        async def connect(self, device):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            return await super().connect(device)
+
+    class CountingFleet(BoardFleet):
+        async def provision_one(self, device, *args):
+            result = await super().provision_one(device, *args)
+            self.backend.active -= 1
+            return result
+
+    backend = CountingBackend(12)
+    results = provision(CountingFleet(backend, concurrency=3, base_delay=0), ["g1"])
+
+    assert all(result.ok for result in results)
+    assert backend.max_active == 3
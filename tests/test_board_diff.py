@@ -0,0 +1,124 @@
+import random
+import chess
+from board_diff import (FRAME, MORE, RESET, SEQUENCE_MASK, BoardDiffDecoder, BoardDiffEncoder, board_codes,
+                        decode_frame, encode_frames)
+from game_record import piece_code
+
+
+def play(fen, *ucis):
+    board = chess.Board(fen)
+    fens = [board.fen()]
+    for uci in ucis:
+        board.push_uci(uci)
+        fens.append(board.fen())
+    return fens
+
+
+def send(encoder, decoder, fen):
+    frames = encoder.update(fen)
+    done = [decoder.apply(frame) for frame in frames]
+    if frames:
+        assert done[-1] and not any(done[:-1])
+    assert decoder.codes == board_codes(fen)
+    return frames
+
+
+def test_random_games_round_trip():
+    rng = random.Random(25)
+    sizes = []
+    for _ in range(50):
+        board = chess.Board()
+        encoder, decoder = BoardDiffEncoder(), BoardDiffDecoder()
+        send(encoder, decoder, board.fen())
+        for _ in range(rng.randint(1, 120)):
+            legal = list(board.legal_moves)
+            if not legal:
+                break
+            board.push(rng.choice(legal))
+            frames = send(encoder, decoder, board.fen())
+            assert len(frames) == 1 and len(frames[0]) == FRAME.size
+            sizes.append(len(frames[0]))
+        assert decoder.missed == 0
+    assert sum(sizes) / len(sizes) == FRAME.size
+
+
+def test_first_update_is_compact_full_frame():
+    encoder, decoder = BoardDiffEncoder(), BoardDiffDecoder()
+    decoder.codes = [piece_code(chess.Piece(chess.QUEEN, chess.BLACK))] * 64
+    frames = send(encoder, decoder, chess.STARTING_FEN)
+
+    assert len(frames) == 1
+    assert frames[0][0] & RESET
+    # Header, occupancy mask and 32 nibbles: smaller than the FEN itself
+    assert len(frames[0]) == 1 + 8 + 16 < len(chess.STARTING_FEN)
+    header, changes = decode_frame(frames[0])
+    assert [square for square, _ in changes] == list(chess.scan_forward(chess.BB_RANK_1 | chess.BB_RANK_2 |
+                                                                         chess.BB_RANK_7 | chess.BB_RANK_8))
+
+
+def test_large_update_is_split_with_more():
+    encoder, decoder = BoardDiffEncoder(), BoardDiffDecoder()
+    fens = play(chess.STARTING_FEN, "e2e4", "e7e5", "g1f3", "b8c6")
+    send(encoder, decoder, fens[0])
+    # Jumping four plies changes eight squares: two diff frames beat one full frame
+    frames = send(encoder, decoder, fens[-1])
+    assert len(frames) == 2
+    assert frames[0][0] & MORE and not frames[1][0] & MORE
+    assert not any(frame[0] & RESET for frame in frames)
+
+
+def test_resync_falls_back_to_full_frame():
+    encoder, decoder = BoardDiffEncoder(), BoardDiffDecoder()
+    send(encoder, decoder, chess.STARTING_FEN)
+    frames = send(encoder, decoder, "8/8/4k3/8/8/4K3/8/8 w - - 0 1")
+    assert len(frames) == 1 and frames[0][0] & RESET
+    assert len(frames[0]) == 1 + 8 + 1
+
+
+def test_special_moves_fit_one_frame():
+    cases = [
+        ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1g1", {chess.E1, chess.F1, chess.G1, chess.H1}),
+        ("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1", "e8c8", {chess.A8, chess.C8, chess.D8, chess.E8}),
+        ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", {chess.E5, chess.D6, chess.D5}),
+        ("4k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7a8q", {chess.A7, chess.A8}),
+        ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8n", {chess.A7, chess.B8}),
+    ]
+    for fen, uci, squares in cases:
+        encoder, decoder = BoardDiffEncoder(), BoardDiffDecoder()
+        before, after = play(fen, uci)
+        send(encoder, decoder, before)
+        frames = send(encoder, decoder, after)
+        assert len(frames) == 1 and len(frames[0]) == FRAME.size
+        _, changes = decode_frame(frames[0])
+        assert {square for square, _ in changes} == squares
+    # The promoted piece arrives as its own code
+    assert dict(changes)[chess.B8] == piece_code(chess.Piece(chess.KNIGHT, chess.WHITE))
+
+
+def test_sequence_gap_counts_missed_updates():
+    encoder, decoder = BoardDiffEncoder(), BoardDiffDecoder()
+    fens = play(chess.STARTING_FEN, "e2e4", "e7e5", "g1f3", "b8c6")
+    send(encoder, decoder, fens[0])
+    send(encoder, decoder, fens[1])
+    encoder.update(fens[2])
+    encoder.update(fens[3])
+    assert decoder.missed == 0
+    decoder.apply(encoder.update(fens[4])[0])
+    assert decoder.missed == 2
+
+
+def test_sequence_wraps_without_missing():
+    encoder, decoder = BoardDiffEncoder(), BoardDiffDecoder()
+    board = chess.Board()
+    send(encoder, decoder, board.fen())
+    moves = ["g1f3", "g8f6", "f3g1", "f6g8"]
+    for ply in range(SEQUENCE_MASK * 2):
+        board.push_uci(moves[ply % 4])
+        send(encoder, decoder, board.fen())
+    assert decoder.missed == 0
+
+
+def test_encode_frames_packs_codes_in_square_order():
+    changes = [(0, 4), (9, 0), (62, 14), (63, 9)]
+    frame = encode_frames(changes, 5)[0]
+    assert decode_frame(frame) == (5, changes)
@@ -0,0 +1,101 @@
+import io
+import json
+import random
+import chess
+import chess.pgn
+import pytest
+from game_record import (GameRecord, GameStore, GameStoreWriter, decode_move, encode_move, pack_board,
+                         unpack_board, write_store)
+
+
+def random_game(rng, plies, start_fen=chess.STARTING_FEN):
+    board = chess.Board(start_fen)
+    moves = []
+    for _ in range(plies):
+        legal = list(board.legal_moves)
+        if not legal:
+            break
+        move = rng.choice(legal)
+        board.push(move)
+        moves.append(move)
+    return moves
+
+
+@pytest.fixture
+def records():
+    rng = random.Random(23)
+    games = [GameRecord(f"game{index}", f"white{index}", f"black{index}", rng.choice(["*", "1-0", "0-1", "1/2-1/2"]),
+                        moves=random_game(rng, rng.randint(0, 150))) for index in range(40)]
+    # Non-standard start with castling, en passant and promotions available
+    start = "r3k2r/1P4p1/8/3pP3/8/8/6p1/R3K2R w KQkq d6 0 1"
+    games.append(GameRecord("custom", "a", "b", "*", start, random_game(rng, 60, start)))
+    return games
+
+
+def test_move_encoding_round_trip():
+    for move in (chess.Move.from_uci("e2e4"), chess.Move.from_uci("e1g1"), chess.Move.from_uci("a7a8q"),
+                 chess.Move.from_uci("h2h1n"), chess.Move.from_uci("h8a1")):
+        assert encode_move(move) < 1 << 16
+        assert decode_move(encode_move(move)) == move
+
+
+def test_packed_board_round_trip():
+    for fen in (chess.STARTING_FEN, "r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 0 17", "8/8/8/8/8/8/8/K6k b - - 99 120"):
+        board, offset = unpack_board(pack_board(chess.Board(fen)))
+        assert board.fen() == fen
+        assert offset == len(pack_board(chess.Board(fen)))
+
+
+@pytest.mark.parametrize("interval", [1, 7, 32])
+def test_store_round_trip(tmp_path, records, interval):
+    path = tmp_path / "games.cgr"
+    assert write_store(records, path, interval) == len(records)
+
+    with GameStore(path) as store:
+        assert len(store) == len(records)
+        for record, stored in zip(records, store):
+            assert (stored.game_id, stored.white, stored.black, stored.result) == \
+                (record.game_id, record.white, record.black, record.result)
+            assert stored.moves() == record.moves
+            # Every ply matches a python-chess replay from the start position
+            board = record.board()
+            for ply in range(len(record.moves) + 1):
+                assert stored.board_at(ply).fen() == board.fen()
+                if ply < len(record.moves):
+                    assert stored.move(ply) == record.moves[ply]
+                    board.push(record.moves[ply])
+        assert store.find("custom").start_fen == records[-1].start_fen
+        assert store.find("missing") is None
+        assert store[-1].game_id == "custom"
+
+
+def test_pgn_and_json_round_trip(records):
+    for record in records:
+        pgn = chess.pgn.read_game(io.StringIO(str(record.to_pgn())))
+        from_pgn = GameRecord.from_pgn(pgn)
+        from_json = GameRecord.from_json(json.loads(json.dumps(record.to_json())))
+        for copy in (from_pgn, from_json):
+            assert copy.moves == record.moves
+            assert copy.start_fen == record.start_fen
+            assert copy.result == record.result
+
+
+def test_json_accepts_replay_moves():
+    # The Worker's /replay shape, plus {from, to} objects with implied queen promotion
+    record = GameRecord.from_json({"fen": "8/P6k/8/8/8/8/8/K7 w - - 0 1", "moves": [{"from": "a7", "to": "a8"}, "Kg6"]})
+    assert [move.uci() for move in record.moves] == ["a7a8q", "h7g6"]
+    assert GameRecord.from_json({"moves": ["e4", "e5"]}).to_json()["moves"] == ["e4", "e5"]
+
+
+def test_rejects_bad_checkpoint_interval(tmp_path, records):
+    with pytest.raises(ValueError):
+        GameStoreWriter(tmp_path / "games.cgr", 0)
+    with pytest.raises(ValueError):
+        records[0].encode(0)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_store.cgr"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        GameStore(path)
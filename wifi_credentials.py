@@ -0,0 +1,159 @@
+import configparser
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+NM_CONNECTIONS_DIR = "/etc/NetworkManager/system-connections"
+CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".chess_wifi.json")
+SSID_CHECK_INTERVAL = 30  # seconds between checks for a network change
+
+
+class StaticProvider:
+    """Fixed credentials, e.g. from the environment on CI boxes and fleet laptops."""
+
+    def __init__(self, ssid, password):
+        self.ssid = ssid
+        self.password = password
+
+    def current_ssid(self):
+        return self.ssid
+
+    def password_for(self, ssid):
+        return self.password if ssid == self.ssid else None
+
+
+class ConfigFileProvider:
+    """JSON file: {"ssid": "...", "password": "..."} or {"ssid": "...", "networks": {ssid: password}}."""
+
+    def __init__(self, path=CONFIG_PATH):
+        self.path = path
+        self.mtime = None
+        self.data = {}
+
+    def load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime != self.mtime:
+                with open(self.path) as f:
+                    self.data = json.load(f)
+                self.mtime = mtime
+        except (OSError, ValueError):
+            self.data = {}
+            self.mtime = None
+        return self.data
+
+    def current_ssid(self):
+        return self.load().get("ssid")
+
+    def password_for(self, ssid):
+        data = self.load()
+        networks = data.get("networks", {})
+        if ssid in networks:
+            return networks[ssid]
+        return data.get("password") if ssid == data.get("ssid") else None
+
+
+class NetshProvider:
+    """Windows: the active interface and saved profile keys from netsh."""
+
+    def current_ssid(self):
+        output = subprocess.check_output(['netsh', 'wlan', 'show', 'interfaces']).decode('utf-8').split('\n')
+        current_network = [line.split(":", 1)[1].strip() for line in output if "SSID" in line and "BSSID" not in line]
+        return current_network[0] if current_network else None
+
+    def password_for(self, ssid):
+        output = subprocess.check_output(['netsh', 'wlan', 'show', 'profile', ssid, 'key=clear']).decode('utf-8').split('\n')
+        password = [line.split(":", 1)[1].strip() for line in output if "Key Content" in line]
+        return password[0] if password else None
+
+
+class NetworkManagerProvider:
+    """Linux: active SSID from nmcli, key from the saved connection file when readable."""
+
+    def __init__(self, connections_dir=NM_CONNECTIONS_DIR):
+        self.connections_dir = connections_dir
+
+    def current_ssid(self):
+        output = subprocess.check_output(['nmcli', '-t', '-f', 'ACTIVE,SSID', 'device', 'wifi']).decode('utf-8')
+        for line in output.splitlines():
+            active, _, ssid = line.partition(":")
+            if active == "yes":
+                return ssid.replace("\\:", ":")
+        return None
+
+    def password_for(self, ssid):
+        # Connection files are root-only on most systems; fall back to nmcli
+        for path in glob.glob(os.path.join(self.connections_dir, "*.nmconnection")):
+            connection = configparser.ConfigParser(interpolation=None)
+            try:
+                connection.read(path)
+            except (OSError, configparser.Error):
+                continue
+            if connection.get("wifi", "ssid", fallback=None) == ssid:
+                return connection.get("wifi-security", "psk", fallback=None)
+        try:
+            output = subprocess.check_output(
+                ['nmcli', '-s', '-g', '802-11-wireless-security.psk', 'connection', 'show', ssid],
+                stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError:
+            return None
+        return output.decode('utf-8').strip() or None
+
+
+class WifiCredentials:
+    """Caches passwords per SSID and only re-checks the active network every
+    SSID_CHECK_INTERVAL seconds, so repeated lookups spawn no processes."""
+
+    def __init__(self, provider, check_interval=SSID_CHECK_INTERVAL):
+        self.provider = provider
+        self.check_interval = check_interval
+        self.ssid = None
+        self.checked_at = None
+        self.passwords = {}
+        self.lookups = 0
+
+    def current_ssid(self):
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at >= self.check_interval:
+            ssid = self.provider.current_ssid()
+            if ssid != self.ssid:
+                # Network changed; the old network's key may have changed while we were away
+                self.passwords.pop(self.ssid, None)
+                self.ssid = ssid
+            self.checked_at = now
+        return self.ssid
+
+    def get(self):
+        # Returns (ssid, password), (None, None) when not connected
+        ssid = self.current_ssid()
+        if not ssid:
+            return None, None
+        if ssid in self.passwords:
+            return ssid, self.passwords[ssid]
+        self.lookups += 1
+        password = self.provider.password_for(ssid)
+        # A failed lookup (keychain locked, nmcli error) is retried on the next call
+        if password is not None:
+            self.passwords[ssid] = password
+        return ssid, password
+
+    def invalidate(self):
+        self.checked_at = None
+        self.passwords.clear()
+
+
+def default_provider():
+    if os.environ.get("CHESS_WIFI_SSID"):
+        return StaticProvider(os.environ["CHESS_WIFI_SSID"], os.environ.get("CHESS_WIFI_PASSWORD", ""))
+    config_path = os.environ.get("CHESS_WIFI_CONFIG", CONFIG_PATH)
+    if os.path.exists(config_path):
+        return ConfigFileProvider(config_path)
+    if sys.platform == "win32":
+        return NetshProvider()
+    if shutil.which("nmcli"):
+        return NetworkManagerProvider()
+    return ConfigFileProvider(config_path)